@@ -0,0 +1,105 @@
+"""
+Admission control for endpoints that start a browser.
+
+Each uncached scrape launches Chrome, so a burst of them can exhaust a
+node. ScrapeAdmission caps concurrent scrapes and queues a bounded number
+of waiters for a limited time; ClientRateLimiter is a per-client token
+bucket. Both reject fast with Retry-After instead of piling up work.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+
+class ScrapeAdmission:
+    """Concurrency limit with a bounded, time-limited wait queue"""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def _reject(self, detail):
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a scrape slot for the duration of the block, or raise 503"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("Too many scrapes in progress, try again later")
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("Timed out waiting for a scrape slot")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class ClientRateLimiter:
+    """Per-client token bucket: rate tokens per second, up to burst"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = {}
+
+    def _prune(self, now):
+        # Buckets idle long enough to have refilled are equivalent to new ones
+        full_after = self.burst / self.rate
+        self._buckets = {
+            client: bucket
+            for client, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+
+    def take(self, client, count):
+        """
+        Take up to count tokens for client.
+
+        :return: (tokens taken, seconds until the next token is available)
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        taken = min(count, math.floor(tokens))
+
+        if client not in self._buckets and len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        self._buckets[client] = (tokens - taken, now)
+        return taken, math.ceil((1 - (tokens - taken)) / self.rate)
+
+    def rejection(self, retry_after):
+        return HTTPException(
+            status_code=429,
+            detail="Scrape rate limit exceeded",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def check(self, client):
+        """Take a token for client, or raise 429 with the wait until the next one"""
+        taken, retry_after = self.take(client, 1)
+        if not taken:
+            raise self.rejection(retry_after)
@@ -0,0 +1,56 @@
+"""
+Per-product request counts for refresh prioritization.
+
+Product detail views and scrape cache hits are counted in memory and
+flushed to product_demand in one statement every few seconds, so hot
+endpoints never write to the database per request. The refresh scheduler
+(scraper/refresh_scheduler.py) re-scrapes popular stale products first.
+"""
+
+import threading
+from collections import Counter
+from database.models import ProductModel
+
+
+class DemandRecorder:
+    """
+    Thread-safe counter of product requests since the last flush. A
+    recorder that is not enabled (nothing flushes it) ignores requests, so
+    counts cannot grow without bound.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, product_id, requests=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counts[product_id] += requests
+
+    def drain(self):
+        """Counts since the last drain, resetting them"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+    def restore(self, counts):
+        """Put back counts whose flush failed, to retry on the next one"""
+        with self._lock:
+            self._counts.update(counts)
+
+    def flush(self, db):
+        """Write pending counts through db (blocking, runs in a thread)"""
+        counts = self.drain()
+        if not counts:
+            return 0
+        try:
+            ProductModel(db).record_demand(counts)
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+            self.restore(counts)
+            raise
+        return len(counts)
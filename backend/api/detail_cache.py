@@ -0,0 +1,130 @@
+"""
+Cache of serialized product detail response bodies.
+
+Entries are keyed by product ID and the response ETag, which already
+encodes the product's updated_at and the comedogenic dictionary version,
+so a hit is always current: a changed product or dictionary gets a new
+ETag and simply misses. Each negotiated content-coding is stored
+separately, so hits skip the detail queries, the ingredient matching,
+serialization and compression.
+
+The in-process cache is an LRU bounded by total body bytes. Setting
+DETAIL_CACHE_REDIS_URL adds a shared second level (any Redis-compatible
+server, requires the redis package) for multi-worker deployments.
+"""
+
+import threading
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+REDIS_KEY_PREFIX = "safeskin:detail:"
+
+
+class DetailResponseCache:
+    """Bounded LRU of (product version, content-coding) -> response bytes"""
+
+    def __init__(self, max_bytes, redis_url=None, redis_ttl=3600):
+        self.max_bytes = max_bytes
+        self.redis_ttl = redis_ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                raise RuntimeError(
+                    "DETAIL_CACHE_REDIS_URL requires redis (pip install redis)"
+                )
+            self._redis = redis.Redis.from_url(redis_url)
+
+    @staticmethod
+    def _field(version, encoding):
+        return f"{version}:{encoding or 'identity'}"
+
+    def _store_local(self, product_id, version, encoding, value):
+        body = value[0]
+        if not self.max_bytes or len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            entry = self._entries.pop(product_id, None)
+            if entry is not None and entry["version"] != version:
+                self.size -= entry["size"]
+                entry = None
+            if entry is None:
+                entry = {"version": version, "bodies": {}, "size": 0}
+
+            previous = entry["bodies"].get(encoding)
+            if previous is not None:
+                entry["size"] -= len(previous[0])
+                self.size -= len(previous[0])
+            entry["bodies"][encoding] = value
+            entry["size"] += len(body)
+            self.size += len(body)
+            self._entries[product_id] = entry
+
+            while self.size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted["size"]
+
+    def get(self, product_id, version, encoding):
+        """
+        Cached (body, applied content-coding) for a product version, or None.
+
+        :param encoding: Content-coding negotiated for the request
+        """
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and entry["version"] == version:
+                value = entry["bodies"].get(encoding)
+                if value is not None:
+                    self._entries.move_to_end(product_id)
+                    self.hits += 1
+                    return value
+
+        if self._redis is not None:
+            cached = self._redis.hget(
+                f"{REDIS_KEY_PREFIX}{product_id}", self._field(version, encoding)
+            )
+            if cached is not None:
+                # Stored as "<applied coding>\n<body>"
+                applied, _, body = cached.partition(b"\n")
+                value = (body, applied.decode() or None)
+                self._store_local(product_id, version, encoding, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, product_id, version, encoding, value):
+        """Store (body, applied content-coding) for a product version"""
+        self._store_local(product_id, version, encoding, value)
+
+        if self._redis is not None:
+            body, applied = value
+            key = f"{REDIS_KEY_PREFIX}{product_id}"
+            pipeline = self._redis.pipeline()
+            pipeline.hset(
+                key,
+                self._field(version, encoding),
+                (applied or "").encode() + b"\n" + body,
+            )
+            pipeline.expire(key, self.redis_ttl)
+            pipeline.execute()
+
+    def invalidate(self, product_id):
+        """Drop every cached body for a product (e.g. after a scrape upsert)"""
+        with self._lock:
+            entry = self._entries.pop(product_id, None)
+            if entry is not None:
+                self.size -= entry["size"]
+
+        if self._redis is not None:
+            self._redis.delete(f"{REDIS_KEY_PREFIX}{product_id}")
@@ -1,21 +1,120 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import timezone
+import asyncio
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import hmac
 import os
+import time
 import sys
 import re
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.models import Database, ProductModel
-from scraper.product_scraper import ProductScraper
-from scraper.config import setup_driver
+from database.models import (
+    Database,
+    IngredientModel,
+    ProductIngredientModel,
+    ProductModel,
+    ScrapeLogModel,
+    SEARCH_MODES,
+    analyze_ingredients,
+    load_canonicalizer,
+)
+from api.admission import ClientRateLimiter, ScrapeAdmission
+from api.demand import DemandRecorder
+from api.detail_cache import DetailResponseCache
+from api.responses import (
+    body_response,
+    choose_encoding,
+    dumps,
+    fast_json_response,
+    negotiate_body,
+    variant_etag,
+)
+from database.export_catalogue import csv_chunks, iter_catalogue, ndjson_chunks
+from database.snapshot import SnapshotDatabase, SnapshotProductModel
 
 load_dotenv()
 
 ip_address = os.getenv("HOME_IP_ADDRESS")
 
+# Cache-Control for product detail responses (browsers and shared caches/CDN)
+PRODUCT_CACHE_CONTROL = os.getenv(
+    "PRODUCT_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+)
+
+# Serialized product detail bodies, keyed by product and ETag (0 disables)
+detail_cache = DetailResponseCache(
+    max_bytes=int(os.getenv("DETAIL_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    redis_url=os.getenv("DETAIL_CACHE_REDIS_URL"),
+    redis_ttl=int(os.getenv("DETAIL_CACHE_REDIS_TTL", "3600")),
+)
+
+# Serve search/detail/listings from a read-only SQLite snapshot instead of
+# Postgres (see database/snapshot.py); write endpoints are disabled
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+
+# Bearer token for admin endpoints (full catalogue export); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# API_PROFILE=read runs a lean worker that never imports Selenium or the
+# scraper; uncached scrapes are rejected. Snapshot mode is always read-only.
+API_PROFILES = ("full", "read")
+API_PROFILE = "read" if SNAPSHOT_PATH else os.getenv("API_PROFILE", "full")
+if API_PROFILE not in API_PROFILES:
+    raise RuntimeError(
+        f"Unknown API_PROFILE {API_PROFILE!r}, expected one of {', '.join(API_PROFILES)}"
+    )
+
+if API_PROFILE == "full":
+    # Warm the scraper imports so the first scrape does not pay for them
+    import scraper.config  # noqa: F401
+    import scraper.product_scraper  # noqa: F401
+
+# Admission control for uncached scrapes (each one starts Chrome)
+scrape_admission = ScrapeAdmission(
+    max_concurrent=int(os.getenv("SCRAPE_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("SCRAPE_MAX_QUEUE", "8")),
+    queue_timeout=float(os.getenv("SCRAPE_QUEUE_TIMEOUT", "15")),
+)
+# Seconds to let product page JavaScript load before extracting
+SCRAPE_PAGE_LOAD_DELAY = float(os.getenv("SCRAPE_PAGE_LOAD_DELAY", "3"))
+
+# URLs accepted per bulk scrape request, and how many of its uncached
+# URLs may hold or wait for a scrape slot at once. Capped below the global
+# limit so one bulk request always leaves a slot for single scrapes; with a
+# single slot, bulk requests only serve cached products.
+SCRAPE_BULK_MAX_URLS = int(os.getenv("SCRAPE_BULK_MAX_URLS", "500"))
+SCRAPE_BULK_CONCURRENCY = max(
+    0,
+    min(
+        int(os.getenv("SCRAPE_BULK_CONCURRENCY", "1")),
+        scrape_admission.max_concurrent - 1,
+    ),
+)
+
+SCRAPE_RATE_PER_MINUTE = float(os.getenv("SCRAPE_RATE_PER_MINUTE", "6"))
+SCRAPE_BURST = int(os.getenv("SCRAPE_BURST", "3"))
+if SCRAPE_RATE_PER_MINUTE <= 0 or SCRAPE_BURST < 1:
+    raise RuntimeError(
+        "SCRAPE_RATE_PER_MINUTE must be positive and SCRAPE_BURST at least 1"
+    )
+scrape_rate_limiter = ClientRateLimiter(
+    rate=SCRAPE_RATE_PER_MINUTE / 60, burst=SCRAPE_BURST
+)
+
+# Product requests are counted in memory and flushed to product_demand this
+# often (0 disables), to prioritize refreshes of popular products
+DEMAND_FLUSH_SECONDS = float(os.getenv("DEMAND_FLUSH_SECONDS", "10"))
+demand = DemandRecorder(enabled=bool(DEMAND_FLUSH_SECONDS) and not SNAPSHOT_PATH)
+
 app = FastAPI(
     title="Safeskin API",
     description="API for checking comedogenicity of cosmetic products",
@@ -35,6 +134,11 @@ app.add_middleware(
 
 
 def get_db_connection():
+    if SNAPSHOT_PATH:
+        db = SnapshotDatabase(SNAPSHOT_PATH)
+        db.connect()
+        return db
+
     db_params = {
         "host": os.getenv("DB_HOST"),
         "database": os.getenv("DB_NAME"),
@@ -42,17 +146,152 @@ def get_db_connection():
         "password": os.getenv("DB_PASSWORD"),
         "port": os.getenv("DB_PORT"),
     }
-    db = Database(db_params)
+    # Optional read replicas: DB_REPLICA_HOSTS=host1:5432,host2:5433
+    # (same database name and credentials as the primary)
+    replica_params = []
+    for replica in os.getenv("DB_REPLICA_HOSTS", "").split(","):
+        host, _, port = replica.strip().partition(":")
+        if host:
+            replica_params.append(
+                {**db_params, "host": host, "port": port or db_params["port"]}
+            )
+
+    db = Database(db_params, replica_params=replica_params)
     db.connect()
     return db
 
 
+def get_product_model(db):
+    """ProductModel for Postgres, or its read-only counterpart in snapshot mode"""
+    if isinstance(db, SnapshotDatabase):
+        return SnapshotProductModel(db)
+    return ProductModel(db)
+
+
+def require_database():
+    """Reject endpoints the read-only snapshot cannot serve"""
+    if SNAPSHOT_PATH:
+        raise HTTPException(
+            status_code=503, detail="Not available in read-only snapshot mode"
+        )
+
+
+def require_scraper():
+    """Reject uncached scrapes on read-only workers"""
+    if API_PROFILE != "full":
+        raise HTTPException(
+            status_code=503, detail="Scraping is disabled on read-only API workers"
+        )
+
+
+def require_admin(request):
+    """Reject requests without the ADMIN_TOKEN bearer token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Admin token required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def flush_demand():
+    """Write pending request counts on a short-lived connection"""
+    db = get_db_connection()
+    try:
+        demand.flush(db)
+    finally:
+        db.close()
+
+
+async def flush_demand_periodically():
+    while True:
+        await asyncio.sleep(DEMAND_FLUSH_SECONDS)
+        # Best effort: counts stay pending until a flush succeeds
+        try:
+            await run_in_threadpool(flush_demand)
+        except Exception as e:
+            print(f"Demand flush failed: {str(e)}")
+
+
+@app.on_event("startup")
+async def start_demand_flush():
+    if demand.enabled:
+        app.state.demand_flush = asyncio.create_task(flush_demand_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_demand_flush():
+    task = getattr(app.state, "demand_flush", None)
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await run_in_threadpool(flush_demand)
+    except Exception as e:
+        print(f"Demand flush failed: {str(e)}")
+
+
+def product_cache_headers(product_id, version):
+    """Build ETag / Last-Modified / Cache-Control from product cache validators"""
+    etag_source = (
+        f"{product_id}:{version['updated_at'].isoformat()}:"
+        f"{version['dictionary_version']}"
+    )
+    etag = '"' + hashlib.sha1(etag_source.encode()).hexdigest() + '"'
+
+    last_modified = version["updated_at"]
+    if (
+        version["dictionary_updated_at"]
+        and version["dictionary_updated_at"] > last_modified
+    ):
+        last_modified = version["dictionary_updated_at"]
+
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        ),
+        "Cache-Control": PRODUCT_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+
+
+def is_not_modified(request, headers):
+    """Evaluate If-None-Match / If-Modified-Since against response headers"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        # (weak comparison, as RFC 9110 requires for If-None-Match); each
+        # content-coding is its own variant with its own ETag
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or headers["ETag"] in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            last_modified = parsedate_to_datetime(headers["Last-Modified"])
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return last_modified <= since
+
+    return False
+
+
 class IngredientResponse(BaseModel):
     """Response model for an ingredient"""
 
     name: str
     is_comedogenic: bool
     position: Optional[int] = None
+    canonical_name: Optional[str] = None
 
 
 class ProductSearchResult(BaseModel):
@@ -76,6 +315,51 @@ class PaginatedSearchResponse(BaseModel):
     total_pages: int
 
 
+class ProductListItem(BaseModel):
+    """Response model for a product in a filtered listing"""
+
+    id: int
+    nykaa_product_id: str
+    name: str
+    category: Optional[str] = None
+    image_url: Optional[str] = None
+    safety_status: Optional[str] = None
+    comedogenic_count: Optional[int] = None
+
+
+class ProductListResponse(BaseModel):
+    """Response model for keyset-paginated product listings"""
+
+    results: List[ProductListItem]
+    page_size: int
+    next_cursor: Optional[int] = None
+
+
+class CategoryResponse(BaseModel):
+    """Response model for a product category"""
+
+    category: str
+    product_count: int
+
+
+class IngredientCountResponse(BaseModel):
+    """Response model for an ingredient with its product count"""
+
+    id: int
+    name: str
+    product_count: int
+
+
+class IngredientProductsResponse(BaseModel):
+    """Response model for keyset-paginated products containing ingredients"""
+
+    ingredients: List[IngredientCountResponse]
+    match: str
+    results: List[ProductListItem]
+    page_size: int
+    next_cursor: Optional[int] = None
+
+
 class ProductDetailResponse(BaseModel):
     """Response model for detailed product information"""
 
@@ -91,6 +375,48 @@ class ProductDetailResponse(BaseModel):
     all_ingredients: List[IngredientResponse]
 
 
+class ComparisonIngredient(BaseModel):
+    """Response model for an ingredient across compared products"""
+
+    id: int
+    name: str
+    canonical_name: Optional[str] = None
+    is_comedogenic: bool
+    product_ids: List[int]
+    positions: List[Optional[int]]
+
+
+class ComparedProduct(BaseModel):
+    """Response model for one product in a comparison"""
+
+    id: int
+    name: str
+    category: Optional[str] = None
+    image_url: Optional[str] = None
+    safety_status: str
+    comedogenic_ingredients: List[str]
+    comedogenic_count: int
+    ingredient_count: int
+    unique_ingredients: List[str]
+
+
+class ProductOverlap(BaseModel):
+    """Response model for position-weighted overlap between two products"""
+
+    product_a: int
+    product_b: int
+    score: float
+    shared_count: int
+
+
+class ProductComparisonResponse(BaseModel):
+    """Response model for a multi-product ingredient comparison"""
+
+    products: List[ComparedProduct]
+    shared_ingredients: List[ComparisonIngredient]
+    overlap: List[ProductOverlap]
+
+
 class HealthResponse(BaseModel):
     """Response model for health check"""
 
@@ -104,6 +430,12 @@ class ScrapeRequest(BaseModel):
     url: str
 
 
+class BulkScrapeRequest(BaseModel):
+    """Request model for scraping many product URLs"""
+
+    urls: List[str]
+
+
 class ScrapeResponse(BaseModel):
     """Response model for scraped product with safety analysis"""
 
@@ -133,7 +465,7 @@ async def health_check():
     """Health check endpoint"""
     try:
         db = get_db_connection()
-        db.cursor.execute("SELECT 1")  # Test DB connection
+        db.read_cursor.execute("SELECT 1")  # Test DB connection
         db.close()
         return {"status": "ok", "message": "API and database are healthy"}
     except Exception as e:
@@ -146,13 +478,18 @@ async def health_check():
 async def search_products(
     q: str = Query(..., min_length=2, description="Search query"),
     limit: int = Query(20, ge=1, le=100, description="Max results"),
+    mode: str = Query(
+        "fuzzy",
+        pattern=f"^({'|'.join(SEARCH_MODES)})$",
+        description="Search mode: fuzzy, fulltext or hybrid",
+    ),
 ):
     """Search for products by name (dropdown version - no pagination)"""
     db = get_db_connection()
-    product_model = ProductModel(db)
+    product_model = get_product_model(db)
 
     try:
-        results = product_model.search_by_name(q, limit=limit, use_fuzzy=True)
+        results = product_model.search_by_name(q, limit=limit, mode=mode)
         db.close()
         return results
     except Exception as e:
@@ -165,39 +502,33 @@ async def search_products_paginated(
     q: str = Query(..., min_length=2, description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Results per page"),
+    mode: str = Query(
+        "fuzzy",
+        pattern=f"^({'|'.join(SEARCH_MODES)})$",
+        description="Search mode: fuzzy, fulltext or hybrid",
+    ),
 ):
     """Search for products by name with pagination"""
     db = get_db_connection()
-    product_model = ProductModel(db)
+    product_model = get_product_model(db)
 
     try:
         # Calculate offset
         offset = (page - 1) * page_size
 
-        # Get total count matching the same fuzzy search logic
-        db.cursor.execute(
-            """
-            SELECT COUNT(DISTINCT id)
-            FROM products
-            WHERE
-                LOWER(name) LIKE LOWER(%s)
-                OR similarity(name, %s) > 0.1
-                OR word_similarity(%s, name) > 0.1
-            """,
-            (f"%{q}%", q, q),
-        )
-        total_count = db.cursor.fetchone()[0]
+        # Get total count matching the same search logic
+        total_count = product_model.count_by_name(q, mode=mode)
 
         # Get paginated results
         results = product_model.search_by_name(
-            q, limit=page_size, offset=offset, use_fuzzy=True
+            q, limit=page_size, offset=offset, mode=mode
         )
 
         # Calculate total pages
         total_pages = (total_count + page_size - 1) // page_size
 
         # Debug logging
-        print(f"Search query: '{q}', page: {page}, offset: {offset}")
+        print(f"Search query: '{q}', mode: {mode}, page: {page}, offset: {offset}")
         print(f"Total count: {total_count}, results returned: {len(results)}")
         if results:
             print(
@@ -218,19 +549,136 @@ async def search_products_paginated(
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
-@app.get("/api/products/{product_id}", response_model=ProductDetailResponse)
-async def get_product(product_id: int):
-    """Get detailed product information with safety analysis"""
+@app.get("/api/products", response_model=ProductListResponse)
+async def list_products(
+    safety_status: Optional[str] = Query(
+        None, pattern="^(safe|unsafe|unknown)$", description="Filter by verdict"
+    ),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    cursor: Optional[int] = Query(
+        None, ge=0, description="next_cursor from the previous page"
+    ),
+    page_size: int = Query(20, ge=1, le=100, description="Results per page"),
+):
+    """Browse products by precomputed safety verdict and/or category"""
     db = get_db_connection()
-    product_model = ProductModel(db)
+    product_model = get_product_model(db)
 
     try:
-        result = product_model.get_product_with_safety_analysis(product_id)
+        results = product_model.list_products(
+            safety_status=safety_status,
+            category=category,
+            after_id=cursor,
+            limit=page_size,
+        )
         db.close()
 
-        if not result:
-            raise HTTPException(status_code=404, detail="Product not found")
+        return {
+            "results": results,
+            "page_size": page_size,
+            "next_cursor": results[-1]["id"] if len(results) == page_size else None,
+        }
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to list products: {str(e)}"
+        )
 
+
+@app.get("/api/categories", response_model=List[CategoryResponse])
+async def list_categories():
+    """List product categories with product counts"""
+    db = get_db_connection()
+    product_model = get_product_model(db)
+
+    try:
+        results = product_model.get_categories()
+        db.close()
+        return results
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to list categories: {str(e)}"
+        )
+
+
+def ingredient_products_page(db, ingredients, match, cursor, page_size):
+    """Shared body for the ingredient -> products endpoints"""
+    product_ingredient_model = ProductIngredientModel(db)
+    ingredient_ids = [ingredient["id"] for ingredient in ingredients]
+
+    counts = product_ingredient_model.get_product_counts(ingredient_ids)
+    results = product_ingredient_model.get_products_with_ingredients(
+        ingredient_ids, match=match, after_id=cursor, limit=page_size
+    )
+
+    return {
+        "ingredients": [
+            {**ingredient, "product_count": counts.get(ingredient["id"], 0)}
+            for ingredient in ingredients
+        ],
+        "match": match,
+        "results": results,
+        "page_size": page_size,
+        "next_cursor": results[-1]["id"] if len(results) == page_size else None,
+    }
+
+
+@app.get("/api/export")
+def export_products(
+    request: Request,
+    format: str = Query(
+        "ndjson", pattern="^(ndjson|csv)$", description="Output format"
+    ),
+):
+    """
+    Stream every product with its ingredients and verdict (NDJSON or CSV).
+    Requires the ADMIN_TOKEN bearer token.
+    """
+    require_admin(request)
+    require_database()
+    db = get_db_connection()
+
+    def stream():
+        # Server-side cursor keeps memory flat; connection closes when done
+        try:
+            rows = iter_catalogue(db)
+            yield from ndjson_chunks(rows) if format == "ndjson" else csv_chunks(rows)
+        finally:
+            db.close()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="products.{format}"'
+        },
+    )
+
+
+@app.get(
+    "/api/ingredients/{ingredient_id}/products",
+    response_model=IngredientProductsResponse,
+)
+async def get_ingredient_products(
+    ingredient_id: int,
+    cursor: Optional[int] = Query(
+        None, ge=0, description="next_cursor from the previous page"
+    ),
+    page_size: int = Query(20, ge=1, le=100, description="Results per page"),
+):
+    """List products containing an ingredient"""
+    require_database()
+    db = get_db_connection()
+
+    try:
+        ingredients = IngredientModel(db).get_by_ids([ingredient_id])
+        if not ingredients:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+
+        result = ingredient_products_page(db, ingredients, "any", cursor, page_size)
+        db.close()
         return result
     except HTTPException:
         db.close()
@@ -238,149 +686,343 @@ async def get_product(product_id: int):
     except Exception as e:
         db.close()
         raise HTTPException(
-            status_code=500, detail=f"Failed to fetch product: {str(e)}"
+            status_code=500, detail=f"Failed to fetch ingredient products: {str(e)}"
         )
 
 
-@app.post("/api/products/scrape", response_model=ScrapeResponse)
-async def scrape_product(request: ScrapeRequest):
-    """Scrape a Nykaa product URL and analyze ingredients in real-time"""
+@app.get("/api/ingredients/products", response_model=IngredientProductsResponse)
+async def get_products_by_ingredients(
+    ids: List[int] = Query([], description="Ingredient IDs"),
+    names: List[str] = Query([], description="Ingredient names (case-insensitive)"),
+    match: str = Query(
+        "any", pattern="^(any|all)$", description="Contain any or all ingredients"
+    ),
+    cursor: Optional[int] = Query(
+        None, ge=0, description="next_cursor from the previous page"
+    ),
+    page_size: int = Query(20, ge=1, le=100, description="Results per page"),
+):
+    """List products containing any/all of a set of ingredients"""
+    if not ids and not names:
+        raise HTTPException(status_code=400, detail="Provide ids or names")
+    if len(ids) + len(names) > 20:
+        raise HTTPException(status_code=400, detail="At most 20 ingredients")
+
+    require_database()
     db = get_db_connection()
-    product_model = ProductModel(db)
-    driver = None
+    ingredient_model = IngredientModel(db)
 
     try:
-        # Extract product ID from URL
-        match = re.search(r"/p/(\d+)", request.url)
-        if not match:
-            db.close()
-            raise HTTPException(status_code=400, detail="Invalid Nykaa URL")
+        found = ingredient_model.get_by_ids(ids) if ids else []
+        found += ingredient_model.get_by_names(names) if names else []
+        ingredients = list({i["id"]: i for i in found}.values())
 
-        nykaa_product_id = match.group(1)
-
-        # CHECK CACHE FIRST: Query database for existing product by nykaa_product_id
-        db.cursor.execute(
-            "SELECT id FROM products WHERE nykaa_product_id = %s", (nykaa_product_id,)
-        )
-        cached_row = db.cursor.fetchone()
+        found_ids = {i["id"] for i in ingredients}
+        found_names = {i["name"].lower() for i in ingredients}
+        missing = [str(i) for i in ids if i not in found_ids]
+        missing += [n for n in names if n.lower() not in found_names]
 
-        if cached_row:
-            # Found in cache - return analysis from database
-            cached_product = product_model.get_product_with_safety_analysis(
-                cached_row[0]
+        # An unknown ingredient can never be contained in any product
+        if not ingredients or (match == "all" and missing):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Ingredient not found: {', '.join(missing)}",
             )
-            db.close()
-            return cached_product
 
-        # NOT IN CACHE: Scrape the product
-        driver = setup_driver()
-        scraper = ProductScraper(driver)
+        result = ingredient_products_page(db, ingredients, match, cursor, page_size)
+        db.close()
+        return result
+    except HTTPException:
+        db.close()
+        raise
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch ingredient products: {str(e)}"
+        )
 
-        # Navigate to URL and scrape the product
-        driver.get(request.url)
 
-        # Add a small delay to ensure page JavaScript has loaded
-        import time
+@app.get("/api/products/compare", response_model=ProductComparisonResponse)
+async def compare_products(
+    ids: List[int] = Query(..., description="2 to 5 product IDs"),
+):
+    """Compare the ingredient lists of several products"""
+    ids = list(dict.fromkeys(ids))
+    if not 2 <= len(ids) <= 5:
+        raise HTTPException(status_code=400, detail="Compare 2 to 5 distinct products")
 
-        time.sleep(3)
+    require_database()
+    db = get_db_connection()
 
-        scraped_data = scraper.scrape_product(request.url)
+    try:
+        comparison = ProductIngredientModel(db).compare_products(ids)
 
-        if not scraped_data or not scraped_data.get("ingredients"):
-            if driver:
-                driver.quit()
-            db.close()
+        found_ids = {product["id"] for product in comparison["products"]}
+        missing = [str(i) for i in ids if i not in found_ids]
+        if missing:
             raise HTTPException(
-                status_code=404,
-                detail="Could not extract product data or ingredients from URL",
+                status_code=404, detail=f"Product not found: {', '.join(missing)}"
             )
 
-        # Get all comedogenic ingredients from database
-        db.cursor.execute("SELECT name FROM ingredients WHERE is_comedogenic = TRUE")
-        comedogenic_list = [row[0].lower() for row in db.cursor.fetchall()]
-
-        # Analyze scraped ingredients
-        comedogenic_ingredients = []
-        all_ingredients = []
-
-        for position, ing_name in enumerate(scraped_data["ingredients"], start=1):
-            # Clean the ingredient name for matching
-            clean_name = ing_name.lower()
-            clean_name = (
-                clean_name.replace("[+/-", "")
-                .replace("]", "")
-                .replace("(", "")
-                .replace(")", "")
-            )
+        canonicalizer = load_canonicalizer(db)
+        db.close()
 
-            # Check if any comedogenic ingredient matches
-            is_comedogenic = False
-            for comedogenic_name in comedogenic_list:
-                if comedogenic_name in clean_name or clean_name in comedogenic_name:
-                    is_comedogenic = True
-                    if ing_name not in comedogenic_ingredients:
-                        comedogenic_ingredients.append(ing_name)
-                    break
+        ingredients = []
+        for ingredient in comparison["ingredients"]:
+            canonical = canonicalizer.resolve(ingredient["name"])
+            ingredients.append(
+                {
+                    **ingredient,
+                    "is_comedogenic": canonical is not None,
+                    "canonical_name": canonical["name"] if canonical else None,
+                }
+            )
 
-            all_ingredients.append(
+        products = []
+        for product in comparison["products"]:
+            own = sorted(
+                (
+                    (ingredient["name"], position)
+                    for ingredient in ingredients
+                    for product_id, position in zip(
+                        ingredient["product_ids"], ingredient["positions"]
+                    )
+                    if product_id == product["id"]
+                ),
+                key=lambda item: (item[1] is None, item[1] or 0, item[0]),
+            )
+            analysis = analyze_ingredients(own, canonicalizer)
+            products.append(
                 {
-                    "name": ing_name,
-                    "is_comedogenic": is_comedogenic,
-                    "position": position,
+                    **product,
+                    "safety_status": analysis["safety_status"],
+                    "comedogenic_ingredients": analysis["comedogenic_ingredients"],
+                    "comedogenic_count": analysis["comedogenic_count"],
+                    "ingredient_count": len(own),
+                    "unique_ingredients": [
+                        ingredient["name"]
+                        for ingredient in ingredients
+                        if ingredient["product_ids"] == [product["id"]]
+                    ],
                 }
             )
 
-        # Determine safety status
-        if comedogenic_ingredients:
-            safety_status = "unsafe"
-        else:
-            safety_status = "safe"
+        return {
+            "products": products,
+            "shared_ingredients": [
+                ingredient
+                for ingredient in ingredients
+                if len(ingredient["product_ids"]) == len(products)
+            ],
+            "overlap": comparison["overlap"],
+        }
+    except HTTPException:
+        db.close()
+        raise
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to compare products: {str(e)}"
+        )
+
+
+@app.get("/api/products/{product_id}", response_model=ProductDetailResponse)
+async def get_product(product_id: int, request: Request):
+    """Get detailed product information with safety analysis"""
+    db = get_db_connection()
+    product_model = get_product_model(db)
+
+    try:
+        # Cache lookups need only the cheap version lookup
+        version = product_model.get_cache_version(product_id)
+        if not version:
+            raise HTTPException(status_code=404, detail="Product not found")
+        demand.record(product_id)
+
+        cache_headers = product_cache_headers(product_id, version)
+
+        # Serialized body for this product version and content-coding
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        body = detail_cache.get(product_id, cache_headers["ETag"], encoding)
+        if body is None:
+            result = product_model.get_product_with_safety_analysis(product_id)
+            if not result:
+                raise HTTPException(status_code=404, detail="Product not found")
+            # Small bodies go out uncompressed whatever the client accepts
+            body = negotiate_body(request, dumps(result))
+            detail_cache.put(product_id, cache_headers["ETag"], encoding, body)
+        db.close()
+
+        # Validate against the variant the 200 would send
+        variant_headers = {
+            **cache_headers,
+            "ETag": variant_etag(cache_headers["ETag"], body[1]),
+        }
+        if is_not_modified(request, variant_headers):
+            return Response(status_code=304, headers=variant_headers)
+
+        return body_response(*body, headers=cache_headers)
+    except HTTPException:
+        db.close()
+        raise
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch product: {str(e)}"
+        )
+
+
+def scrape_and_store(db, url):
+    """Scrape a product page, analyze and save it (blocking, runs in a thread)"""
+    from scraper.timing import ScrapeAttempt
+
+    attempt = ScrapeAttempt("api", url)
+    try:
+        product = _scrape_and_store(db, url, attempt)
+    except Exception as e:
+        attempt.failed(e)
+        db.conn.rollback()
+        # Best effort: a logging failure must not mask the scrape error
+        try:
+            ScrapeLogModel(db).log_attempts([attempt.entry])
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+        raise
+
+    detail_cache.invalidate(product["id"])
+    return product
+
+
+def _scrape_and_store(db, url, attempt):
+    # Imported lazily so read-only workers never load Selenium
+    from scraper.config import setup_driver
+    from scraper.product_scraper import ProductScraper
+
+    driver = setup_driver()
+    try:
+        scraper = ProductScraper(driver)
+
+        # Navigate to URL and scrape the product
+        with attempt.stage("navigation"):
+            driver.get(url)
+
+        # Add a small delay to ensure page JavaScript has loaded
+        with attempt.stage("render_wait"):
+            time.sleep(SCRAPE_PAGE_LOAD_DELAY)
+
+        with attempt.stage("extraction"):
+            scraped_data = scraper.scrape_product(url)
+        attempt.scraped(scraped_data)
+    finally:
+        driver.quit()
+
+    if not scraped_data or not scraped_data.get("ingredients"):
+        raise HTTPException(
+            status_code=404,
+            detail="Could not extract product data or ingredients from URL",
+        )
 
-        # SAVE TO DATABASE (cache for future requests)
-        from database.models import IngredientModel, ProductIngredientModel
+    # Alias map over the comedogenic dictionary
+    canonicalizer = load_canonicalizer(db)
 
-        ingredient_model = IngredientModel(db)
-        product_ingredient_model = ProductIngredientModel(db)
+    # Analyze scraped ingredients
+    analysis = analyze_ingredients(
+        [
+            (ing_name, position)
+            for position, ing_name in enumerate(scraped_data["ingredients"], start=1)
+        ],
+        canonicalizer,
+    )
 
+    # SAVE TO DATABASE (cache for future requests)
+    product_model = ProductModel(db)
+    ingredient_model = IngredientModel(db)
+    product_ingredient_model = ProductIngredientModel(db)
+
+    with attempt.stage("db_write"):
         # Create product record
         product_id = product_model.create(
             scraped_data["product_id"],
             scraped_data["name"],
             scraped_data["category"],
-            request.url,
+            url,
             scraped_data["image_url"],
         )
 
-        # Create ingredient records and link to product
-        if scraped_data["ingredients"]:
-            for position, ingredient_name in enumerate(
-                scraped_data["ingredients"], start=1
-            ):
-                ingredient_id = ingredient_model.create_or_get(ingredient_name)
-                product_ingredient_model.link(product_id, ingredient_id, position)
+        # Create missing ingredient records (existing dictionary flags are
+        # left alone) and link them to the product
+        ingredient_ids = ingredient_model.get_or_create_many(
+            scraped_data["ingredients"]
+        )
+        for position, ingredient_name in enumerate(
+            scraped_data["ingredients"], start=1
+        ):
+            product_ingredient_model.link(
+                product_id, ingredient_ids[ingredient_name], position
+            )
 
-        db.conn.commit()
+        # Store the verdict for filtered browsing
+        product_model.save_safety_status(
+            product_id, analysis["safety_status"], analysis["comedogenic_count"]
+        )
 
-        # Close driver and database
-        if driver:
-            driver.quit()
-        db.close()
+    # The timing row commits with the product
+    attempt.entry["product_id"] = product_id
+    ScrapeLogModel(db).log_attempts([attempt.entry])
+    db.conn.commit()
 
-        return {
-            "id": product_id,
-            "nykaa_product_id": scraped_data["product_id"],
-            "name": scraped_data["name"],
-            "category": scraped_data["category"],
-            "url": request.url,
-            "image_url": scraped_data["image_url"],
-            "safety_status": safety_status,
-            "comedogenic_ingredients": comedogenic_ingredients,
-            "comedogenic_count": len(comedogenic_ingredients),
-            "all_ingredients": all_ingredients,
-        }
+    return {
+        "id": product_id,
+        "nykaa_product_id": scraped_data["product_id"],
+        "name": scraped_data["name"],
+        "category": scraped_data["category"],
+        "url": url,
+        "image_url": scraped_data["image_url"],
+        **analysis,
+    }
+
+
+@app.post("/api/products/scrape", response_model=ScrapeResponse)
+async def scrape_product(request: ScrapeRequest, http_request: Request):
+    """Scrape a Nykaa product URL and analyze ingredients in real-time"""
+    require_database()
+    db = get_db_connection()
+    product_model = ProductModel(db)
+
+    try:
+        # Extract product ID from URL
+        match = re.search(r"/p/(\d+)", request.url)
+        if not match:
+            db.close()
+            raise HTTPException(status_code=400, detail="Invalid Nykaa URL")
+
+        nykaa_product_id = match.group(1)
+
+        # CHECK CACHE FIRST: Query database for existing product by nykaa_product_id
+        db.read_cursor.execute(
+            "SELECT id FROM products WHERE nykaa_product_id = %s", (nykaa_product_id,)
+        )
+        cached_row = db.read_cursor.fetchone()
+
+        if cached_row:
+            demand.record(cached_row[0])
+            # Found in cache - return analysis from database
+            cached_product = product_model.get_product_with_safety_analysis(
+                cached_row[0]
+            )
+            db.close()
+            return fast_json_response(http_request, cached_product)
+
+        # NOT IN CACHE: admit the scrape, then run it off the event loop
+        require_scraper()
+        scrape_rate_limiter.check(http_request.client.host)
+        async with scrape_admission.slot():
+            product = await run_in_threadpool(scrape_and_store, db, request.url)
+
+        db.close()
+        return fast_json_response(http_request, product)
     except HTTPException:
-        if driver:
-            driver.quit()
         db.close()
         raise
     except Exception as e:
@@ -388,9 +1030,137 @@ async def scrape_product(request: ScrapeRequest):
 
         print(f"Error in scrape_product: {str(e)}")
         print(traceback.format_exc())
-        if driver:
-            driver.quit()
         db.close()
         raise HTTPException(
             status_code=500, detail=f"Failed to scrape product: {str(e)}"
         )
+
+
+def scrape_with_connection(url):
+    """scrape_and_store on its own connection (blocking, runs in a thread)"""
+    db = get_db_connection()
+    try:
+        return scrape_and_store(db, url)
+    finally:
+        db.close()
+
+
+@app.post("/api/products/scrape/bulk")
+async def scrape_products_bulk(request: BulkScrapeRequest, http_request: Request):
+    """
+    Scrape many Nykaa URLs, streaming one NDJSON line per URL.
+
+    Cached products come back first from a single lookup; uncached ones are
+    scraped with bounded concurrency and streamed in completion order.
+    Each uncached product costs one rate-limit token; those beyond the
+    client's tokens are rejected with 429.
+    Lines are {"url", "status": "cached" | "scraped", "product"} or
+    {"url", "status": "error", "status_code", "detail"}, plus "retry_after"
+    (seconds) when a retry may succeed.
+    """
+    require_database()
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(request.urls) > SCRAPE_BULK_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SCRAPE_BULK_MAX_URLS} URLs per request",
+        )
+
+    # Group URLs by product so duplicates are looked up and scraped once
+    urls_by_product = {}
+    invalid_urls = []
+    for url in request.urls:
+        match = re.search(r"/p/(\d+)", url)
+        if match:
+            urls_by_product.setdefault(match.group(1), []).append(url)
+        else:
+            invalid_urls.append(url)
+
+    db = get_db_connection()
+    try:
+        cached = ProductModel(db).get_analyses_by_nykaa_ids(urls_by_product)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk scrape failed: {str(e)}")
+    finally:
+        db.close()
+
+    misses = [
+        (nykaa_product_id, urls)
+        for nykaa_product_id, urls in urls_by_product.items()
+        if nykaa_product_id not in cached
+    ]
+
+    # Each miss costs a rate-limit token, as a single scrape would; misses
+    # are then bounded by the per-request concurrency and the shared
+    # admission control
+    rejected_misses, misses_rejected = [], None
+    if misses:
+        try:
+            require_scraper()
+            if not SCRAPE_BULK_CONCURRENCY:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Bulk scrapes are disabled, scrape products one at a time",
+                )
+        except HTTPException as e:
+            misses, rejected_misses, misses_rejected = [], misses, e
+        else:
+            taken, retry_after = scrape_rate_limiter.take(
+                http_request.client.host, len(misses)
+            )
+            if taken < len(misses):
+                misses, rejected_misses = misses[:taken], misses[taken:]
+                misses_rejected = scrape_rate_limiter.rejection(retry_after)
+
+    def error(e):
+        result = {"status": "error", "status_code": e.status_code, "detail": e.detail}
+        if e.headers and "Retry-After" in e.headers:
+            result["retry_after"] = int(e.headers["Retry-After"])
+        return result
+
+    def lines(urls, result):
+        return b"".join(dumps({"url": url, **result}) + b"\n" for url in urls)
+
+    bulk_slots = asyncio.Semaphore(SCRAPE_BULK_CONCURRENCY)
+
+    async def scrape_miss(urls):
+        async with bulk_slots:
+            try:
+                async with scrape_admission.slot():
+                    product = await run_in_threadpool(scrape_with_connection, urls[0])
+                return urls, {"status": "scraped", "product": product}
+            except HTTPException as e:
+                return urls, error(e)
+            except Exception as e:
+                return urls, error(
+                    HTTPException(
+                        status_code=500, detail=f"Failed to scrape product: {str(e)}"
+                    )
+                )
+
+    async def stream():
+        invalid = HTTPException(status_code=400, detail="Invalid Nykaa URL")
+        yield lines(invalid_urls, error(invalid))
+        for nykaa_product_id, product in cached.items():
+            demand.record(product["id"])
+            yield lines(
+                urls_by_product[nykaa_product_id],
+                {"status": "cached", "product": product},
+            )
+
+        for _, urls in rejected_misses:
+            yield lines(urls, error(misses_rejected))
+
+        tasks = [asyncio.create_task(scrape_miss(urls)) for _, urls in misses]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                urls, result = await finished
+                yield lines(urls, result)
+        finally:
+            # Client went away: stop waiting for slots (running scrapes
+            # finish in their threads and close their own connections)
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,135 @@
+"""
+Fast JSON responses for large payloads (product detail, scrape results).
+
+Endpoints return these directly, so FastAPI skips re-validating the dicts
+the models already produce. Bodies are serialized with orjson and
+compressed with brotli or gzip when the client accepts it and the body is
+above COMPRESSION_MIN_SIZE bytes.
+"""
+
+import gzip
+import json
+import os
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this go out uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Suffixes added to strong ETags for each content-coding
+ETAG_ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+
+def dumps(content):
+    """Serialize content to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported content-coding from an Accept-Encoding header.
+
+    Prefers brotli over gzip at equal quality. Returns None for identity.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    best_quality = 0.0
+    for coding in candidates:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body, encoding):
+    """Compress body bytes with the given content-coding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def variant_etag(etag, encoding):
+    """ETag of the variant of a strong ETag sent with a content-coding"""
+    if not encoding:
+        return etag
+    return etag[:-1] + ETAG_ENCODING_SUFFIXES[encoding] + etag[-1]
+
+
+def negotiate_body(request, body):
+    """
+    Compress body bytes for the request's Accept-Encoding.
+
+    :return: (body, content-coding or None for identity)
+    """
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            return compress(body, encoding), encoding
+    return body, None
+
+
+def body_response(body, encoding=None, status_code=200, headers=None):
+    """
+    Response for already serialized (and possibly compressed) JSON bytes.
+
+    :param encoding: Content-coding applied to body, or None
+    :param headers: Extra response headers (an ETag gets an encoding suffix)
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        if "ETag" in headers:
+            headers["ETag"] = variant_etag(headers["ETag"], encoding)
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def fast_json_response(request, content, status_code=200, headers=None):
+    """
+    Serialize content with orjson and negotiate compression.
+
+    :param request: Incoming request (for Accept-Encoding)
+    :param content: JSON-serializable dict/list, already in response shape
+    :param status_code: HTTP status code
+    :param headers: Extra response headers (an ETag gets an encoding suffix)
+    """
+    body, encoding = negotiate_body(request, dumps(content))
+    return body_response(body, encoding, status_code=status_code, headers=headers)
@@ -0,0 +1,116 @@
+"""
+Benchmark reverse ingredient lookups on very common ingredients.
+
+Times ProductIngredientModel.get_products_with_ingredients (keyset pages
+off idx_product_ingredients_ingredient) against a naive join with
+GROUP BY / OFFSET, for ingredients found in more than 50% of products.
+
+Usage: python benchmarks/ingredient_lookup.py [page_size] [repeats]
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import Database, ProductIngredientModel
+
+load_dotenv()
+
+
+def naive_page(db, ingredient_ids, match, offset, limit):
+    """Ad-hoc join the endpoint replaces"""
+    having = "HAVING COUNT(*) = %s" if match == "all" else ""
+    params = [ingredient_ids] + ([len(ingredient_ids)] if match == "all" else [])
+    db.cursor.execute(
+        f"""
+        SELECT p.id, p.name
+        FROM products p
+        JOIN product_ingredients pi ON pi.product_id = p.id
+        WHERE pi.ingredient_id = ANY(%s)
+        GROUP BY p.id, p.name
+        {having}
+        ORDER BY p.id
+        LIMIT %s OFFSET %s
+        """,
+        (*params, limit, offset),
+    )
+    return db.cursor.fetchall()
+
+
+def timed(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    db = Database(db_params)
+    db.connect()
+    model = ProductIngredientModel(db)
+
+    db.cursor.execute("SELECT COUNT(*), MAX(id) FROM products")
+    product_total, max_id = db.cursor.fetchone()
+    db.cursor.execute(
+        """
+        SELECT ingredient_id, COUNT(*) FROM product_ingredients
+        GROUP BY ingredient_id HAVING COUNT(*) > %s
+        ORDER BY COUNT(*) DESC LIMIT 2
+        """,
+        (product_total / 2,),
+    )
+    common = db.cursor.fetchall()
+    if not common:
+        print("No ingredient appears in more than 50% of products")
+        return
+
+    print(f"{product_total} products, page_size={page_size}, repeats={repeats}")
+    for ingredient_id, count in common:
+        print(f"  ingredient {ingredient_id}: {count} products")
+    print()
+
+    ids = [ingredient_id for ingredient_id, _ in common]
+    cold_ms, _ = timed(lambda: model.get_product_counts(ids), 1)
+    warm_ms, _ = timed(lambda: model.get_product_counts(ids), repeats)
+    print(f"product counts: {cold_ms:.2f} ms cold, {warm_ms:.3f} ms cached")
+    print()
+
+    deep_cursor = max_id // 2
+    deep_offset = product_total // 2
+
+    cases = [("single", ids[:1], "any")]
+    if len(ids) > 1:
+        cases += [("any of 2", ids, "any"), ("all of 2", ids, "all")]
+
+    print(f"{'case':<10} {'page':<6} {'keyset ms':>10} {'naive ms':>10}")
+    for label, ingredient_ids, match in cases:
+        for page, cursor, offset in [("first", None, 0), ("deep", deep_cursor, deep_offset)]:
+            keyset_ms, _ = timed(
+                lambda: model.get_products_with_ingredients(
+                    ingredient_ids, match=match, after_id=cursor, limit=page_size
+                ),
+                repeats,
+            )
+            naive_ms, _ = timed(
+                lambda: naive_page(db, ingredient_ids, match, offset, page_size),
+                repeats,
+            )
+            print(f"{label:<10} {page:<6} {keyset_ms:10.2f} {naive_ms:10.2f}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Precision, recall and latency of typo-tolerant ingredient resolution.
+
+Builds a labelled set from the database: every comedogenic alias with
+OCR-style and typing errors (labelled with its ingredient), plus
+the seeded non-comedogenic vocabulary, clean and corrupted (labelled as not
+comedogenic). A fifth of those names is held out of the resolver's
+vocabulary to stand in for ingredients it has never seen.
+
+Compares the exact alias matcher (max_edit_distance=0) with the typo
+tolerant one.
+
+Usage: python benchmarks/ingredient_resolution.py [variants_per_name]
+"""
+
+import os
+import random
+import sys
+import time
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.canonicalizer import IngredientCanonicalizer
+from database.models import Database, IngredientModel
+
+load_dotenv()
+
+# Characters OCR commonly confuses
+OCR_CONFUSIONS = [
+    ("l", "1"),
+    ("i", "l"),
+    ("o", "0"),
+    ("rn", "m"),
+    ("m", "rn"),
+    ("e", "c"),
+    ("t", "f"),
+]
+
+
+def corrupt(name, rng):
+    """name with one OCR-style or typing error"""
+    kind = rng.choice(["ocr", "delete", "insert", "transpose", "substitute"])
+    if kind == "ocr":
+        options = [pair for pair in OCR_CONFUSIONS if pair[0] in name.lower()]
+        if options:
+            source, target = rng.choice(options)
+            index = name.lower().index(source)
+            return name[:index] + target + name[index + len(source) :]
+    letters = [i for i, char in enumerate(name) if char.isalpha()]
+    if not letters:
+        return name
+    i = rng.choice(letters)
+    if kind == "delete":
+        return name[:i] + name[i + 1 :]
+    if kind == "insert":
+        return name[:i] + name[i] + name[i:]
+    if kind == "transpose" and i + 1 < len(name) and name[i + 1].isalpha():
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+    return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1 :]
+
+
+def labelled_names(comedogenic, vocabulary, variants, rng):
+    """[(scraped name, expected ingredient id or None)]"""
+    cases = []
+    for ingredient in comedogenic:
+        for alias in [ingredient["name"], *(ingredient["common_names"] or [])]:
+            for _ in range(variants):
+                misspelled = corrupt(alias, rng)
+                # Longer names get a second error, like real OCR output
+                if len(alias) >= 10 and rng.random() < 0.3:
+                    misspelled = corrupt(misspelled, rng)
+                cases.append((misspelled, ingredient["id"]))
+    for name in vocabulary:
+        cases.append((name, None))
+        for _ in range(variants):
+            cases.append((corrupt(name, rng), None))
+    return cases
+
+
+def evaluate(canonicalizer, cases):
+    """
+    Ingredient-level precision and recall (resolved to the right dictionary
+    entry), verdict-level precision and recall (flagged as comedogenic or
+    not), and per-name latencies in microseconds.
+    """
+    correct = resolved = flagged_correctly = positives = 0
+    latencies = []
+    for name, expected in cases:
+        start = time.perf_counter()
+        canonical = canonicalizer.resolve(name)
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+        positives += expected is not None
+        if canonical is None:
+            continue
+        resolved += 1
+        correct += canonical["id"] == expected
+        flagged_correctly += expected is not None
+
+    latencies.sort()
+    return {
+        "precision": correct / resolved if resolved else 1.0,
+        "recall": correct / positives if positives else 0.0,
+        "verdict_precision": flagged_correctly / resolved if resolved else 1.0,
+        "verdict_recall": flagged_correctly / positives if positives else 0.0,
+        "mean_us": sum(latencies) / len(latencies),
+        "p50_us": latencies[len(latencies) // 2],
+        "p99_us": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main():
+    variants = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rng = random.Random(0)
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    db = Database(db_params)
+    db.connect()
+    ingredient_model = IngredientModel(db)
+    comedogenic = ingredient_model.get_comedogenic()
+    vocabulary = ingredient_model.get_fuzzy_vocabulary()
+    db.close()
+
+    rng.shuffle(vocabulary)
+    holdout = len(vocabulary) // 5
+    seen_vocabulary = vocabulary[holdout:]
+    cases = labelled_names(comedogenic, vocabulary, variants, rng)
+
+    matchers = {}
+    start = time.perf_counter()
+    matchers["exact"] = IngredientCanonicalizer(comedogenic, max_edit_distance=0)
+    build_ms = {"exact": (time.perf_counter() - start) * 1000}
+    start = time.perf_counter()
+    matchers["fuzzy"] = IngredientCanonicalizer(comedogenic, seen_vocabulary)
+    build_ms["fuzzy"] = (time.perf_counter() - start) * 1000
+
+    positives = sum(expected is not None for _, expected in cases)
+    print(
+        f"{len(cases)} names: {positives} misspelled comedogenic, "
+        f"{len(cases) - positives} non-comedogenic ({holdout} held out)"
+    )
+    print()
+    print(
+        f"{'':<8} {'ingredient':>17} {'verdict':>17} {'latency':>24} {'build':>9}"
+    )
+    print(
+        f"{'matcher':<8} {'precision':>9} {'recall':>7} {'precision':>9} {'recall':>7}"
+        f" {'mean us':>8} {'p50 us':>7} {'p99 us':>7} {'ms':>9}"
+    )
+    for label, canonicalizer in matchers.items():
+        result = evaluate(canonicalizer, cases)
+        print(
+            f"{label:<8} {result['precision']:>9.3f} {result['recall']:>7.3f}"
+            f" {result['verdict_precision']:>9.3f} {result['verdict_recall']:>7.3f}"
+            f" {result['mean_us']:>8.1f} {result['p50_us']:>7.1f}"
+            f" {result['p99_us']:>7.1f} {build_ms[label]:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,553 @@
+"""
+End-to-end load test of the API against a local uvicorn.
+
+generate: fill an empty database with a synthetic catalogue
+run:      start benchmarks.stub_app under uvicorn (scraper stubbed), replay
+          a mix of dropdown keystroke searches, paginated search, product
+          detail and scrape cache hits/misses at increasing concurrency,
+          and write per-route throughput and p50/p95/p99 latency as JSON
+compare:  diff two result files and fail on p95 regressions
+
+Usage:
+    python benchmarks/load_test.py generate --products 20000
+    python benchmarks/load_test.py run --output results/HEAD.json
+    python benchmarks/load_test.py compare results/base.json results/HEAD.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from database.models import Database, ProductModel
+
+load_dotenv()
+
+# Generated products use nykaa_product_id >= this; scrape misses use ids above
+LOADTEST_ID_BASE = 50_000_000
+SCRAPE_MISS_ID_BASE = 90_000_000
+
+BRANDS = [
+    "Lakme",
+    "Maybelline",
+    "Minimalist",
+    "Plum",
+    "Dot & Key",
+    "Cetaphil",
+    "Kay Beauty",
+    "Nykaa",
+    "Derma Co",
+    "Biotique",
+    "Mamaearth",
+    "Olay",
+]
+DESCRIPTORS = [
+    "Hydrating",
+    "Matte",
+    "Oil Free",
+    "Brightening",
+    "Vitamin C",
+    "Niacinamide",
+    "Gentle",
+    "Daily",
+    "Ultra Light",
+    "Nourishing",
+]
+PRODUCT_TYPES = [
+    "Moisturiser",
+    "Serum",
+    "Face Wash",
+    "Sunscreen",
+    "Toner",
+    "Foundation",
+    "Primer",
+    "Face Mask",
+    "Cleanser",
+    "Gel Cream",
+]
+CATEGORIES = ["Moisturisers", "Serums", "Cleansers", "Sun Care", "Toners", "Face"]
+COMMON_INGREDIENTS = [
+    "Aqua",
+    "Glycerin",
+    "Butylene Glycol",
+    "Niacinamide",
+    "Dimethicone",
+    "Phenoxyethanol",
+    "Tocopherol",
+    "Xanthan Gum",
+    "Citric Acid",
+    "Sodium Hyaluronate",
+    "Allantoin",
+    "Panthenol",
+]
+COMEDOGENIC_INGREDIENTS = [
+    "Isopropyl Myristate",
+    "Coconut Oil",
+    "Lanolin",
+    "Isopropyl Palmitate",
+    "Laureth-4",
+    "Cocoa Butter",
+]
+
+# Relative weights of the workload mix
+DEFAULT_MIX = {
+    "keystrokes": 30,
+    "search_paginated": 15,
+    "detail": 45,
+    "scrape_hit": 8,
+    "scrape_miss": 2,
+}
+
+
+def get_database():
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+    return database
+
+
+def generate_dataset(product_count, seed=7, force=False):
+    """Insert a synthetic catalogue with realistic name and ingredient spreads"""
+    database = get_database()
+    database.cursor.execute("SELECT COUNT(*) FROM products")
+    if database.cursor.fetchone()[0] and not force:
+        database.close()
+        raise SystemExit("products is not empty; use a dedicated database or --force")
+
+    rng = random.Random(seed)
+    extracts = [f"Botanical Extract {i}" for i in range(2000)]
+    ingredient_rows = [(name, False) for name in COMMON_INGREDIENTS + extracts] + [
+        (name, True) for name in COMEDOGENIC_INGREDIENTS
+    ]
+    execute_values(
+        database.cursor,
+        """
+        INSERT INTO ingredients (name, is_comedogenic) VALUES %s
+        ON CONFLICT (name) DO NOTHING
+        """,
+        ingredient_rows,
+    )
+    database.cursor.execute("SELECT name, id FROM ingredients")
+    ingredient_ids = dict(database.cursor.fetchall())
+
+    product_rows = []
+    for i in range(product_count):
+        nykaa_id = str(LOADTEST_ID_BASE + i)
+        name = (
+            f"{rng.choice(BRANDS)} {rng.choice(DESCRIPTORS)} "
+            f"{rng.choice(PRODUCT_TYPES)} {rng.choice([30, 50, 100, 200])}ml"
+        )
+        product_rows.append(
+            (
+                nykaa_id,
+                name,
+                rng.choice(CATEGORIES),
+                f"https://www.nykaa.com/loadtest/p/{nykaa_id}",
+                "https://example.com/p.jpg",
+            )
+        )
+    product_ids = [
+        row[0]
+        for row in execute_values(
+            database.cursor,
+            """
+            INSERT INTO products (nykaa_product_id, name, category, url, image_url)
+            VALUES %s RETURNING id
+            """,
+            product_rows,
+            page_size=1000,
+            fetch=True,
+        )
+    ]
+
+    links = []
+    for product_id in product_ids:
+        names = ["Aqua"] + rng.sample(COMMON_INGREDIENTS[1:], rng.randint(4, 9))
+        names += rng.sample(extracts, rng.randint(5, 25))
+        if rng.random() < 0.35:
+            names.insert(
+                rng.randint(2, len(names)), rng.choice(COMEDOGENIC_INGREDIENTS)
+            )
+        links += [
+            (product_id, ingredient_ids[name], position)
+            for position, name in enumerate(names, start=1)
+        ]
+    execute_values(
+        database.cursor,
+        "INSERT INTO product_ingredients (product_id, ingredient_id, position) VALUES %s",
+        links,
+        page_size=5000,
+    )
+
+    ProductModel(database).refresh_safety_status(product_ids)
+    database.conn.commit()
+    database.close()
+    print(f"✓ Generated {len(product_ids)} products, {len(links)} ingredient links")
+
+
+def load_workload_data():
+    """Product ids, nykaa ids and search words to drive requests from"""
+    database = get_database()
+    database.cursor.execute(
+        "SELECT id, nykaa_product_id, name FROM products ORDER BY id"
+    )
+    rows = database.cursor.fetchall()
+    database.close()
+    if not rows:
+        raise SystemExit("No products; run the generate command first")
+
+    words = sorted(
+        {
+            word.lower()
+            for _, _, name in rows[:5000]
+            for word in name.split()
+            if len(word) >= 4 and word.isalpha()
+        }
+    )
+    return {
+        "product_ids": [row[0] for row in rows],
+        "nykaa_ids": [row[1] for row in rows],
+        "words": words,
+    }
+
+
+class Recorder:
+    """Latencies and status codes per route"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.throttled = {}
+
+    def record(self, route, seconds, status):
+        self.latencies.setdefault(route, []).append(seconds * 1000)
+        # 429/503 from scrape admission control are expected under load
+        if status in (429, 503):
+            self.throttled[route] = self.throttled.get(route, 0) + 1
+        elif status >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(
+        0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, throttled, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throttled": throttled,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+async def timed_request(client, recorder, route, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.record(route, time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def run_action(client, recorder, data, action, rng):
+    """One user action: may issue several requests (keystrokes)"""
+    if action == "keystrokes":
+        word = rng.choice(data["words"])
+        for end in range(2, len(word) + 1):
+            await timed_request(
+                client,
+                recorder,
+                "search",
+                "GET",
+                "/api/products/search",
+                params={"q": word[:end], "limit": 10},
+            )
+    elif action == "search_paginated":
+        query = " ".join(rng.sample(data["words"], 2))
+        await timed_request(
+            client,
+            recorder,
+            "search_paginated",
+            "GET",
+            "/api/products/search/paginated",
+            params={"q": query, "page": rng.randint(1, 3), "page_size": 20},
+        )
+    elif action == "detail":
+        # Popularity is heavily skewed: most views hit a few products
+        index = min(int(rng.paretovariate(1.2)) - 1, len(data["product_ids"]) - 1)
+        await timed_request(
+            client,
+            recorder,
+            "detail",
+            "GET",
+            f"/api/products/{data['product_ids'][index]}",
+            headers={"Accept-Encoding": "br, gzip"},
+        )
+    elif action == "scrape_hit":
+        nykaa_id = rng.choice(data["nykaa_ids"])
+        await timed_request(
+            client,
+            recorder,
+            "scrape_hit",
+            "POST",
+            "/api/products/scrape",
+            json={"url": f"https://www.nykaa.com/loadtest/p/{nykaa_id}"},
+        )
+    elif action == "scrape_miss":
+        nykaa_id = SCRAPE_MISS_ID_BASE + rng.randrange(10**7)
+        await timed_request(
+            client,
+            recorder,
+            "scrape_miss",
+            "POST",
+            "/api/products/scrape",
+            json={"url": f"https://www.nykaa.com/loadtest/p/{nykaa_id}"},
+        )
+
+
+async def run_stage(base_url, data, concurrency, duration, mix, seed):
+    """Run concurrency virtual users for duration seconds"""
+    import httpx
+
+    recorder = Recorder()
+    actions = list(mix)
+    weights = [mix[action] for action in actions]
+    deadline = time.perf_counter() + duration
+
+    async def user(user_id):
+        rng = random.Random(seed * 1000 + user_id)
+        while time.perf_counter() < deadline:
+            action = rng.choices(actions, weights)[0]
+            await run_action(client, recorder, data, action, rng)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    routes = {
+        route: summarize(
+            latencies,
+            recorder.errors.get(route, 0),
+            recorder.throttled.get(route, 0),
+            elapsed,
+        )
+        for route, latencies in sorted(recorder.latencies.items())
+    }
+    all_latencies = [
+        ms for latencies in recorder.latencies.values() for ms in latencies
+    ]
+    return {
+        "concurrency": concurrency,
+        "routes": routes,
+        "total": summarize(
+            all_latencies,
+            sum(recorder.errors.values()),
+            sum(recorder.throttled.values()),
+            elapsed,
+        ),
+    }
+
+
+def start_server(port):
+    """Start benchmarks.stub_app under uvicorn and wait for /api/health"""
+    import httpx
+
+    env = {
+        **os.environ,
+        "API_PROFILE": "full",
+        # Admission control should not cap a load test of the scrape path
+        "SCRAPE_RATE_PER_MINUTE": os.getenv("SCRAPE_RATE_PER_MINUTE", "100000"),
+        "SCRAPE_BURST": os.getenv("SCRAPE_BURST", "100000"),
+        "SCRAPE_PAGE_LOAD_DELAY": os.getenv("SCRAPE_PAGE_LOAD_DELAY", "0"),
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "benchmarks.stub_app:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("API server did not become healthy")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_stage(stage):
+    print(f"\nconcurrency {stage['concurrency']}")
+    print(
+        f"  {'route':<17} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>4} {'429/503':>7}"
+    )
+    for route, stats in [*stage["routes"].items(), ("TOTAL", stage["total"])]:
+        print(
+            f"  {route:<17} {stats['requests']:6d} {stats['rps']:8.1f}"
+            f" {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}"
+            f" {stats['errors']:4d} {stats['throttled']:7d}"
+        )
+
+
+def run_load_test(args):
+    data = load_workload_data()
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        action, _, weight = item.partition("=")
+        if action not in mix:
+            raise SystemExit(f"Unknown action in --mix: {action}")
+        mix[action] = float(weight)
+
+    process = None
+    base_url = args.url
+    if not base_url:
+        process, base_url = start_server(args.port)
+
+    stages = []
+    try:
+        for concurrency in args.concurrency:
+            stage = asyncio.run(
+                run_stage(base_url, data, concurrency, args.duration, mix, args.seed)
+            )
+            print_stage(stage)
+            stages.append(stage)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "products": len(data["product_ids"]),
+            "duration_s": args.duration,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n✓ Results written to {args.output}")
+
+
+def compare_results(base_path, new_path, threshold):
+    """Print p95 deltas per route/concurrency; exit 1 on regressions over threshold"""
+    with open(base_path) as f:
+        base = {stage["concurrency"]: stage for stage in json.load(f)["stages"]}
+    with open(new_path) as f:
+        new = {stage["concurrency"]: stage for stage in json.load(f)["stages"]}
+
+    regressions = 0
+    print(f"{'conc':>4} {'route':<17} {'base p95':>9} {'new p95':>9} {'delta':>8}")
+    for concurrency in sorted(base.keys() & new.keys()):
+        routes = base[concurrency]["routes"].keys() & new[concurrency]["routes"].keys()
+        for route in sorted(routes):
+            before = base[concurrency]["routes"][route]["p95_ms"]
+            after = new[concurrency]["routes"][route]["p95_ms"]
+            delta = (after - before) / before if before else 0.0
+            flag = ""
+            if delta > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(
+                f"{concurrency:4d} {route:<17} {before:9.2f} {after:9.2f}"
+                f" {delta * 100:+7.1f}%{flag}"
+            )
+
+    if regressions:
+        print(f"\n{regressions} p95 regressions above {threshold * 100:.0f}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API load-testing harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate a synthetic catalogue")
+    generate.add_argument("--products", type=int, default=20000)
+    generate.add_argument("--seed", type=int, default=7)
+    generate.add_argument(
+        "--force", action="store_true", help="Allow a non-empty database"
+    )
+
+    run = commands.add_parser("run", help="Run the load test")
+    run.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    run.add_argument("--duration", type=float, default=15, help="Seconds per stage")
+    run.add_argument(
+        "--mix", nargs="*", help="Override weights, e.g. detail=60 scrape_miss=0"
+    )
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument(
+        "--url", help="Target a running server instead of starting the stub app"
+    )
+    run.add_argument("--output", help="Write results JSON here")
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed p95 increase"
+    )
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate_dataset(args.products, args.seed, args.force)
+    elif args.command == "run":
+        run_load_test(args)
+    else:
+        compare_results(args.base, args.new, args.threshold)
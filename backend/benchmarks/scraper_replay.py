@@ -0,0 +1,112 @@
+"""
+Benchmark scraper extraction (and optionally ingest) from a recording.
+
+Replays a crawl recorded with scraper/replay.py through URLCollector and
+ProductScraper with no browser or network, and reports throughput. With
+--ingest the extracted products are also loaded through the scrape log
+loader's batch path, inside a transaction that is rolled back.
+
+Usage: python benchmarks/scraper_replay.py recording/ [--repeat 5] [--ingest]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "scraper"))
+from product_scraper import ProductScraper
+from replay import ReplayDriver
+from url_scraper import URLCollector
+
+load_dotenv()
+
+
+def replay_extraction(path):
+    """Replay the crawl once; return (listing urls, products, per-product seconds)"""
+    driver = ReplayDriver(path)
+    collector = URLCollector(driver, page_load_delay=0)
+    scraper = ProductScraper(driver)
+
+    listing_urls = collector.collect_all_product_urls(driver.start_url)
+    product_urls = [url for url in driver.urls if url != driver.start_url]
+
+    products = []
+    timings = []
+    for url in product_urls:
+        start = time.perf_counter()
+        driver.get(url)
+        products.append(scraper.scrape_product(url))
+        timings.append(time.perf_counter() - start)
+    driver.quit()
+    return listing_urls, products, timings
+
+
+def ingest(products):
+    """Load products through the batch loader, then roll back"""
+    from database.load_scrape_log import load_records
+    from database.models import Database
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+
+    records = [
+        {"url": product["url"], "product": product}
+        for product in products
+        if product.get("product_id") and product.get("name")
+    ]
+    start = time.perf_counter()
+    links = load_records(database, records)
+    elapsed = time.perf_counter() - start
+    database.conn.rollback()
+    database.close()
+    return len(records), links, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded crawl")
+    parser.add_argument("path", help="Recording directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ingest", action="store_true", help="Also time DB ingest")
+    args = parser.parse_args()
+
+    durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        listing_urls, products, timings = replay_extraction(args.path)
+        durations.append(time.perf_counter() - start)
+
+    with_ingredients = sum(1 for product in products if product["ingredients"])
+    print(f"{len(listing_urls)} listing URLs, {len(products)} product pages")
+    print(f"  - {with_ingredients} with ingredients")
+    print(
+        f"  - best of {args.repeat}: {min(durations) * 1000:.1f} ms per crawl,"
+        f" {len(products) / min(durations):.0f} products/sec"
+    )
+    if timings:
+        print(
+            f"  - extraction: {statistics.median(timings) * 1e6:.0f} us median,"
+            f" {max(timings) * 1e6:.0f} us max per product"
+        )
+
+    if args.ingest:
+        records, links, elapsed = ingest(products)
+        print(
+            f"  - ingest: {records} products, {links} links in {elapsed * 1000:.1f} ms"
+            " (rolled back)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark product detail serialization and bytes on the wire.
+
+Compares the default FastAPI path (Pydantic response_model validation +
+stdlib JSON) with api.responses.fast_json_response (orjson, no
+re-validation), and reports body size for identity, gzip and brotli.
+
+Usage: python benchmarks/serialization.py [ingredient_count] [iterations]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.main import ProductDetailResponse
+from api.responses import brotli, compress, dumps
+
+
+def make_product(ingredient_count):
+    """Build a detail payload shaped like get_product_with_safety_analysis"""
+    all_ingredients = [
+        {
+            "name": f"Ingredient Number {i} Extract (Ci {77000 + i})",
+            "is_comedogenic": i % 12 == 0,
+            "position": i,
+        }
+        for i in range(1, ingredient_count + 1)
+    ]
+    comedogenic = [ing["name"] for ing in all_ingredients if ing["is_comedogenic"]]
+    return {
+        "id": 1234,
+        "nykaa_product_id": "20245932",
+        "name": "Kay Beauty Jelly Lip & Cheek Popsicle Wand",
+        "category": "Lip & Cheek Tint",
+        "url": "https://www.nykaa.com/kay-beauty-jelly-lip-cheek-popsicle-wand/p/20245932",
+        "image_url": "https://images-static.nykaa.com/media/catalog/product/2/0/20245932.jpg",
+        "safety_status": "unsafe" if comedogenic else "safe",
+        "comedogenic_ingredients": comedogenic,
+        "comedogenic_count": len(comedogenic),
+        "all_ingredients": all_ingredients,
+    }
+
+
+def pydantic_stdlib(product):
+    """What a response_model endpoint does: validate, dump, json.dumps"""
+    model = ProductDetailResponse.model_validate(product)
+    return json.dumps(model.model_dump(mode="json")).encode("utf-8")
+
+
+def main():
+    ingredient_count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    product = make_product(ingredient_count)
+
+    print(f"Product with {ingredient_count} ingredients, {iterations} iterations")
+    print()
+
+    for label, func in [
+        ("pydantic + json", pydantic_stdlib),
+        ("fast (orjson)", dumps),
+    ]:
+        seconds = timeit.timeit(lambda: func(product), number=iterations)
+        print(f"{label:<18} {seconds / iterations * 1e6:8.1f} us/response")
+
+    print()
+    body = dumps(product)
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        seconds = timeit.timeit(lambda: compress(body, encoding), number=iterations)
+        size = len(compress(body, encoding))
+        print(
+            f"{encoding or 'identity':<18} {size:8d} bytes"
+            f" {seconds / iterations * 1e6:8.1f} us/compress"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare node memory for per-worker vs shared (mmap'd) ingredient dictionaries.
+
+Builds a synthetic dictionary, then starts N worker processes that either
+build their own IngredientCanonicalizer or attach to the compiled file, and
+resolve every alias once. Reports the private (unshared) memory each
+worker adds and the proportional total across workers (Linux only, from
+/proc/<pid>/smaps_rollup).
+
+Usage: python benchmarks/shared_dictionary.py [--ingredients 50000] [--workers 1 4 8]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from database.canonicalizer import IngredientCanonicalizer
+from database.shared_dictionary import write_shared_dictionary
+
+WORKER = """
+import json, sys
+sys.path.append({backend!r})
+from database.canonicalizer import IngredientCanonicalizer
+from database.shared_dictionary import attach_shared_dictionary
+
+with open({words!r}) as f:
+    names = f.read().splitlines()
+if {mode!r} == "local":
+    canonicalizer = IngredientCanonicalizer(
+        json.load(open({source!r})), max_edit_distance=0
+    )
+else:
+    canonicalizer = attach_shared_dictionary({path!r})
+resolved = sum(canonicalizer.resolve(name) is not None for name in names)
+print(resolved, flush=True)
+sys.stdin.read()
+"""
+
+
+def synthetic_dictionary(count, seed=0):
+    """count ingredients with a name and two common names each"""
+    rng = random.Random(seed)
+    syllables = ["lau", "ryl", "myr", "is", "tate", "cet", "ear", "oxy", "glyc", "di"]
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    return [
+        {
+            "id": index + 1,
+            "name": f"{word()} {word()} {index}",
+            "common_names": [f"{word()} {index}", f"{word()}-{index}"],
+        }
+        for index in range(count)
+    ]
+
+
+def memory_kb(pid):
+    """(private, proportional) memory of a process in kB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return private, fields.get("Pss", 0)
+
+
+def run_workers(mode, workers, files):
+    code = WORKER.format(backend=BACKEND_DIR, mode=mode, **files)
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", code],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        usage = [memory_kb(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ingredients", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    ingredients = synthetic_dictionary(args.ingredients)
+    # Exact lookups only: a typo index over this many synthetic names
+    # would dominate build time without changing the comparison
+    canonicalizer = IngredientCanonicalizer(ingredients, max_edit_distance=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "source": os.path.join(tmp, "ingredients.json"),
+            "words": os.path.join(tmp, "names.txt"),
+            "path": os.path.join(tmp, "dictionary.bin"),
+        }
+        with open(files["source"], "w") as f:
+            json.dump(ingredients, f)
+        with open(files["words"], "w") as f:
+            f.write("\n".join(canonicalizer.aliases))
+        write_shared_dictionary(canonicalizer, "benchmark", files["path"])
+
+        print(
+            f"{len(canonicalizer)} aliases, compiled file "
+            f"{os.path.getsize(files['path']) / 1024:.0f} kB"
+        )
+        print()
+        print(
+            f"{'mode':<7} {'workers':>7} {'private MB/worker':>18} {'total PSS MB':>13}"
+        )
+        for workers in args.workers:
+            for mode in ("local", "shared"):
+                usage = run_workers(mode, workers, files)
+                private = sum(u[0] for u in usage) / len(usage) / 1024
+                pss = sum(u[1] for u in usage) / 1024
+                print(f"{mode:<7} {workers:>7} {private:>18.1f} {pss:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure API worker startup time and memory for each profile.
+
+Imports api.main in a fresh interpreter per run with API_PROFILE set,
+and reports import time, peak RSS and whether Selenium was loaded.
+
+Usage: python benchmarks/startup.py [runs]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import api.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "selenium": "selenium" in sys.modules,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def probe(profile):
+    env = {**os.environ, "API_PROFILE": profile}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{runs} runs per profile (median)")
+    print()
+    print(f"{'profile':<8} {'import ms':>10} {'RSS MB':>8} {'modules':>8} selenium")
+    for profile in ("read", "full"):
+        results = sorted((probe(profile) for _ in range(runs)), key=lambda r: r["import_ms"])
+        median = results[len(results) // 2]
+        print(
+            f"{profile:<8} {median['import_ms']:10.1f} {median['rss_mb']:8.1f}"
+            f" {median['modules']:8d} {median['selenium']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
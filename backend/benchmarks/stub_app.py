@@ -0,0 +1,70 @@
+"""
+The API app with the Selenium scraper replaced by a stub, for load tests.
+
+Uncached scrapes return a deterministic product for the URL's product ID
+after STUB_SCRAPE_SECONDS, instead of starting Chrome.
+
+Usage: uvicorn benchmarks.stub_app:app  (from backend/)
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scraper.config
+import scraper.product_scraper
+from scraper.product_scraper import ProductScraper
+
+STUB_SCRAPE_SECONDS = float(os.getenv("STUB_SCRAPE_SECONDS", "0.2"))
+
+STUB_INGREDIENTS = [
+    "Aqua",
+    "Glycerin",
+    "Niacinamide",
+    "Isopropyl Myristate",
+    "Cetearyl Alcohol",
+    "Dimethicone",
+    "Tocopherol",
+    "Phenoxyethanol",
+    "Coconut Oil",
+    "Xanthan Gum",
+    "Sodium Hyaluronate",
+    "Citric Acid",
+]
+
+
+class StubDriver:
+    """Accepts the calls scrape_and_store makes on a WebDriver"""
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+class StubProductScraper:
+    """Deterministic stand-in for ProductScraper"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def scrape_product(self, url):
+        time.sleep(STUB_SCRAPE_SECONDS)
+        product_id = ProductScraper.extract_product_id(url)
+        rng = random.Random(product_id)
+        return {
+            "product_id": product_id,
+            "name": f"Stub Product {product_id}",
+            "category": "Stub",
+            "image_url": "https://example.com/stub.jpg",
+            "ingredients": ["Aqua"] + rng.sample(STUB_INGREDIENTS[1:], 6),
+        }
+
+
+scraper.config.setup_driver = StubDriver
+scraper.product_scraper.ProductScraper = StubProductScraper
+
+from api.main import app  # noqa: E402
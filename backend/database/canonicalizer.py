@@ -0,0 +1,281 @@
+"""
+Alias-aware ingredient canonicalization.
+
+Builds a normalized alias -> canonical ingredient hash map from the
+comedogenic dictionary (ingredients.name and ingredients.common_names),
+so each scraped ingredient resolves with a handful of dict lookups
+instead of a substring scan over the whole dictionary.
+
+Names that match no alias exactly fall back to a SymSpell-style deletion
+index: every alias is stored under each string reachable by deleting up
+to its allowed number of characters, so misspellings and OCR errors
+("isopropyl myristrate") are found with dict lookups on the scraped
+name's own deletions and verified with a bounded edit distance. Known
+non-comedogenic names compete in the same index, so a name closest to
+one of them ("squalane", not "squalene") does not resolve.
+"""
+
+import re
+
+# CI colour index codes, e.g. "ci 77491" or "ci77492"
+CI_CODE_PATTERN = re.compile(r"\bci\s*\d{5}\b")
+
+# Anything that is not a letter or digit separates words
+NON_WORD_PATTERN = re.compile(r"[^0-9a-z]+")
+
+DIGITS_PATTERN = re.compile(r"\d+")
+
+# Largest edit distance tolerated for typo matching
+MAX_EDIT_DISTANCE = 2
+
+# Shortest alias allowed 1 and 2 edits; shorter names must match exactly,
+# since a single edit turns short names into other real ingredients
+# ("cocoa" is one edit from "cocos", coconut)
+ONE_EDIT_MIN_LENGTH = 6
+TWO_EDIT_MIN_LENGTH = 10
+
+# Characters of each name used to build deletion variants (as in SymSpell)
+PREFIX_LENGTH = 7
+
+# Resolved names remembered per canonicalizer; scraped ingredient names
+# repeat across products, and unresolved names cost a typo search each
+RESOLVE_CACHE_SIZE = 50000
+
+
+def normalize_ingredient_name(name):
+    """
+    Normalize an ingredient name for alias lookup.
+
+    Lowercases, drops CI codes, brackets and punctuation, and collapses
+    whitespace.
+
+    Examples:
+    - "Iron Oxides (CI 77491, CI 77492)" -> "iron oxides"
+    - "Laureth-4" -> "laureth 4"
+    - "[+/- Mica]" -> "mica"
+    """
+    normalized = CI_CODE_PATTERN.sub(" ", name.lower())
+    normalized = NON_WORD_PATTERN.sub(" ", normalized)
+    return " ".join(normalized.split())
+
+
+def allowed_edit_distance(key, max_edit_distance=MAX_EDIT_DISTANCE):
+    """Edits tolerated for a normalized name of this length"""
+    if len(key) >= TWO_EDIT_MIN_LENGTH:
+        return min(2, max_edit_distance)
+    if len(key) >= ONE_EDIT_MIN_LENGTH:
+        return min(1, max_edit_distance)
+    return 0
+
+
+def delete_variants(key, distance):
+    """
+    key's prefix and every string left by deleting up to distance
+    characters from it. Indexing only the prefix keeps the index small
+    and lookups cheap; candidates are verified against the full name.
+    """
+    variants = {key[:PREFIX_LENGTH]}
+    level = variants
+    for _ in range(distance):
+        level = {
+            variant[:i] + variant[i + 1 :]
+            for variant in level
+            if len(variant) > 1
+            for i in range(len(variant))
+        }
+        variants |= level
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or limit + 1 once it is certain to exceed limit.
+    Only the diagonal band of width 2 * limit + 1 is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+
+    over = limit + 1
+    previous_previous = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+                and previous_previous[j - 2] + 1 < value
+            ):
+                value = previous_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous_previous, previous = previous, current
+    return min(previous[-1], over)
+
+
+class IngredientCanonicalizer:
+    """Resolve scraped ingredient names to canonical dictionary ingredients"""
+
+    def __init__(
+        self,
+        ingredients,
+        vocabulary=(),
+        max_edit_distance=MAX_EDIT_DISTANCE,
+        resolve_cache_size=RESOLVE_CACHE_SIZE,
+    ):
+        """
+        :param ingredients: Iterable of dicts with id, name and common_names
+                            (as returned by IngredientModel.get_comedogenic)
+        :param vocabulary: Seeded non-comedogenic names, which only compete in
+                           typo matching (IngredientModel.get_fuzzy_vocabulary)
+        :param max_edit_distance: Typo tolerance; 0 disables fuzzy matching
+        :param resolve_cache_size: Resolved names remembered by this instance
+        """
+        self.aliases = {}
+        self.known = set()
+        self.deletes = {}
+        self._resolved = {}
+        self.resolve_cache_size = resolve_cache_size
+        self.max_alias_words = 1
+        self.max_edit_distance = max_edit_distance
+
+        for ingredient in ingredients:
+            canonical = {"id": ingredient["id"], "name": ingredient["name"]}
+            for alias in [ingredient["name"], *(ingredient.get("common_names") or [])]:
+                key = normalize_ingredient_name(alias)
+                if not key:
+                    continue
+                # First definition wins so canonical names beat later aliases
+                self.aliases.setdefault(key, canonical)
+                self.max_alias_words = max(self.max_alias_words, len(key.split()))
+
+        if not max_edit_distance:
+            return
+
+        for name in vocabulary:
+            key = normalize_ingredient_name(name)
+            if key and key not in self.aliases:
+                self.known.add(key)
+
+        for key in [*self.aliases, *self.known]:
+            distance = allowed_edit_distance(key, max_edit_distance)
+            for variant in delete_variants(key, distance):
+                self.deletes.setdefault(variant, []).append(key)
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def lookup(self, key):
+        """Canonical ingredient for an already normalized alias, or None"""
+        return self.aliases.get(key)
+
+    def is_known(self, key):
+        """Whether a normalized name is a known non-comedogenic ingredient"""
+        return key in self.known
+
+    def delete_candidates(self, variant):
+        """Aliases and known names stored under a deletion variant"""
+        return self.deletes.get(variant, ())
+
+    def lookup_fuzzy(self, key):
+        """
+        Canonical ingredient for the closest alias within the allowed edit
+        distance, or None. Numbers must match exactly (laureth 4 is not
+        laureth 2); a closest known non-comedogenic name, or a tie between
+        different ingredients, resolves to None.
+        """
+        distance = allowed_edit_distance(key, self.max_edit_distance)
+        if not distance:
+            return None
+
+        digits = DIGITS_PATTERN.findall(key)
+        best_distance = distance + 1
+        best = []
+        seen = set()
+        for variant in delete_variants(key, distance):
+            for alias in self.delete_candidates(variant):
+                if alias in seen:
+                    continue
+                seen.add(alias)
+                if DIGITS_PATTERN.findall(alias) != digits:
+                    continue
+                limit = min(distance, allowed_edit_distance(alias, distance))
+                found = edit_distance(key, alias, limit)
+                if found > limit:
+                    continue
+                if found < best_distance:
+                    best_distance, best = found, [alias]
+                elif found == best_distance:
+                    best.append(alias)
+
+        matches = [self.lookup(alias) for alias in best]
+        if not matches or any(
+            m is None or m["id"] != matches[0]["id"] for m in matches
+        ):
+            return None
+        return matches[0]
+
+    def _runs(self, words):
+        """Whole name, then runs of up to max_alias_words words, longest first"""
+        yield " ".join(words)
+        for length in range(min(self.max_alias_words, len(words)), 0, -1):
+            for start in range(len(words) - length + 1):
+                if length < len(words):
+                    yield " ".join(words[start : start + length])
+
+    def resolve(self, name):
+        """
+        Return the canonical ingredient for a scraped name, or None.
+
+        Tries the whole normalized name, then every run of up to
+        max_alias_words consecutive words (longest first), so
+        "Isopropyl Myristate 5%" still resolves to "Isopropyl Myristate".
+        Only if nothing matches exactly are the same runs retried with
+        typo tolerance. Cost depends on the length of the name, not the
+        dictionary size.
+        """
+        if name in self._resolved:
+            return self._resolved[name]
+        if len(self._resolved) >= self.resolve_cache_size:
+            self._resolved.clear()
+        self._resolved[name] = canonical = self._resolve(name)
+        return canonical
+
+    def _resolve(self, name):
+        key = normalize_ingredient_name(name)
+        if not key:
+            return None
+
+        canonical = self.lookup(key)
+        if canonical is not None:
+            return canonical
+
+        words = key.split()
+        runs = list(self._runs(words))
+        for run in runs[1:]:
+            canonical = self.lookup(run)
+            if canonical is not None:
+                return canonical
+
+        if self.max_edit_distance and not self.is_known(key):
+            for run in runs:
+                canonical = self.lookup_fuzzy(run)
+                if canonical is not None:
+                    return canonical
+        return None
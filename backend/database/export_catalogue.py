@@ -0,0 +1,195 @@
+"""
+Stream the full product catalogue with ingredients and verdicts.
+
+Rows come from a psycopg2 named (server-side) cursor fetched itersize rows
+at a time, so memory stays flat however many products are exported.
+Formats: NDJSON, CSV, and Parquet (row groups, requires pyarrow).
+
+Usage: python database/export_catalogue.py --format ndjson --output products.ndjson
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import Database
+
+load_dotenv()
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+
+EXPORT_FIELDS = [
+    "id",
+    "nykaa_product_id",
+    "name",
+    "category",
+    "url",
+    "image_url",
+    "safety_status",
+    "comedogenic_count",
+    "updated_at",
+    "ingredients",
+]
+
+
+def iter_catalogue(database, itersize=2000):
+    """
+    Yield every product as a dict, in id order, with its ingredient names.
+
+    Ingredients are aggregated per product through a LATERAL subquery so
+    the outer scan streams off the primary key instead of sorting the
+    whole join.
+    """
+    with database.read_conn.cursor(name="export_catalogue") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(
+            """
+            SELECT
+                p.id, p.nykaa_product_id, p.name, p.category, p.url, p.image_url,
+                p.safety_status, p.comedogenic_count, p.updated_at,
+                COALESCE(ing.names, '{}')
+            FROM products p
+            LEFT JOIN LATERAL (
+                SELECT array_agg(i.name ORDER BY pi.position NULLS LAST, i.name) AS names
+                FROM product_ingredients pi
+                JOIN ingredients i ON i.id = pi.ingredient_id
+                WHERE pi.product_id = p.id
+            ) ing ON TRUE
+            ORDER BY p.id
+            """
+        )
+        for row in cursor:
+            yield {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "url": row[4],
+                "image_url": row[5],
+                "safety_status": row[6],
+                "comedogenic_count": row[7],
+                "updated_at": row[8].isoformat() if row[8] else None,
+                "ingredients": row[9],
+            }
+
+
+def ndjson_chunks(rows, rows_per_chunk=500):
+    """Encode rows as NDJSON, yielding bytes a chunk of rows at a time"""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row, ensure_ascii=False))
+        if len(buffer) >= rows_per_chunk:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+
+def csv_chunks(rows, rows_per_chunk=500):
+    """Encode rows as CSV (ingredients pipe-separated), yielding bytes chunks"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow({**row, "ingredients": "|".join(row["ingredients"])})
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_parquet(rows, path, row_group_size=10000):
+    """Write rows to a Parquet file, one row group per row_group_size rows"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema(
+        [
+            ("id", pa.int32()),
+            ("nykaa_product_id", pa.string()),
+            ("name", pa.string()),
+            ("category", pa.string()),
+            ("url", pa.string()),
+            ("image_url", pa.string()),
+            ("safety_status", pa.string()),
+            ("comedogenic_count", pa.int32()),
+            ("updated_at", pa.string()),
+            ("ingredients", pa.list_(pa.string())),
+        ]
+    )
+
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def count_rows(rows, counter):
+    """Pass rows through, counting them into counter["rows"]"""
+    for row in rows:
+        counter["rows"] += 1
+        yield row
+
+
+def export_catalogue(export_format, output, itersize=2000, row_group_size=10000):
+    """Export the catalogue to a file and report throughput"""
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+
+    counter = {"rows": 0}
+    rows = count_rows(iter_catalogue(database, itersize=itersize), counter)
+    start = time.perf_counter()
+
+    if export_format == "parquet":
+        write_parquet(rows, output, row_group_size=row_group_size)
+    else:
+        chunks = (
+            ndjson_chunks(rows) if export_format == "ndjson" else csv_chunks(rows)
+        )
+        with open(output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    elapsed = time.perf_counter() - start
+    database.close()
+
+    print(f"✓ Exported {counter['rows']} products to {output}")
+    print(f"  - {elapsed:.2f}s, {counter['rows'] / elapsed:.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the product catalogue")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--output", required=True, help="Output file path")
+    parser.add_argument(
+        "--itersize", type=int, default=2000, help="Rows per server-side fetch"
+    )
+    parser.add_argument(
+        "--row-group-size", type=int, default=10000, help="Parquet rows per group"
+    )
+    args = parser.parse_args()
+
+    export_catalogue(args.format, args.output, args.itersize, args.row_group_size)
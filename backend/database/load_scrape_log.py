@@ -0,0 +1,336 @@
+"""
+Load a scrape log (see scraper/scrape_log.py) into Postgres.
+
+Records are committed in large batches: one transaction creates the
+products, upserts every ingredient name in the batch at once, links them,
+refreshes the batch's verdicts and advances the log's byte offset in
+scrape_log_offsets (migration 005). A crash either loses the whole batch
+or records it, so each record is loaded exactly once; rerunning resumes
+from the stored offset.
+
+Records that cannot be loaded (unparseable lines, products without an ID
+or name, malformed attempt timings) are skipped and appended to a
+dead-letter file next to the log, so one bad line never blocks the
+records after it. The dead letters are written before the batch commits,
+so a crash can repeat them but never lose them.
+
+Usage: python database/load_scrape_log.py scrape_log.ndjson [--follow]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import (
+    Database,
+    IngredientModel,
+    ProductIngredientModel,
+    ProductModel,
+    ScrapeLogModel,
+)
+from scraper.scrape_log import read_scrape_log
+from scraper.timing import STAGES
+
+load_dotenv()
+
+
+def lock_offset(database, log_key):
+    """Lock this log's offset row for the current transaction and return it"""
+    database.cursor.execute(
+        """
+        INSERT INTO scrape_log_offsets (log_path) VALUES (%s)
+        ON CONFLICT (log_path) DO NOTHING
+        """,
+        (log_key,),
+    )
+    database.cursor.execute(
+        "SELECT byte_offset FROM scrape_log_offsets WHERE log_path = %s FOR UPDATE",
+        (log_key,),
+    )
+    return database.cursor.fetchone()[0]
+
+
+# scrape_logs text columns an attempt fills: field -> (required, max length)
+ATTEMPT_TEXT_FIELDS = {
+    "source": (True, 50),
+    "url": (True, None),
+    "status": (True, 20),
+    "category": (False, 100),
+    "error_class": (False, 100),
+    "error_message": (False, None),
+}
+
+
+def invalid_attempt_reason(attempt):
+    """Why a record's attempt timings cannot be logged, or None if they can"""
+    if not isinstance(attempt, dict):
+        return "attempt is not an object"
+    for field, (required, max_length) in ATTEMPT_TEXT_FIELDS.items():
+        if field not in attempt:
+            return f"attempt missing {field}"
+        value = attempt[field]
+        if value is None and not required:
+            continue
+        if not isinstance(value, str) or not value:
+            return f"attempt {field} is not a string"
+        if max_length and len(value) > max_length:
+            return f"attempt {field} longer than {max_length} characters"
+    # The loader links the attempt to the product it creates
+    if attempt.get("product_id") is not None:
+        return "attempt product_id is set"
+    numeric_fields = ["ingredient_count"] + [f"{stage}_ms" for stage in STAGES]
+    for field in ["product_id", "scraped_at"] + numeric_fields:
+        if field not in attempt:
+            return f"attempt missing {field}"
+    for field in numeric_fields:
+        value = attempt[field]
+        if value is not None and (
+            not isinstance(value, (int, float)) or isinstance(value, bool)
+        ):
+            return f"attempt {field} is not a number"
+    try:
+        datetime.fromisoformat(attempt["scraped_at"])
+    except (KeyError, TypeError, ValueError):
+        return "attempt scraped_at is not an ISO timestamp"
+    return None
+
+
+def invalid_reason(record):
+    """Why a log record cannot be loaded, or None if it can"""
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    if not record.get("url"):
+        return "missing url"
+    if record.get("attempt") is not None:
+        reason = invalid_attempt_reason(record["attempt"])
+        if reason:
+            return reason
+    product = record.get("product")
+    if product is None:
+        # Failed attempts are logged without a product
+        return None
+    if not isinstance(product, dict):
+        return "product is not an object"
+    for field, max_length in (("product_id", 50), ("name", 500)):
+        value = product.get(field)
+        if not value:
+            return f"missing product {field}"
+        if len(str(value)) > max_length:
+            return f"product {field} longer than {max_length} characters"
+    if len(product.get("category") or "") > 100:
+        return "product category longer than 100 characters"
+    ingredients = product.get("ingredients")
+    if ingredients is not None and (
+        not isinstance(ingredients, list)
+        or not all(isinstance(name, str) and name for name in ingredients)
+    ):
+        return "ingredients is not a list of names"
+    if any(len(name) > 200 for name in ingredients or []):
+        return "ingredient name longer than 200 characters"
+    return None
+
+
+def load_records(database, records):
+    """Create products and ingredient links for a batch of log records"""
+    product_model = ProductModel(database)
+    ingredient_model = IngredientModel(database)
+    product_ingredient_model = ProductIngredientModel(database)
+
+    # Failed attempts are logged without a product
+    records = [record for record in records if record.get("product")]
+
+    ingredient_ids = ingredient_model.get_or_create_many(
+        name for record in records for name in record["product"]["ingredients"] or []
+    )
+
+    # The last record for a product replaces its ingredient list
+    links_by_product = {}
+    for record in records:
+        product = record["product"]
+        product_id = product_model.create(
+            str(product["product_id"]),
+            product["name"],
+            product.get("category"),
+            record["url"],
+            product.get("image_url"),
+        )
+        if record.get("attempt"):
+            record["attempt"]["product_id"] = product_id
+        links_by_product[product_id] = [
+            (product_id, ingredient_ids[name], position)
+            for position, name in enumerate(product["ingredients"] or [], start=1)
+        ]
+
+    # Ingredients removed from a page must not stay linked
+    for product_id in links_by_product:
+        product_ingredient_model.unlink_all(product_id)
+    links = [link for group in links_by_product.values() for link in group]
+
+    if links:
+        execute_values(
+            database.cursor,
+            """
+            INSERT INTO product_ingredients (product_id, ingredient_id, position)
+            VALUES %s
+            ON CONFLICT (product_id, ingredient_id) DO NOTHING
+            """,
+            links,
+            page_size=1000,
+        )
+
+    product_model.refresh_safety_status(list(links_by_product))
+    return len(links)
+
+
+def dead_letter(rejected, dead_letter_path):
+    """Append rejected records with the reason to the dead-letter file"""
+    with open(dead_letter_path, "a", encoding="utf-8") as f:
+        for end_offset, record, reason in rejected:
+            f.write(
+                json.dumps(
+                    {"end_offset": end_offset, "reason": reason, "record": record},
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_batch(database, path, log_key, batch_size, dead_letter_path=None):
+    """
+    Load up to batch_size records after the stored offset in one transaction.
+    Invalid records are skipped (and dead-lettered) so the offset advances.
+
+    :return: (records loaded, links created, records rejected)
+    """
+    offset = lock_offset(database, log_key)
+    batch = list(read_scrape_log(path, offset, limit=batch_size))
+    if not batch:
+        database.conn.rollback()
+        return 0, 0, 0
+
+    end_offset = batch[-1][0]
+    records = []
+    rejected = []
+    for record_end, record in batch:
+        reason = invalid_reason(record)
+        if reason is None:
+            records.append(record)
+        else:
+            rejected.append((record_end, record, reason))
+
+    start = time.perf_counter()
+    link_count = load_records(database, records)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # Stage timings recorded by the scraper, with this batch's write time
+    # shared across its products
+    attempts = [record["attempt"] for record in records if record.get("attempt")]
+    loaded = sum(1 for record in records if record.get("product")) or 1
+    for attempt in attempts:
+        if attempt["status"] == "success":
+            attempt["db_write_ms"] = elapsed_ms / loaded
+    ScrapeLogModel(database).log_attempts(attempts)
+
+    database.cursor.execute(
+        """
+        UPDATE scrape_log_offsets
+        SET byte_offset = %s,
+            records_loaded = records_loaded + %s,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE log_path = %s
+        """,
+        (end_offset, len(batch) - len(rejected), log_key),
+    )
+
+    # Durable before the offset moves past them; a crash before the commit
+    # repeats these lines rather than losing them
+    if rejected and dead_letter_path:
+        dead_letter(rejected, dead_letter_path)
+    database.conn.commit()
+    return len(batch) - len(rejected), link_count, len(rejected)
+
+
+def load_scrape_log(
+    path, batch_size=500, follow=False, poll_interval=2.0, dead_letter_path=None
+):
+    """
+    Load a scrape log to the end, or keep tailing it with follow.
+    Rejected records go to dead_letter_path (default: <path>.rejected).
+    """
+    dead_letter_path = dead_letter_path or f"{path}.rejected"
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+
+    log_key = os.path.realpath(path)
+    total_records = 0
+    total_links = 0
+    total_rejected = 0
+    start = time.perf_counter()
+
+    try:
+        while True:
+            try:
+                records, links, rejected = load_batch(
+                    database, path, log_key, batch_size, dead_letter_path
+                )
+            except Exception:
+                database.conn.rollback()
+                raise
+
+            if records or rejected:
+                total_records += records
+                total_links += links
+                total_rejected += rejected
+                print(f"✓ Loaded {records} products ({links} ingredient links)")
+                if rejected:
+                    print(f"✗ Skipped {rejected} invalid records ({dead_letter_path})")
+            elif follow:
+                time.sleep(poll_interval)
+            else:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Loaded {total_records} products, {total_links} links in {elapsed:.2f}s")
+    if total_rejected:
+        print(f"✗ Skipped {total_rejected} invalid records, see {dead_letter_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a scrape log into Postgres")
+    parser.add_argument("path", help="NDJSON scrape log written by the scraper")
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="Records per transaction"
+    )
+    parser.add_argument(
+        "--follow", action="store_true", help="Keep tailing the log for new records"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=2.0, help="Seconds between polls"
+    )
+    parser.add_argument(
+        "--dead-letter", help="File for invalid records (default: <path>.rejected)"
+    )
+    args = parser.parse_args()
+
+    load_scrape_log(
+        args.path, args.batch_size, args.follow, args.poll_interval, args.dead_letter
+    )
@@ -0,0 +1,13 @@
+-- Safeskin Database Schema
+-- Migration 002: Precomputed safety verdicts for filtered browsing
+
+-- Verdict columns, filled by ProductModel.refresh_safety_status
+-- (run database/refresh_safety_status.py once after applying this migration)
+ALTER TABLE products ADD COLUMN safety_status VARCHAR(20);
+ALTER TABLE products ADD COLUMN comedogenic_count INTEGER;
+
+-- Keyset pagination indexes: every filter ends in id so a page is one range scan
+DROP INDEX IF EXISTS idx_products_category;
+CREATE INDEX idx_products_category ON products (category, id);
+CREATE INDEX idx_products_safety_status ON products (safety_status, id);
+CREATE INDEX idx_products_safety_status_category ON products (safety_status, category, id);
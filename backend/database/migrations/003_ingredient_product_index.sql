@@ -0,0 +1,7 @@
+-- Safeskin Database Schema
+-- Migration 003: Reverse ingredient -> products lookups
+
+-- Keyset pagination over products containing an ingredient: make the
+-- ingredient index cover product_id so each page is one range scan
+DROP INDEX IF EXISTS idx_product_ingredients_ingredient;
+CREATE INDEX idx_product_ingredients_ingredient ON product_ingredients (ingredient_id, product_id);
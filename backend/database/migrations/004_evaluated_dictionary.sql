@@ -0,0 +1,11 @@
+-- Safeskin Database Schema
+-- Migration 004: Track the comedogenic dictionary current verdicts reflect
+
+-- Snapshot written by database/reevaluate_products.py after each
+-- re-evaluation; diffing it against ingredients gives the dictionary change
+CREATE TABLE evaluated_comedogenic_ingredients (
+    ingredient_id INTEGER PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    common_names TEXT[],
+    evaluated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
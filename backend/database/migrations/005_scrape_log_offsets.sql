@@ -0,0 +1,12 @@
+-- Safeskin Database Schema
+-- Migration 005: Offsets for loading scrape logs exactly once
+
+-- database/load_scrape_log.py advances byte_offset in the same transaction
+-- as the rows it loads, so a batch is either fully loaded and recorded or
+-- not at all, and concurrent loaders serialize on the row lock
+CREATE TABLE scrape_log_offsets (
+    log_path TEXT PRIMARY KEY,
+    byte_offset BIGINT NOT NULL DEFAULT 0,
+    records_loaded BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
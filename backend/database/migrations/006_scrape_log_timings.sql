@@ -0,0 +1,16 @@
+-- Safeskin Database Schema
+-- Migration 006: Per-attempt scrape stage timings
+
+-- One scrape_logs row per scrape attempt (CLI, scrape log loader and API),
+-- with the time spent in each stage; see database/scrape_report.py
+ALTER TABLE scrape_logs
+    ADD COLUMN url TEXT,
+    ADD COLUMN category VARCHAR(100),
+    ADD COLUMN error_class VARCHAR(100),
+    ADD COLUMN ingredient_count INTEGER,
+    ADD COLUMN navigation_ms REAL,
+    ADD COLUMN render_wait_ms REAL,
+    ADD COLUMN extraction_ms REAL,
+    ADD COLUMN db_write_ms REAL;
+
+CREATE INDEX idx_scrape_logs_source_scraped_at ON scrape_logs (source, scraped_at);
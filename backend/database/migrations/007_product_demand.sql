@@ -0,0 +1,15 @@
+-- Safeskin Database Schema
+-- Migration 007: Request demand for staleness-prioritized refreshes
+
+-- API workers flush per-product request counts here in batches; the score
+-- decays exponentially (ProductModel.record_demand) so it tracks recent
+-- popularity. scraper/refresh_scheduler.py re-scrapes the products with
+-- the highest age x demand priority first.
+CREATE TABLE product_demand (
+    product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    request_score REAL NOT NULL DEFAULT 0,
+    last_requested_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Refresh candidates are products older than the minimum refresh age
+CREATE INDEX idx_products_updated_at ON products (updated_at);
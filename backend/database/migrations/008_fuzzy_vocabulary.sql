@@ -0,0 +1,17 @@
+-- Safeskin Database Schema
+-- Migration 008: Versioned vocabulary of non-comedogenic names
+
+-- Names seeded with is_comedogenic = no (seed_comedogenic_data.py) are
+-- known non-comedogenic ingredients that compete with comedogenic aliases
+-- in typo matching ("squalane" must not resolve to "squalene"). They are
+-- part of the dictionary version, so verdicts, ETags and cached
+-- canonicalizers change only when the seeded dictionary does.
+ALTER TABLE ingredients ADD COLUMN in_vocabulary BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Dictionary version lookups: count and last change of dictionary rows
+CREATE INDEX idx_ingredients_dictionary ON ingredients (updated_at)
+    WHERE is_comedogenic OR in_vocabulary;
+
+-- Re-evaluation snapshots the vocabulary along with comedogenic entries
+ALTER TABLE evaluated_comedogenic_ingredients
+    ADD COLUMN is_comedogenic BOOLEAN NOT NULL DEFAULT TRUE;
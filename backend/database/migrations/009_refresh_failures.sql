@@ -0,0 +1,18 @@
+-- Safeskin Database Schema
+-- Migration 009: Persistent backoff for failed refreshes
+
+-- scraper/refresh_scheduler.py records each product whose refresh failed,
+-- with the failure class from scraper/retry_policy.py and when to try it
+-- again. Refresh candidates skip products until retry_at, so failing
+-- products cannot crowd the rest out of the queue and the backoff
+-- survives restarts. A successful refresh deletes the row.
+CREATE TABLE product_refresh_failures (
+    product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    failures INTEGER NOT NULL DEFAULT 0,
+    failure_class VARCHAR(50),
+    retry_at TIMESTAMP NOT NULL,
+    last_failed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_product_refresh_failures_retry_at
+    ON product_refresh_failures (retry_at);
@@ -1,23 +1,232 @@
+import os
+import time
+
 import psycopg2
+from psycopg2.extras import execute_batch, execute_values
+
+from database.canonicalizer import IngredientCanonicalizer
+from database.shared_dictionary import attach_shared_dictionary, dictionary_version_key
+
+# Search modes accepted by ProductModel.search_by_name
+SEARCH_MODES = ("fuzzy", "fulltext", "hybrid")
+
+# Hybrid search falls back to trigram similarity below this many full-text hits
+HYBRID_MIN_FULLTEXT_HITS = 5
+
+# Seconds a per-ingredient product count is served from memory
+INGREDIENT_COUNT_TTL = 300
+
+# Cached per-ingredient product counts: ingredient_id -> (count, fetched_at)
+_ingredient_count_cache = {}
+
+# Replica connection timeout, max replay lag, and how long a failed
+# replica is skipped before being tried again (seconds)
+REPLICA_CONNECT_TIMEOUT = 2
+REPLICA_MAX_LAG_SECONDS = 30
+REPLICA_RETRY_SECONDS = 30
+
+# Replicas that failed a connect or health check: key -> skip until
+_replica_unhealthy_until = {}
+
+# Request demand halves every this many hours (product_demand, migration 007)
+DEMAND_HALF_LIFE_HOURS = 24
+
+# Canonicalizer built for the current dictionary version (comedogenic
+# entries and the non-comedogenic vocabulary, see migration 008)
+_canonicalizer_cache = {"version": None, "canonicalizer": None}
+
+
+def load_canonicalizer(db):
+    """
+    Return an IngredientCanonicalizer for the comedogenic dictionary.
+
+    Rebuilt only when the dictionary version changes (e.g. after reseeding);
+    otherwise costs a single aggregate query. With SHARED_DICTIONARY_PATH set,
+    the compiled dictionary from database/shared_dictionary.py is used
+    instead whenever it matches the current version.
+    """
+    ingredient_model = IngredientModel(db)
+    version = ingredient_model.get_dictionary_version()
+
+    shared_path = os.getenv("SHARED_DICTIONARY_PATH")
+    if shared_path:
+        shared = attach_shared_dictionary(shared_path)
+        if shared is not None and shared.version == dictionary_version_key(version):
+            return shared
+
+    if _canonicalizer_cache["version"] != version:
+        _canonicalizer_cache["canonicalizer"] = IngredientCanonicalizer(
+            ingredient_model.get_comedogenic(),
+            ingredient_model.get_fuzzy_vocabulary(),
+        )
+        _canonicalizer_cache["version"] = version
+    return _canonicalizer_cache["canonicalizer"]
+
+
+def replica_key(params):
+    """Identify a replica by host, port and database"""
+    return f"{params.get('host')}:{params.get('port')}/{params.get('database')}"
+
+
+def replica_is_healthy(conn):
+    """
+    A replica is healthy unless it is both behind on WAL replay and its
+    last replayed transaction is older than REPLICA_MAX_LAG_SECONDS.
+    (A promoted replica that is no longer in recovery is healthy.)
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                pg_is_in_recovery(),
+                pg_last_wal_receive_lsn() IS DISTINCT FROM pg_last_wal_replay_lsn(),
+                EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            """
+        )
+        in_recovery, replay_behind, lag_seconds = cursor.fetchone()
+    conn.rollback()
+    if not in_recovery or not replay_behind or lag_seconds is None:
+        return True
+    return lag_seconds <= REPLICA_MAX_LAG_SECONDS
+
+
+def analyze_ingredients(ingredients, canonicalizer):
+    """
+    Match product ingredients against the comedogenic dictionary.
+
+    :param ingredients: List of (name, position) tuples in label order
+    :param canonicalizer: IngredientCanonicalizer over comedogenic ingredients
+    :return: Dict with safety_status, comedogenic_ingredients,
+             comedogenic_count and all_ingredients
+    """
+    comedogenic_ingredients = []
+    all_ingredients = []
+
+    for ing_name, position in ingredients:
+        # Resolve to a canonical comedogenic ingredient via alias lookup
+        canonical = canonicalizer.resolve(ing_name)
+        is_comedogenic = canonical is not None
+        if is_comedogenic and ing_name not in comedogenic_ingredients:
+            comedogenic_ingredients.append(ing_name)
+
+        all_ingredients.append(
+            {
+                "name": ing_name,
+                "is_comedogenic": is_comedogenic,
+                "position": position,
+                "canonical_name": canonical["name"] if canonical else None,
+            }
+        )
+
+    # Determine safety status
+    if not all_ingredients:
+        # No ingredients found for this product
+        safety_status = "unknown"
+    elif comedogenic_ingredients:
+        # Has comedogenic ingredients
+        safety_status = "unsafe"
+    else:
+        # Has ingredients, none are comedogenic
+        safety_status = "safe"
+
+    return {
+        "safety_status": safety_status,
+        "comedogenic_ingredients": comedogenic_ingredients,
+        "comedogenic_count": len(comedogenic_ingredients),
+        "all_ingredients": all_ingredients,
+    }
 
 
 class Database:
-    """Database connection manager"""
+    """
+    Database connection manager
 
-    def __init__(self, conn_params):
+    Writes use ``conn``/``cursor`` on the primary. Reads that a replica may
+    serve use ``read_conn``/``read_cursor``; once this instance has touched
+    the primary, reads stay there so a request always reads its own writes.
+    Connections are opened lazily, so a read-only request against a healthy
+    replica never connects to the primary.
+    """
+
+    def __init__(self, conn_params, replica_params=None):
         self.conn_params = conn_params
-        self.conn = None
-        self.cursor = None
+        self.replica_params = replica_params or []
+        self._conn = None
+        self._cursor = None
+        self._read_conn = None
+        self._read_cursor = None
 
     def connect(self):
-        self.conn = psycopg2.connect(**self.conn_params)
-        self.cursor = self.conn.cursor()
+        if not self.replica_params:
+            self._connect_primary()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._connect_primary()
+        return self._conn
+
+    @property
+    def cursor(self):
+        if self._cursor is None:
+            self._connect_primary()
+        return self._cursor
+
+    @property
+    def read_conn(self):
+        if self._conn is not None:
+            return self._conn
+        if self._read_conn is None:
+            self._connect_replica()
+        return self._read_conn
+
+    @property
+    def read_cursor(self):
+        if self._cursor is not None:
+            return self._cursor
+        if self._read_cursor is None:
+            self._connect_replica()
+        return self._read_cursor
+
+    def _connect_primary(self):
+        self._conn = psycopg2.connect(**self.conn_params)
+        self._cursor = self._conn.cursor()
+
+    def _connect_replica(self):
+        """Connect to the first healthy replica, failing over to the primary"""
+        now = time.monotonic()
+        for params in self.replica_params:
+            key = replica_key(params)
+            if _replica_unhealthy_until.get(key, 0) > now:
+                continue
+            try:
+                conn = psycopg2.connect(
+                    connect_timeout=REPLICA_CONNECT_TIMEOUT, **params
+                )
+                if not replica_is_healthy(conn):
+                    conn.close()
+                    raise psycopg2.OperationalError("replica lagging")
+            except psycopg2.OperationalError as e:
+                print(f"Replica {key} unavailable, skipping: {e}")
+                _replica_unhealthy_until[key] = now + REPLICA_RETRY_SECONDS
+                continue
+            self._read_conn = conn
+            self._read_cursor = conn.cursor()
+            return
+
+        # No healthy replica (or none configured): read from the primary
+        self._read_conn = self.conn
+        self._read_cursor = self.cursor
 
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self._read_cursor is not None and self._read_cursor is not self._cursor:
+            self._read_cursor.close()
+        if self._read_conn is not None and self._read_conn is not self._conn:
+            self._read_conn.close()
+        if self._cursor:
+            self._cursor.close()
+        if self._conn:
+            self._conn.close()
 
 
 class ProductModel:
@@ -25,6 +234,9 @@ class ProductModel:
 
     def __init__(self, db):
         self.db = db
+        # Full-text hit counts by query, so a request's search and count
+        # resolve hybrid mode with a single count
+        self._fulltext_counts = {}
 
     def create(self, nykaa_product_id, name, category, url, image_url):
         """Insert product and return its ID"""
@@ -33,23 +245,67 @@ class ProductModel:
             INSERT INTO products (nykaa_product_id, name, category, url, image_url)
             VALUES (%s, %s, %s, %s, %s)
             ON CONFLICT (nykaa_product_id) DO UPDATE
-            SET name = EXCLUDED.name, updated_at = CURRENT_TIMESTAMP
+            SET name = EXCLUDED.name,
+                category = COALESCE(EXCLUDED.category, products.category),
+                url = EXCLUDED.url,
+                image_url = COALESCE(EXCLUDED.image_url, products.image_url),
+                updated_at = CURRENT_TIMESTAMP
             RETURNING id
             """,
             (nykaa_product_id, name, category, url, image_url),
         )
         return self.db.cursor.fetchone()[0]
 
+    def get_cache_version(self, product_id):
+        """
+        Cheap cache validators for a product's detail response.
+
+        One query: the product's updated_at plus the dictionary version
+        (count and last change of comedogenic and vocabulary ingredients),
+        since a dictionary reseed can change the analysis without touching
+        products.
+        Timestamps are returned timezone-aware.
+        """
+        self.db.read_cursor.execute(
+            """
+            SELECT
+                p.updated_at AT TIME ZONE current_setting('TimeZone'),
+                d.comedogenic_total,
+                d.last_change AT TIME ZONE current_setting('TimeZone')
+            FROM products p,
+                (
+                    SELECT COUNT(*) AS comedogenic_total, MAX(updated_at) AS last_change
+                    FROM ingredients
+                    WHERE is_comedogenic OR in_vocabulary
+                ) d
+            WHERE p.id = %s
+            """,
+            (product_id,),
+        )
+        row = self.db.read_cursor.fetchone()
+        if not row:
+            return None
+
+        updated_at, comedogenic_total, dictionary_updated_at = row
+        dictionary_stamp = (
+            dictionary_updated_at.timestamp() if dictionary_updated_at else 0
+        )
+        return {
+            "updated_at": updated_at,
+            "dictionary_version": f"{comedogenic_total}-{dictionary_stamp:.6f}",
+            "dictionary_updated_at": dictionary_updated_at,
+        }
+
     def get_by_id(self, product_id):
         """Get product by ID"""
-        self.db.cursor.execute(
+        self.db.read_cursor.execute(
             """
             SELECT id, nykaa_product_id, name, category, url, image_url
             FROM products WHERE id = %s
             """,
             (product_id,),
         )
-        row = self.db.cursor.fetchone()
+        row = self.db.read_cursor.fetchone()
         if row:
             return {
                 "id": row[0],
@@ -61,21 +317,71 @@ class ProductModel:
             }
         return None
 
-    def search_by_name(self, query, limit=20, offset=0, use_fuzzy=True):
+    def search_by_name(self, query, limit=20, offset=0, use_fuzzy=True, mode=None):
         """
         Search products by name with fuzzy matching for typos
 
-        Uses combined ILIKE + trigram similarity for best results
+        Modes:
+        - fuzzy: combined ILIKE + trigram similarity (default)
+        - fulltext: websearch_to_tsquery ranked by ts_rank_cd, served
+          from the idx_products_name GIN index
+        - hybrid: fulltext, falling back to trigram similarity only when
+          there are fewer than HYBRID_MIN_FULLTEXT_HITS full-text hits
 
         :param query: Search term
         :param limit: Max results
         :param offset: Number of results to skip (for pagination)
         :param use_fuzzy: Enable fuzzy matching for typos (default True)
+        :param mode: One of SEARCH_MODES, overrides use_fuzzy when given
         """
-        if use_fuzzy:
+        if (
+            mode == "hybrid"
+            and query not in self._fulltext_counts
+            and offset == 0
+            and limit >= HYBRID_MIN_FULLTEXT_HITS
+        ):
+            # A first page of full-text results picks the mode without a
+            # separate count: a short page is also the exact hit count
+            results = self._search_fulltext(query, limit, offset)
+            if len(results) >= HYBRID_MIN_FULLTEXT_HITS:
+                return results
+            self._fulltext_counts[query] = len(results)
+
+        mode = self._resolve_search_mode(query, mode, use_fuzzy)
+
+        if mode == "fulltext":
+            return self._search_fulltext(query, limit, offset)
+
+        if mode == "hybrid":
+            # Too few full-text hits: trigram search, with full-text
+            # matches ranked above similarity-only matches
+            self.db.read_cursor.execute(
+                """
+                SELECT
+                    id, nykaa_product_id, name, category, image_url,
+                    GREATEST(
+                        CASE
+                            WHEN to_tsvector('english', name) @@ tsq
+                            THEN ts_rank_cd(to_tsvector('english', name), tsq, 32)
+                            ELSE 0.0
+                        END,
+                        similarity(name, %s),
+                        word_similarity(%s, name)
+                    ) as relevance
+                FROM products, websearch_to_tsquery('english', %s) tsq
+                WHERE
+                    to_tsvector('english', name) @@ tsq
+                    OR similarity(name, %s) > 0.1
+                    OR word_similarity(%s, name) > 0.1
+                ORDER BY to_tsvector('english', name) @@ tsq DESC, relevance DESC, name
+                LIMIT %s OFFSET %s
+            """,
+                (query, query, query, query, query, limit, offset),
+            )
+        elif mode == "fuzzy":
             # Combined approach: ILIKE for exact substrings + trigram similarity for typos
             # Lower threshold (0.1) + word_similarity catches more typos like "concelar"
-            self.db.cursor.execute(
+            self.db.read_cursor.execute(
                 """
                 SELECT DISTINCT
                     id, nykaa_product_id, name, category, image_url,
@@ -112,7 +418,7 @@ class ProductModel:
             )
         else:
             # Simple ILIKE only
-            self.db.cursor.execute(
+            self.db.read_cursor.execute(
                 """
                 SELECT
                     id, nykaa_product_id, name, category, image_url,
@@ -129,7 +435,25 @@ class ProductModel:
                 (query, query + "%", "%" + query + "%", limit, offset),
             )
 
-        results = self.db.cursor.fetchall()
+        return self._search_results()
+
+    def _search_fulltext(self, query, limit, offset):
+        self.db.read_cursor.execute(
+            """
+            SELECT
+                id, nykaa_product_id, name, category, image_url,
+                ts_rank_cd(to_tsvector('english', name), tsq, 32) as relevance
+            FROM products, websearch_to_tsquery('english', %s) tsq
+            WHERE to_tsvector('english', name) @@ tsq
+            ORDER BY relevance DESC, name
+            LIMIT %s OFFSET %s
+        """,
+            (query, limit, offset),
+        )
+        return self._search_results()
+
+    def _search_results(self):
+        results = self.db.read_cursor.fetchall()
 
         return [
             {
@@ -143,6 +467,76 @@ class ProductModel:
             for row in results
         ]
 
+    def count_by_name(self, query, use_fuzzy=True, mode=None):
+        """Count products matched by search_by_name with the same mode"""
+        mode = self._resolve_search_mode(query, mode, use_fuzzy)
+
+        if mode == "fulltext":
+            return self._count_fulltext(query)
+
+        if mode == "hybrid":
+            self.db.read_cursor.execute(
+                """
+                SELECT COUNT(*)
+                FROM products, websearch_to_tsquery('english', %s) tsq
+                WHERE
+                    to_tsvector('english', name) @@ tsq
+                    OR similarity(name, %s) > 0.1
+                    OR word_similarity(%s, name) > 0.1
+                """,
+                (query, query, query),
+            )
+        elif mode == "fuzzy":
+            self.db.read_cursor.execute(
+                """
+                SELECT COUNT(DISTINCT id)
+                FROM products
+                WHERE
+                    LOWER(name) LIKE LOWER(%s)
+                    OR similarity(name, %s) > 0.1
+                    OR word_similarity(%s, name) > 0.1
+                """,
+                (f"%{query}%", query, query),
+            )
+        else:
+            self.db.read_cursor.execute(
+                "SELECT COUNT(*) FROM products WHERE LOWER(name) LIKE LOWER(%s)",
+                (f"%{query}%",),
+            )
+        return self.db.read_cursor.fetchone()[0]
+
+    def _count_fulltext(self, query):
+        """Count full-text hits (index-only work on idx_products_name)"""
+        if query in self._fulltext_counts:
+            return self._fulltext_counts[query]
+        self.db.read_cursor.execute(
+            """
+            SELECT COUNT(*)
+            FROM products
+            WHERE to_tsvector('english', name) @@ websearch_to_tsquery('english', %s)
+            """,
+            (query,),
+        )
+        self._fulltext_counts[query] = self.db.read_cursor.fetchone()[0]
+        return self._fulltext_counts[query]
+
+    def _resolve_search_mode(self, query, mode, use_fuzzy):
+        """
+        Map (mode, use_fuzzy) onto the query that will actually run.
+
+        Returns 'fulltext', 'hybrid' (trigram fallback), 'fuzzy' or 'ilike'.
+        Hybrid resolves to 'fulltext' when the GIN index alone has enough hits;
+        the hit count is kept, so the request's count and search reuse it.
+        """
+        if mode is None:
+            return "fuzzy" if use_fuzzy else "ilike"
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if mode == "hybrid":
+            if self._count_fulltext(query) >= HYBRID_MIN_FULLTEXT_HITS:
+                return "fulltext"
+        return mode
+
     def get_product_with_safety_analysis(self, product_id):
         """
         Get product with comedogenic safety analysis using fuzzy matching.
@@ -154,7 +548,7 @@ class ProductModel:
         - all_ingredients: complete list of all ingredients with fuzzy-matched comedogenic status
         """
         # Get product basic info
-        self.db.cursor.execute(
+        self.db.read_cursor.execute(
             """
             SELECT id, nykaa_product_id, name, category, url, image_url
             FROM products
@@ -163,13 +557,13 @@ class ProductModel:
             (product_id,),
         )
 
-        product_row = self.db.cursor.fetchone()
+        product_row = self.db.read_cursor.fetchone()
 
         if not product_row:
             return None
 
         # Get all product ingredients
-        self.db.cursor.execute(
+        self.db.read_cursor.execute(
             """
             SELECT i.id, i.name, pi.position
             FROM ingredients i
@@ -180,59 +574,15 @@ class ProductModel:
             (product_id,),
         )
 
-        product_ingredients = self.db.cursor.fetchall()
+        product_ingredients = self.db.read_cursor.fetchall()
 
-        # Get all comedogenic ingredients from the database
-        self.db.cursor.execute(
-            """
-            SELECT name FROM ingredients WHERE is_comedogenic = TRUE
-            """
-        )
-        comedogenic_list = [row[0].lower() for row in self.db.cursor.fetchall()]
-
-        # Fuzzy match: check if any comedogenic ingredient is contained in product ingredient
-        comedogenic_ingredients = []
-        all_ingredients = []
-
-        for _, ing_name, position in product_ingredients:
-            # Clean the ingredient name for matching (remove brackets, CI codes, etc.)
-            clean_name = ing_name.lower()
-            # Remove common prefixes/suffixes
-            clean_name = (
-                clean_name.replace("[+/-", "")
-                .replace("]", "")
-                .replace("(", "")
-                .replace(")", "")
-            )
-
-            # Check if any comedogenic ingredient matches
-            is_comedogenic = False
-            for comedogenic_name in comedogenic_list:
-                # Check if the comedogenic ingredient is in the product ingredient name
-                if comedogenic_name in clean_name or clean_name in comedogenic_name:
-                    is_comedogenic = True
-                    if ing_name not in comedogenic_ingredients:
-                        comedogenic_ingredients.append(ing_name)
-                    break
-
-            all_ingredients.append(
-                {
-                    "name": ing_name,
-                    "is_comedogenic": is_comedogenic,
-                    "position": position,
-                }
-            )
+        # Alias map over the comedogenic dictionary
+        canonicalizer = load_canonicalizer(self.db)
 
-        # Determine safety status
-        if not all_ingredients:
-            # No ingredients found for this product
-            safety_status = "unknown"
-        elif comedogenic_ingredients:
-            # Has comedogenic ingredients
-            safety_status = "unsafe"
-        else:
-            # Has ingredients, none are comedogenic
-            safety_status = "safe"
+        analysis = analyze_ingredients(
+            [(ing_name, position) for _, ing_name, position in product_ingredients],
+            canonicalizer,
+        )
 
         return {
             "id": product_row[0],
@@ -241,12 +591,297 @@ class ProductModel:
             "category": product_row[3],
             "url": product_row[4],
             "image_url": product_row[5],
-            "safety_status": safety_status,
-            "comedogenic_ingredients": comedogenic_ingredients,
-            "comedogenic_count": len(comedogenic_ingredients),
-            "all_ingredients": all_ingredients,
+            **analysis,
         }
 
+    def get_analyses_by_nykaa_ids(self, nykaa_product_ids):
+        """
+        Products with safety analysis for many Nykaa product IDs in one query.
+
+        :return: Dict of nykaa_product_id -> product dict (as returned by
+                 get_product_with_safety_analysis) for the IDs that exist
+        """
+        self.db.read_cursor.execute(
+            """
+            SELECT
+                p.id, p.nykaa_product_id, p.name, p.category, p.url, p.image_url,
+                COALESCE(
+                    array_agg(i.name ORDER BY pi.position NULLS LAST, i.name)
+                        FILTER (WHERE i.id IS NOT NULL),
+                    '{}'
+                ),
+                COALESCE(
+                    array_agg(pi.position ORDER BY pi.position NULLS LAST, i.name)
+                        FILTER (WHERE i.id IS NOT NULL),
+                    '{}'
+                )
+            FROM products p
+            LEFT JOIN product_ingredients pi ON pi.product_id = p.id
+            LEFT JOIN ingredients i ON i.id = pi.ingredient_id
+            WHERE p.nykaa_product_id = ANY(%s)
+            GROUP BY p.id
+            """,
+            (list(nykaa_product_ids),),
+        )
+        rows = self.db.read_cursor.fetchall()
+
+        canonicalizer = load_canonicalizer(self.db)
+        products = {}
+        for row in rows:
+            products[row[1]] = {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "url": row[4],
+                "image_url": row[5],
+                **analyze_ingredients(list(zip(row[6], row[7])), canonicalizer),
+            }
+        return products
+
+    def save_safety_status(self, product_id, safety_status, comedogenic_count):
+        """Store a precomputed verdict on the product row"""
+        self.db.cursor.execute(
+            """
+            UPDATE products
+            SET safety_status = %s, comedogenic_count = %s
+            WHERE id = %s
+            """,
+            (safety_status, comedogenic_count, product_id),
+        )
+
+    def record_demand(self, counts):
+        """
+        Add request counts to each product's decayed demand score.
+
+        :param counts: Dict of product_id -> requests since the last flush
+        """
+        if not counts:
+            return
+        execute_values(
+            self.db.cursor,
+            f"""
+            INSERT INTO product_demand (product_id, request_score, last_requested_at)
+            SELECT v.product_id, v.requests, CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v (product_id, requests)
+            JOIN products p ON p.id = v.product_id
+            ON CONFLICT (product_id) DO UPDATE
+            SET request_score = product_demand.request_score * power(
+                    0.5,
+                    EXTRACT(EPOCH FROM EXCLUDED.last_requested_at
+                        - product_demand.last_requested_at)
+                    / {DEMAND_HALF_LIFE_HOURS * 3600}
+                ) + EXCLUDED.request_score,
+                last_requested_at = EXCLUDED.last_requested_at
+            """,
+            sorted(counts.items()),
+        )
+
+    def get_refresh_candidates(self, min_age_hours, limit=500):
+        """
+        Products due for a refresh, highest priority first.
+
+        Priority is the age in hours times 1 + ln(1 + current demand), so
+        old products are refreshed eventually and popular ones sooner.
+        Products backing off after a failed refresh are skipped until their
+        retry time (product_refresh_failures, migration 009).
+
+        :return: List of (id, url, age_hours, demand, priority)
+        """
+        self.db.read_cursor.execute(
+            f"""
+            SELECT id, url, age_hours, demand,
+                   age_hours * (1 + ln(1 + demand)) AS priority
+            FROM (
+                SELECT p.id, p.url,
+                       EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - p.updated_at) / 3600
+                           AS age_hours,
+                       COALESCE(
+                           d.request_score * power(
+                               0.5,
+                               EXTRACT(EPOCH FROM CURRENT_TIMESTAMP
+                                   - d.last_requested_at)
+                               / {DEMAND_HALF_LIFE_HOURS * 3600}
+                           ),
+                           0
+                       ) AS demand
+                FROM products p
+                LEFT JOIN product_demand d ON d.product_id = p.id
+                LEFT JOIN product_refresh_failures f ON f.product_id = p.id
+                WHERE p.updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                  AND p.url IS NOT NULL
+                  AND (f.retry_at IS NULL OR f.retry_at <= CURRENT_TIMESTAMP)
+            ) due
+            ORDER BY priority DESC
+            LIMIT %s
+            """,
+            (min_age_hours * 3600, limit),
+        )
+        return [
+            (row[0], row[1], float(row[2]), float(row[3]), float(row[4]))
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+    def get_refresh_failures(self, product_id):
+        """Consecutive failed refreshes of a product"""
+        self.db.cursor.execute(
+            "SELECT failures FROM product_refresh_failures WHERE product_id = %s",
+            (product_id,),
+        )
+        row = self.db.cursor.fetchone()
+        return row[0] if row else 0
+
+    def record_refresh_failure(
+        self, product_id, failures, failure_class, retry_seconds
+    ):
+        """Store a failed refresh and hold the product back for retry_seconds"""
+        self.db.cursor.execute(
+            """
+            INSERT INTO product_refresh_failures
+                (product_id, failures, failure_class, retry_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+            ON CONFLICT (product_id) DO UPDATE
+            SET failures = EXCLUDED.failures,
+                failure_class = EXCLUDED.failure_class,
+                retry_at = EXCLUDED.retry_at,
+                last_failed_at = CURRENT_TIMESTAMP
+            """,
+            (product_id, failures, failure_class, retry_seconds),
+        )
+
+    def clear_refresh_failures(self, product_id):
+        """Forget a product's failed refreshes after a successful one"""
+        self.db.cursor.execute(
+            "DELETE FROM product_refresh_failures WHERE product_id = %s",
+            (product_id,),
+        )
+
+    def refresh_safety_status(self, product_ids=None, batch_size=500):
+        """
+        Recompute stored verdicts from product_ingredients.
+
+        :param product_ids: Products to recompute (default: every product)
+        :param batch_size: Products analyzed per round-trip
+        :return: Number of products whose safety_status changed
+        """
+        if product_ids is None:
+            self.db.cursor.execute("SELECT id FROM products ORDER BY id")
+            product_ids = [row[0] for row in self.db.cursor.fetchall()]
+        else:
+            product_ids = sorted(set(product_ids))
+
+        canonicalizer = load_canonicalizer(self.db)
+        changed = 0
+
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start : start + batch_size]
+
+            self.db.cursor.execute(
+                """
+                SELECT p.id, p.safety_status, i.name, pi.position
+                FROM products p
+                LEFT JOIN product_ingredients pi ON pi.product_id = p.id
+                LEFT JOIN ingredients i ON i.id = pi.ingredient_id
+                WHERE p.id = ANY(%s)
+                ORDER BY p.id, pi.position NULLS LAST, i.name
+                """,
+                (batch,),
+            )
+
+            old_status = {}
+            ingredients_by_product = {}
+            for product_id, status, ing_name, position in self.db.cursor.fetchall():
+                old_status[product_id] = status
+                ingredients = ingredients_by_product.setdefault(product_id, [])
+                if ing_name is not None:
+                    ingredients.append((ing_name, position))
+
+            updates = []
+            for product_id, ingredients in ingredients_by_product.items():
+                analysis = analyze_ingredients(ingredients, canonicalizer)
+                if analysis["safety_status"] != old_status[product_id]:
+                    changed += 1
+                updates.append(
+                    (
+                        analysis["safety_status"],
+                        analysis["comedogenic_count"],
+                        product_id,
+                    )
+                )
+
+            execute_batch(
+                self.db.cursor,
+                """
+                UPDATE products
+                SET safety_status = %s, comedogenic_count = %s
+                WHERE id = %s
+                """,
+                updates,
+            )
+
+        return changed
+
+    def list_products(self, safety_status=None, category=None, after_id=None, limit=20):
+        """
+        Browse products by precomputed verdict and/or category.
+
+        Keyset paginated on id: pass the last id of the previous page as
+        after_id. Each page is a single range scan on the
+        (safety_status, category, id) / (category, id) indexes.
+        """
+        conditions = []
+        params = []
+        if safety_status is not None:
+            conditions.append("safety_status = %s")
+            params.append(safety_status)
+        if category is not None:
+            conditions.append("category = %s")
+            params.append(category)
+        if after_id is not None:
+            conditions.append("id > %s")
+            params.append(after_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.db.read_cursor.execute(
+            f"""
+            SELECT id, nykaa_product_id, name, category, image_url,
+                   safety_status, comedogenic_count
+            FROM products
+            {where}
+            ORDER BY id
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        return [
+            {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "image_url": row[4],
+                "safety_status": row[5],
+                "comedogenic_count": row[6],
+            }
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+    def get_categories(self):
+        """Categories with product counts"""
+        self.db.read_cursor.execute(
+            """
+            SELECT category, COUNT(*)
+            FROM products
+            WHERE category IS NOT NULL
+            GROUP BY category
+            ORDER BY category
+            """
+        )
+        return [
+            {"category": row[0], "product_count": row[1]}
+            for row in self.db.read_cursor.fetchall()
+        ]
+
 
 class IngredientModel:
     """CRUD operations for ingredients table"""
@@ -270,8 +905,73 @@ class IngredientModel:
         )
         return self.db.cursor.fetchone()[0]
 
-    def get_comedogenic(self):
+    def get_or_create_many(self, names):
+        """
+        IDs for many ingredient names, inserting the missing ones.
+
+        Unlike create_or_get, existing ingredients are left untouched, so
+        loading scraped names never resets dictionary flags.
+
+        :return: Dict of name -> id
+        """
+        names = sorted(set(names))
+        if not names:
+            return {}
+
         self.db.cursor.execute(
+            """
+            INSERT INTO ingredients (name)
+            SELECT unnest(%s::text[])
+            ON CONFLICT (name) DO NOTHING
+        """,
+            (names,),
+        )
+        self.db.cursor.execute(
+            "SELECT name, id FROM ingredients WHERE name = ANY(%s)", (names,)
+        )
+        return dict(self.db.cursor.fetchall())
+
+    def get_dictionary_version(self):
+        """
+        Version of the dictionary verdicts depend on: count and last change
+        of comedogenic and vocabulary ingredients
+        """
+        self.db.read_cursor.execute(
+            """
+            SELECT COUNT(*), MAX(updated_at)
+            FROM ingredients
+            WHERE is_comedogenic OR in_vocabulary
+        """
+        )
+        return tuple(self.db.read_cursor.fetchone())
+
+    def get_by_names(self, names):
+        """Look up ingredients by case-insensitive name"""
+        self.db.read_cursor.execute(
+            """
+            SELECT id, name
+            FROM ingredients
+            WHERE LOWER(name) = ANY(%s)
+            ORDER BY name
+        """,
+            ([name.lower() for name in names],),
+        )
+        return [{"id": row[0], "name": row[1]} for row in self.db.read_cursor.fetchall()]
+
+    def get_by_ids(self, ingredient_ids):
+        self.db.read_cursor.execute(
+            """
+            SELECT id, name
+            FROM ingredients
+            WHERE id = ANY(%s)
+            ORDER BY name
+        """,
+            (list(ingredient_ids),),
+        )
+        return [{"id": row[0], "name": row[1]} for row in self.db.read_cursor.fetchall()]
+
+    def get_comedogenic(self):
+        self.db.read_cursor.execute(
             """
             SELECT id, name, common_names
             FROM ingredients
@@ -281,9 +981,25 @@ class IngredientModel:
         )
         return [
             {"id": row[0], "name": row[1], "common_names": row[2]}
-            for row in self.db.cursor.fetchall()
+            for row in self.db.read_cursor.fetchall()
         ]
 
+    def get_fuzzy_vocabulary(self):
+        """
+        Seeded non-comedogenic ingredient names, for typo matching. A fixed
+        list (not derived from scraped products), versioned with the
+        dictionary.
+        """
+        self.db.read_cursor.execute(
+            """
+            SELECT name
+            FROM ingredients
+            WHERE in_vocabulary AND NOT is_comedogenic
+            ORDER BY name
+        """
+        )
+        return [row[0] for row in self.db.read_cursor.fetchall()]
+
 
 class ProductIngredientModel:
     """CRUD operations for product_ingredients junction table"""
@@ -301,8 +1017,14 @@ class ProductIngredientModel:
             (product_id, ingredient_id, position),
         )
 
-    def get_product_ingredients(self, product_id):
+    def unlink_all(self, product_id):
+        """Remove a product's ingredient links before re-linking a fresh scrape"""
         self.db.cursor.execute(
+            "DELETE FROM product_ingredients WHERE product_id = %s", (product_id,)
+        )
+
+    def get_product_ingredients(self, product_id):
+        self.db.read_cursor.execute(
             """
             SELECT i.id, i.name, i.is_comedogenic, pi.position
             FROM ingredients i
@@ -314,9 +1036,199 @@ class ProductIngredientModel:
         )
         return [
             {"id": row[0], "name": row[1], "is_comedogenic": row[2], "position": row[3]}
-            for row in self.db.cursor.fetchall()
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+    def get_product_counts(self, ingredient_ids):
+        """
+        Number of products containing each ingredient.
+
+        Counts are cached in-process for INGREDIENT_COUNT_TTL seconds, so
+        very common ingredients are not re-counted on every page.
+        """
+        now = time.monotonic()
+        counts = {}
+        missing = []
+        for ingredient_id in ingredient_ids:
+            cached = _ingredient_count_cache.get(ingredient_id)
+            if cached and now - cached[1] < INGREDIENT_COUNT_TTL:
+                counts[ingredient_id] = cached[0]
+            else:
+                missing.append(ingredient_id)
+
+        if missing:
+            self.db.read_cursor.execute(
+                """
+                SELECT t.ingredient_id, COUNT(pi.product_id)
+                FROM unnest(%s::int[]) AS t(ingredient_id)
+                LEFT JOIN product_ingredients pi ON pi.ingredient_id = t.ingredient_id
+                GROUP BY t.ingredient_id
+            """,
+                (missing,),
+            )
+            for ingredient_id, count in self.db.read_cursor.fetchall():
+                counts[ingredient_id] = count
+                _ingredient_count_cache[ingredient_id] = (count, now)
+
+        return counts
+
+    def get_products_with_ingredients(
+        self, ingredient_ids, match="any", after_id=None, limit=20
+    ):
+        """
+        Products containing any/all of the given ingredients.
+
+        Keyset paginated on product id (pass the last id as after_id) and
+        served from idx_product_ingredients_ingredient (ingredient_id, product_id):
+        - any: one bounded range scan per ingredient, merged
+        - all: walk the rarest ingredient's range and probe the others
+          through the (product_id, ingredient_id) unique index
+        """
+        ingredient_ids = sorted(set(ingredient_ids))
+        after_id = after_id or 0
+
+        if match == "all" and len(ingredient_ids) > 1:
+            counts = self.get_product_counts(ingredient_ids)
+            rarest = min(ingredient_ids, key=lambda i: counts.get(i, 0))
+            others = [i for i in ingredient_ids if i != rarest]
+            self.db.read_cursor.execute(
+                """
+                SELECT p.id, p.nykaa_product_id, p.name, p.category, p.image_url,
+                       p.safety_status, p.comedogenic_count
+                FROM product_ingredients pi
+                JOIN products p ON p.id = pi.product_id
+                WHERE pi.ingredient_id = %s
+                  AND pi.product_id > %s
+                  AND (
+                      SELECT COUNT(*)
+                      FROM product_ingredients o
+                      WHERE o.product_id = pi.product_id
+                        AND o.ingredient_id = ANY(%s)
+                  ) = %s
+                ORDER BY pi.product_id
+                LIMIT %s
+            """,
+                (rarest, after_id, others, len(others), limit),
+            )
+        else:
+            self.db.read_cursor.execute(
+                """
+                SELECT p.id, p.nykaa_product_id, p.name, p.category, p.image_url,
+                       p.safety_status, p.comedogenic_count
+                FROM products p
+                WHERE p.id IN (
+                    SELECT DISTINCT m.product_id
+                    FROM unnest(%s::int[]) AS t(ingredient_id)
+                    CROSS JOIN LATERAL (
+                        SELECT pi.product_id
+                        FROM product_ingredients pi
+                        WHERE pi.ingredient_id = t.ingredient_id
+                          AND pi.product_id > %s
+                        ORDER BY pi.product_id
+                        LIMIT %s
+                    ) m
+                    ORDER BY m.product_id
+                    LIMIT %s
+                )
+                ORDER BY p.id
+            """,
+                (ingredient_ids, after_id, limit, limit),
+            )
+
+        return [
+            {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "image_url": row[4],
+                "safety_status": row[5],
+                "comedogenic_count": row[6],
+            }
+            for row in self.db.read_cursor.fetchall()
         ]
 
+    def compare_products(self, product_ids):
+        """
+        Ingredient overlap between several products in one round-trip.
+
+        The database groups links by ingredient (which products contain it,
+        at which positions) and scores every pair of products with a
+        position-weighted Jaccard: an ingredient at label position p weighs
+        1/p, so overlap near the top of the list (highest concentration)
+        counts most. Links without a position weigh as position 100; the
+        CLI scraper numbers from 0, which weighs as position 1.
+
+        :return: Dict with products (id, name, category, image_url),
+                 ingredients (id, name, product_ids, positions) and
+                 overlap (product_a, product_b, score, shared_count)
+        """
+        self.db.read_cursor.execute(
+            """
+            WITH requested AS (
+                SELECT id, name, category, image_url
+                FROM products
+                WHERE id = ANY(%(ids)s)
+            ),
+            links AS (
+                SELECT product_id, ingredient_id, position,
+                       1.0 / GREATEST(COALESCE(position, 100), 1) AS weight
+                FROM product_ingredients
+                WHERE product_id = ANY(%(ids)s)
+            ),
+            grouped AS (
+                SELECT l.ingredient_id, i.name,
+                       array_agg(l.product_id ORDER BY l.product_id) AS product_ids,
+                       array_agg(l.position ORDER BY l.product_id) AS positions,
+                       MIN(l.position) AS first_position
+                FROM links l
+                JOIN ingredients i ON i.id = l.ingredient_id
+                GROUP BY l.ingredient_id, i.name
+            ),
+            pairs AS (
+                SELECT a.id AS product_a, b.id AS product_b, s.score, s.shared_count
+                FROM requested a
+                JOIN requested b ON a.id < b.id
+                CROSS JOIN LATERAL (
+                    SELECT
+                        -- LEAST/GREATEST skip NULLs: only shared links count
+                        -- towards the numerator, every link towards the union
+                        COALESCE(
+                            SUM(LEAST(la.weight, lb.weight)) FILTER (
+                                WHERE la.weight IS NOT NULL AND lb.weight IS NOT NULL
+                            ) / NULLIF(SUM(GREATEST(la.weight, lb.weight)), 0),
+                            0
+                        ) AS score,
+                        COUNT(*) FILTER (
+                            WHERE la.weight IS NOT NULL AND lb.weight IS NOT NULL
+                        ) AS shared_count
+                    FROM (SELECT * FROM links WHERE product_id = a.id) la
+                    FULL JOIN (SELECT * FROM links WHERE product_id = b.id) lb
+                        USING (ingredient_id)
+                ) s
+            )
+            SELECT
+                (SELECT COALESCE(json_agg(r ORDER BY r.id), '[]') FROM requested r),
+                (SELECT COALESCE(json_agg(
+                    json_build_object(
+                        'id', g.ingredient_id, 'name', g.name,
+                        'product_ids', g.product_ids, 'positions', g.positions
+                    )
+                    ORDER BY g.first_position NULLS LAST, g.name
+                ), '[]') FROM grouped g),
+                (SELECT COALESCE(json_agg(
+                    json_build_object(
+                        'product_a', x.product_a, 'product_b', x.product_b,
+                        'score', round(x.score, 4)::float, 'shared_count', x.shared_count
+                    )
+                    ORDER BY x.product_a, x.product_b
+                ), '[]') FROM pairs x)
+        """,
+            {"ids": list(product_ids)},
+        )
+        products, ingredients, overlap = self.db.read_cursor.fetchone()
+        return {"products": products, "ingredients": ingredients, "overlap": overlap}
+
 
 class ScrapeLogModel:
     """CRUD operations for scrape_logs table"""
@@ -333,3 +1245,41 @@ class ScrapeLogModel:
         """,
             (source, product_id, status, error_message),
         )
+
+    def log_attempts(self, entries):
+        """
+        Insert scrape attempts with stage timings in one statement.
+
+        :param entries: Dicts as built by scraper.timing.ScrapeAttempt
+        """
+        if not entries:
+            return
+        execute_values(
+            self.db.cursor,
+            """
+            INSERT INTO scrape_logs (
+                source, url, product_id, status, category, error_class,
+                error_message, ingredient_count, navigation_ms, render_wait_ms,
+                extraction_ms, db_write_ms, scraped_at
+            )
+            VALUES %s
+        """,
+            [
+                (
+                    entry["source"],
+                    entry["url"],
+                    entry["product_id"],
+                    entry["status"],
+                    entry["category"],
+                    entry["error_class"],
+                    entry["error_message"],
+                    entry["ingredient_count"],
+                    entry["navigation_ms"],
+                    entry["render_wait_ms"],
+                    entry["extraction_ms"],
+                    entry["db_write_ms"],
+                    entry["scraped_at"],
+                )
+                for entry in entries
+            ],
+        )
@@ -0,0 +1,189 @@
+"""
+Re-evaluate only the products affected by a comedogenic dictionary change.
+
+Diffs the dictionary that current verdicts were computed against
+(evaluated_comedogenic_ingredients) with the current comedogenic
+ingredients and typo vocabulary, finds the ingredient names whose
+resolution changed, and recomputes just the products containing them.
+Run after reseeding; seed_comedogenic_data.py calls this automatically.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.canonicalizer import IngredientCanonicalizer
+from database.models import Database, IngredientModel, ProductModel
+
+load_dotenv()
+
+
+def diff_dictionaries(old, new):
+    """
+    Compare two dictionary snapshots keyed by ingredient id.
+
+    :return: (added, removed, modified) lists of ingredient ids
+    """
+    old_by_id = {entry["id"]: entry for entry in old}
+    new_by_id = {entry["id"]: entry for entry in new}
+
+    added = [i for i in new_by_id if i not in old_by_id]
+    removed = [i for i in old_by_id if i not in new_by_id]
+    modified = [
+        i
+        for i in new_by_id
+        if i in old_by_id
+        and (
+            old_by_id[i]["name"] != new_by_id[i]["name"]
+            or sorted(old_by_id[i]["common_names"] or [])
+            != sorted(new_by_id[i]["common_names"] or [])
+        )
+    ]
+    return added, removed, modified
+
+
+def find_affected_ingredient_ids(database, old_canonicalizer, new_canonicalizer):
+    """
+    Ingredient rows whose dictionary resolution differs between snapshots.
+
+    Streams the ingredient vocabulary (not the product catalogue) through
+    a server-side cursor; each name costs a few hash lookups.
+    """
+    affected = []
+    with database.conn.cursor(name="reevaluate_ingredients") as cursor:
+        cursor.itersize = 5000
+        cursor.execute("SELECT id, name FROM ingredients")
+        for ingredient_id, name in cursor:
+            old = old_canonicalizer.resolve(name)
+            new = new_canonicalizer.resolve(name)
+            if (old and old["id"]) != (new and new["id"]):
+                affected.append(ingredient_id)
+    return affected
+
+
+def reevaluate_changed_products(database, batch_size=500):
+    """
+    Recompute verdicts for products affected by the dictionary change.
+
+    :return: Dict of dictionary diff sizes, products re-evaluated and
+             verdicts changed
+    """
+    ingredient_model = IngredientModel(database)
+    product_model = ProductModel(database)
+
+    database.cursor.execute(
+        """
+        SELECT ingredient_id, name, common_names, is_comedogenic
+        FROM evaluated_comedogenic_ingredients
+        """
+    )
+    old = []
+    old_vocabulary = []
+    for ingredient_id, name, common_names, is_comedogenic in database.cursor:
+        if is_comedogenic:
+            old.append(
+                {"id": ingredient_id, "name": name, "common_names": common_names}
+            )
+        else:
+            old_vocabulary.append(name)
+    new = ingredient_model.get_comedogenic()
+    new_vocabulary = ingredient_model.get_fuzzy_vocabulary()
+
+    added, removed, modified = diff_dictionaries(old, new)
+    vocabulary_changed = set(old_vocabulary) ^ set(new_vocabulary)
+    stats = {
+        "added": len(added),
+        "removed": len(removed),
+        "modified": len(modified),
+        "vocabulary_changed": len(vocabulary_changed),
+        "products_reevaluated": 0,
+        "verdicts_changed": 0,
+    }
+    if not (added or removed or modified or vocabulary_changed):
+        return stats
+
+    if not old:
+        # Nothing evaluated yet: every product needs a baseline verdict
+        database.cursor.execute("SELECT COUNT(*) FROM products")
+        stats["products_reevaluated"] = database.cursor.fetchone()[0]
+        stats["verdicts_changed"] = product_model.refresh_safety_status(
+            batch_size=batch_size
+        )
+        save_evaluated_dictionary(database)
+        database.conn.commit()
+        return stats
+
+    affected_ingredients = find_affected_ingredient_ids(
+        database,
+        IngredientCanonicalizer(old, old_vocabulary),
+        IngredientCanonicalizer(new, new_vocabulary),
+    )
+
+    if affected_ingredients:
+        database.cursor.execute(
+            """
+            SELECT DISTINCT product_id
+            FROM product_ingredients
+            WHERE ingredient_id = ANY(%s)
+            """,
+            (affected_ingredients,),
+        )
+        product_ids = [row[0] for row in database.cursor.fetchall()]
+        stats["products_reevaluated"] = len(product_ids)
+        stats["verdicts_changed"] = product_model.refresh_safety_status(
+            product_ids, batch_size=batch_size
+        )
+
+    # Verdicts now reflect the current dictionary
+    save_evaluated_dictionary(database)
+    database.conn.commit()
+    return stats
+
+
+def save_evaluated_dictionary(database):
+    """Record the current dictionary and typo vocabulary as the evaluated ones"""
+    database.cursor.execute("DELETE FROM evaluated_comedogenic_ingredients")
+    database.cursor.execute(
+        """
+        INSERT INTO evaluated_comedogenic_ingredients
+            (ingredient_id, name, common_names, is_comedogenic)
+        SELECT id, name, common_names, is_comedogenic
+        FROM ingredients
+        WHERE is_comedogenic OR in_vocabulary
+        """
+    )
+
+
+def print_stats(stats):
+    print(
+        f"Dictionary change: +{stats['added']} / -{stats['removed']}"
+        f" / ~{stats['modified']} ingredients"
+    )
+    print(f"Typo vocabulary change: {stats['vocabulary_changed']} names")
+    print(f"✓ Re-evaluated {stats['products_reevaluated']} products")
+    print(f"  - Verdict changed: {stats['verdicts_changed']}")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("RE-EVALUATING PRODUCTS FOR DICTIONARY CHANGES")
+    print("=" * 50)
+    print()
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+    print_stats(reevaluate_changed_products(database))
+    database.close()
+
+    print()
+    print("=" * 50)
+    print("Done!")
+    print("=" * 50)
@@ -0,0 +1,57 @@
+"""
+Recompute the precomputed safety verdict for every product.
+Run this after applying migration 002 or after reseeding ingredients.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import Database, ProductModel
+from database.reevaluate_products import save_evaluated_dictionary
+
+load_dotenv()
+
+
+def refresh_all_safety_status(batch_size=500):
+    """Recompute safety_status and comedogenic_count for all products"""
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+
+    database = Database(db_params)
+    database.connect()
+
+    product_model = ProductModel(database)
+    changed = product_model.refresh_safety_status(batch_size=batch_size)
+    save_evaluated_dictionary(database)
+    database.conn.commit()
+
+    database.cursor.execute(
+        "SELECT safety_status, COUNT(*) FROM products GROUP BY safety_status ORDER BY 1"
+    )
+    counts = database.cursor.fetchall()
+    database.close()
+
+    print(f"✓ Verdict changed for {changed} products")
+    for status, count in counts:
+        print(f"  - {status}: {count}")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("REFRESHING PRODUCT SAFETY STATUS")
+    print("=" * 50)
+    print()
+
+    refresh_all_safety_status()
+
+    print()
+    print("=" * 50)
+    print("Done!")
+    print("=" * 50)
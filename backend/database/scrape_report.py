@@ -0,0 +1,212 @@
+"""
+Report scraper performance from the per-attempt timings in scrape_logs
+(migration 006): throughput over time, the slowest stages, failure rates
+by error class and category, and the slowest URLs.
+
+Usage: python database/scrape_report.py --hours 24 --bucket hour [--source cli]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import Database
+from scraper.timing import STAGES
+
+load_dotenv()
+
+BUCKETS = ("minute", "hour", "day")
+
+# Rows logged per attempt (migration 006 onwards) carry the URL
+TIMED = "url IS NOT NULL"
+
+
+def _filters(since, source):
+    clauses = ["scraped_at >= %s", TIMED]
+    params = [since]
+    if source:
+        clauses.append("source = %s")
+        params.append(source)
+    return " AND ".join(clauses), params
+
+
+def throughput(cursor, since, source=None, bucket="hour"):
+    """(bucket start, attempts, successes, pages per minute) over time"""
+    where, params = _filters(since, source)
+    minutes = {"minute": 1, "hour": 60, "day": 1440}[bucket]
+    cursor.execute(
+        f"""
+        SELECT date_trunc(%s, scraped_at) AS bucket,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'success'),
+               COUNT(*) FILTER (WHERE status = 'success')::float / %s
+        FROM scrape_logs
+        WHERE {where}
+        GROUP BY bucket
+        ORDER BY bucket
+        """,
+        [bucket, minutes] + params,
+    )
+    return cursor.fetchall()
+
+
+def stage_timings(cursor, since, source=None):
+    """(stage, samples, avg, p50, p95, max) in ms, slowest p95 first"""
+    where, params = _filters(since, source)
+    selects = " UNION ALL ".join(
+        f"SELECT '{stage}' AS stage, {stage}_ms AS ms FROM attempts" for stage in STAGES
+    )
+    cursor.execute(
+        f"""
+        WITH attempts AS (
+            SELECT * FROM scrape_logs WHERE {where}
+        ),
+        stages AS ({selects})
+        SELECT stage,
+               COUNT(ms),
+               AVG(ms),
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY ms),
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY ms),
+               MAX(ms)
+        FROM stages
+        WHERE ms IS NOT NULL
+        GROUP BY stage
+        ORDER BY 5 DESC
+        """,
+        params,
+    )
+    return cursor.fetchall()
+
+
+def failures_by(cursor, column, since, source=None, limit=10):
+    """(value, attempts, failures, failure rate) grouped by a scrape_logs column"""
+    where, params = _filters(since, source)
+    cursor.execute(
+        f"""
+        SELECT COALESCE({column}, '(unknown)'),
+               COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'failed'),
+               AVG((status = 'failed')::int)
+        FROM scrape_logs
+        WHERE {where}
+        GROUP BY 1
+        HAVING COUNT(*) FILTER (WHERE status = 'failed') > 0
+        ORDER BY 3 DESC
+        LIMIT %s
+        """,
+        params + [limit],
+    )
+    return cursor.fetchall()
+
+
+def slowest_urls(cursor, since, source=None, limit=10):
+    """(url, status, total ms, slowest stage) for the slowest attempts"""
+    where, params = _filters(since, source)
+    stage_columns = ", ".join(f"COALESCE({stage}_ms, 0)" for stage in STAGES)
+    cursor.execute(
+        f"""
+        SELECT url, status, total_ms,
+               (ARRAY[{", ".join(f"'{stage}'" for stage in STAGES)}])[
+                   array_position(timings, greatest_ms)
+               ]
+        FROM (
+            SELECT url, status,
+                   ARRAY[{stage_columns}] AS timings,
+                   GREATEST({stage_columns}) AS greatest_ms,
+                   {" + ".join(f"COALESCE({stage}_ms, 0)" for stage in STAGES)}
+                       AS total_ms
+            FROM scrape_logs
+            WHERE {where}
+        ) attempts
+        ORDER BY total_ms DESC
+        LIMIT %s
+        """,
+        params + [limit],
+    )
+    return cursor.fetchall()
+
+
+def print_report(since, source=None, bucket="hour", limit=10):
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+    cursor = database.read_cursor
+
+    try:
+        print(
+            f"Scrape attempts since {since:%Y-%m-%d %H:%M}"
+            + (f" (source: {source})" if source else "")
+        )
+
+        print()
+        print(f"Throughput per {bucket}")
+        print(f"  {'bucket':<17} {'attempts':>9} {'success':>9} {'pages/min':>10}")
+        for start, attempts, successes, per_minute in throughput(
+            cursor, since, source, bucket
+        ):
+            print(
+                f"  {start:%Y-%m-%d %H:%M} {attempts:>9} {successes:>9}"
+                f" {per_minute:>10.2f}"
+            )
+
+        print()
+        print("Stage timings (ms)")
+        print(
+            f"  {'stage':<12} {'samples':>8} {'avg':>9} {'p50':>9} {'p95':>9} {'max':>9}"
+        )
+        for stage, samples, avg, p50, p95, max_ms in stage_timings(
+            cursor, since, source
+        ):
+            print(
+                f"  {stage:<12} {samples:>8} {avg:>9.1f} {p50:>9.1f} {p95:>9.1f}"
+                f" {max_ms:>9.1f}"
+            )
+
+        for title, column in (
+            ("Failures by error class", "error_class"),
+            ("Failures by category", "category"),
+        ):
+            print()
+            print(title)
+            rows = failures_by(cursor, column, since, source, limit)
+            if not rows:
+                print("  (none)")
+            for value, attempts, failed, rate in rows:
+                print(f"  {value:<30} {failed:>6}/{attempts:<6} {rate:>7.1%}")
+
+        print()
+        print("Slowest URLs (ms)")
+        for url, status, total_ms, stage in slowest_urls(cursor, since, source, limit):
+            print(f"  {total_ms:>9.1f}  {stage:<12} {status:<8} {url}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report scraper stage timings")
+    parser.add_argument(
+        "--hours", type=float, default=24, help="Report the last N hours"
+    )
+    parser.add_argument(
+        "--since", help="Report from this ISO timestamp instead of --hours"
+    )
+    parser.add_argument("--bucket", choices=BUCKETS, default="hour")
+    parser.add_argument("--source", help="Only attempts from this source (cli, api)")
+    parser.add_argument("--limit", type=int, default=10, help="Rows per top-N table")
+    args = parser.parse_args()
+
+    if args.since:
+        since = datetime.fromisoformat(args.since)
+    else:
+        since = datetime.now() - timedelta(hours=args.hours)
+
+    print_report(since, args.source, args.bucket, args.limit)
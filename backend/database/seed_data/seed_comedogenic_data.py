@@ -1,17 +1,31 @@
 """
 Seed comedogenic ingredient data from CSV into database.
 Run this script to populate the ingredients table.
+
+Rows marked is_comedogenic = no are the fixed vocabulary of known
+non-comedogenic names used in typo matching (ingredients.in_vocabulary).
+
+Use --bulk for large INCI dictionaries: the file is streamed through COPY
+into a staging table and merged in one statement.
 """
 
+import argparse
 import csv
 import psycopg2
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+from database.models import Database
+from database.reevaluate_products import print_stats, reevaluate_changed_products
+
 load_dotenv()
 
 
-def seed_comedogenic_ingredients():
+def seed_comedogenic_ingredients(path="comedogenic_ingredients.csv"):
     """Load comedogenic ingredient data from CSV into database"""
 
     # Connect to database
@@ -26,7 +40,7 @@ def seed_comedogenic_ingredients():
     conn = psycopg2.connect(**db_params)
     cursor = conn.cursor()
 
-    with open("comedogenic_ingredients.csv", "r", encoding="utf-8") as f:
+    with open(path, "r", encoding="utf-8") as f:
         # Use tab delimiter since Excel saved it that way
         reader = csv.DictReader(f, delimiter="\t")
         rows = list(reader)
@@ -48,17 +62,18 @@ def seed_comedogenic_ingredients():
             else []
         )
 
-        # Insert ingredient
+        # Insert ingredient; non-comedogenic rows join the typo vocabulary
         cursor.execute(
             """
-            INSERT INTO ingredients (name, is_comedogenic, common_names)
-            VALUES (%s, %s, %s)
+            INSERT INTO ingredients (name, is_comedogenic, common_names, in_vocabulary)
+            VALUES (%s, %s, %s, %s)
             ON CONFLICT (name) DO UPDATE
             SET is_comedogenic = EXCLUDED.is_comedogenic,
                 common_names = EXCLUDED.common_names,
+                in_vocabulary = EXCLUDED.in_vocabulary,
                 updated_at = CURRENT_TIMESTAMP
             """,
-            (name, is_comedogenic, common_names),
+            (name, is_comedogenic, common_names, not is_comedogenic),
         )
 
     conn.commit()
@@ -67,7 +82,7 @@ def seed_comedogenic_ingredients():
     cursor.execute("SELECT COUNT(*) FROM ingredients WHERE is_comedogenic = TRUE")
     comedogenic_count = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM ingredients WHERE is_comedogenic = FALSE")
+    cursor.execute("SELECT COUNT(*) FROM ingredients WHERE in_vocabulary")
     safe_count = cursor.fetchone()[0]
 
     cursor.close()
@@ -75,16 +90,133 @@ def seed_comedogenic_ingredients():
 
     print(f"✓ Successfully loaded {len(rows)} ingredients")
     print(f"  - Comedogenic: {comedogenic_count}")
-    print(f"  - Safe: {safe_count}")
+    print(f"  - Vocabulary (non-comedogenic): {safe_count}")
+
+    reevaluate_after_seed(db_params)
+
+
+def seed_comedogenic_ingredients_bulk(path="comedogenic_ingredients.csv"):
+    """
+    Stream the TSV through COPY into a staging table and merge it into
+    ingredients in a single statement.
+
+    Idempotent: rows whose is_comedogenic and common_names already match
+    are not written, so reseeding an unchanged file writes nothing.
+    """
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+
+    conn = psycopg2.connect(**db_params)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TEMP TABLE staging_ingredients (
+            name TEXT,
+            is_comedogenic TEXT,
+            common_names TEXT
+        ) ON COMMIT DROP
+        """
+    )
+
+    with open(path, "r", encoding="utf-8") as f:
+        # Same tab-delimited layout as the row-by-row loader
+        cursor.copy_expert(
+            """
+            COPY staging_ingredients (name, is_comedogenic, common_names)
+            FROM STDIN WITH (FORMAT csv, DELIMITER E'\t', HEADER true)
+            """,
+            f,
+        )
+
+    cursor.execute(
+        """
+        WITH staged AS (
+            SELECT DISTINCT ON (btrim(name))
+                btrim(name) AS name,
+                LOWER(btrim(COALESCE(is_comedogenic, ''))) IN ('yes', 'true', '1')
+                    AS is_comedogenic,
+                ARRAY(
+                    SELECT btrim(alias)
+                    FROM unnest(string_to_array(COALESCE(common_names, ''), '|')) alias
+                    WHERE btrim(alias) <> ''
+                ) AS common_names
+            FROM staging_ingredients
+            WHERE btrim(COALESCE(name, '')) <> ''
+            ORDER BY btrim(name)
+        ),
+        merged AS (
+            INSERT INTO ingredients (name, is_comedogenic, common_names, in_vocabulary)
+            SELECT name, is_comedogenic, common_names, NOT is_comedogenic FROM staged
+            ON CONFLICT (name) DO UPDATE
+            SET is_comedogenic = EXCLUDED.is_comedogenic,
+                common_names = EXCLUDED.common_names,
+                in_vocabulary = EXCLUDED.in_vocabulary,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE ingredients.is_comedogenic IS DISTINCT FROM EXCLUDED.is_comedogenic
+               OR ingredients.common_names IS DISTINCT FROM EXCLUDED.common_names
+               OR ingredients.in_vocabulary IS DISTINCT FROM EXCLUDED.in_vocabulary
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            (SELECT COUNT(*) FROM staged),
+            COUNT(*) FILTER (WHERE inserted),
+            COUNT(*) FILTER (WHERE NOT inserted)
+        FROM merged
+        """
+    )
+    staged_count, inserted, updated = cursor.fetchone()
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    print(f"✓ Merged {staged_count} ingredients from {path}")
+    print(f"  - Inserted: {inserted}")
+    print(f"  - Updated: {updated}")
+    print(f"  - Unchanged: {staged_count - inserted - updated}")
+
+    reevaluate_after_seed(db_params)
+
+
+def reevaluate_after_seed(db_params):
+    """Re-evaluate only the products affected by the dictionary change"""
+    database = Database(db_params)
+    database.connect()
+    print()
+    print_stats(reevaluate_changed_products(database))
+    database.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed comedogenic ingredients")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="COPY the file into a staging table and merge in one statement",
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default="comedogenic_ingredients.csv",
+        help="Tab-delimited file with name, is_comedogenic, common_names",
+    )
+    args = parser.parse_args()
+
     print("=" * 50)
     print("SEEDING COMEDOGENIC INGREDIENT DATA")
     print("=" * 50)
     print()
 
-    seed_comedogenic_ingredients()
+    if args.bulk:
+        seed_comedogenic_ingredients_bulk(args.path)
+    else:
+        seed_comedogenic_ingredients(args.path)
 
     print()
     print("=" * 50)
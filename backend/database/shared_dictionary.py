@@ -0,0 +1,362 @@
+"""
+Compiled comedogenic dictionary shared by every API worker on a node.
+
+One loader process compiles the alias map and typo index (see
+canonicalizer.py) into a flat file: open-addressing hash tables of
+normalized names and of deletion variants, the canonical ingredients and
+one UTF-8 string blob. Workers mmap it read-only,
+so all of them share the same page-cache pages and nothing is copied or
+rebuilt per worker; lookups read slots straight from the mapping.
+
+Reloads are atomic: the loader writes the next generation to a temp file
+and os.replace()s it over the path. Workers notice the new inode, map it
+and swap their reference; requests still holding the previous mapping
+finish on it. Put the file on tmpfs (e.g. /dev/shm) to keep it off disk.
+
+Build (and keep rebuilding on dictionary changes):
+    python database/shared_dictionary.py --output /dev/shm/safeskin.dict --watch
+Then start the API with SHARED_DICTIONARY_PATH=/dev/shm/safeskin.dict.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.canonicalizer import IngredientCanonicalizer
+
+MAGIC = b"SSDICT03"
+
+# magic, generation, alias count, key slot count, ingredient count,
+# max alias words, max edit distance, delete slot count, key slot list
+# length, version length
+HEADER = struct.Struct("<8sQIIIIIIII")
+
+# key offset, key length, ingredient index (-1 marks an empty slot,
+# KNOWN_NAME a known non-comedogenic name)
+SLOT = struct.Struct("<IIi")
+KNOWN_NAME = -2
+
+# ingredient id, name offset, name length
+INGREDIENT = struct.Struct("<qII")
+
+# variant offset, variant length, key slot list offset, list length
+# (list length 0 marks an empty slot)
+DELETE_SLOT = struct.Struct("<IIII")
+KEY_SLOT_INDEX = struct.Struct("<I")
+
+# Resolved names each worker remembers on top of the shared mapping. Kept
+# small on purpose: a miss is only a few slot reads from the mmap, so a
+# large per-process memo would just duplicate the shared state per worker
+SHARED_RESOLVE_CACHE_SIZE = 2048
+
+# This worker's attached dictionary, swapped when the loader replaces the file
+_attached = {"canonicalizer": None}
+
+
+def dictionary_version_key(version):
+    """Serialize IngredientModel.get_dictionary_version() for the header"""
+    entry_total, last_change = version
+    stamp = last_change.timestamp() if last_change else 0
+    return f"{entry_total}-{stamp:.6f}"
+
+
+def _slot_index(key, slot_count):
+    return zlib.crc32(key) % slot_count
+
+
+def _hash_table(keys, slot_count):
+    """Open-addressing slot for each key (bytes), in order"""
+    taken = set()
+    positions = []
+    for key in keys:
+        index = _slot_index(key, slot_count)
+        while index in taken:
+            index = (index + 1) % slot_count
+        taken.add(index)
+        positions.append(index)
+    return positions
+
+
+def compile_dictionary(canonicalizer, version, generation):
+    """Serialize an IngredientCanonicalizer's lookup tables to bytes"""
+    strings = bytearray()
+
+    def add_string(text):
+        data = text.encode("utf-8")
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    ingredients = []
+    ingredient_index = {}
+    for canonical in canonicalizer.aliases.values():
+        if canonical["id"] not in ingredient_index:
+            ingredient_index[canonical["id"]] = len(ingredients)
+            ingredients.append((canonical["id"], *add_string(canonical["name"])))
+
+    # Load factors of at most 0.5 keep probe sequences short
+    entries = [
+        (key, ingredient_index[canonical["id"]])
+        for key, canonical in canonicalizer.aliases.items()
+    ] + [(key, KNOWN_NAME) for key in canonicalizer.known]
+    slot_count = max(8, 2 * len(entries))
+    slots = [(0, 0, -1)] * slot_count
+    key_slots = {}
+    positions = _hash_table([key.encode("utf-8") for key, _ in entries], slot_count)
+    for (key, ingredient), index in zip(entries, positions):
+        slots[index] = (*add_string(key), ingredient)
+        key_slots[key] = index
+
+    delete_count = max(8, 2 * len(canonicalizer.deletes))
+    delete_slots = [(0, 0, 0, 0)] * delete_count
+    key_slot_lists = []
+    positions = _hash_table(
+        [variant.encode("utf-8") for variant in canonicalizer.deletes], delete_count
+    )
+    for (variant, keys), index in zip(canonicalizer.deletes.items(), positions):
+        delete_slots[index] = (*add_string(variant), len(key_slot_lists), len(keys))
+        key_slot_lists.extend(key_slots[key] for key in keys)
+
+    version_bytes = version.encode("utf-8")
+    parts = [
+        HEADER.pack(
+            MAGIC,
+            generation,
+            len(canonicalizer.aliases),
+            slot_count,
+            len(ingredients),
+            canonicalizer.max_alias_words,
+            canonicalizer.max_edit_distance,
+            delete_count,
+            len(key_slot_lists),
+            len(version_bytes),
+        ),
+        version_bytes,
+    ]
+    parts.extend(SLOT.pack(*slot) for slot in slots)
+    parts.extend(INGREDIENT.pack(*ingredient) for ingredient in ingredients)
+    parts.extend(DELETE_SLOT.pack(*slot) for slot in delete_slots)
+    parts.extend(KEY_SLOT_INDEX.pack(index) for index in key_slot_lists)
+    parts.append(bytes(strings))
+    return b"".join(parts)
+
+
+def read_generation(path):
+    """Generation of the dictionary file at path, or 0 if there is none"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return 0
+    if len(header) < HEADER.size or header[:8] != MAGIC:
+        return 0
+    return HEADER.unpack(header)[1]
+
+
+def write_shared_dictionary(canonicalizer, version, path):
+    """
+    Atomically replace path with the next generation of the dictionary.
+
+    :return: The new generation number
+    """
+    generation = read_generation(path) + 1
+    data = compile_dictionary(canonicalizer, version, generation)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return generation
+
+
+class SharedIngredientCanonicalizer(IngredientCanonicalizer):
+    """IngredientCanonicalizer served from a read-only mmap'd dictionary file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_key = (stat.st_dev, stat.st_ino)
+        self._resolved = {}
+        self.resolve_cache_size = SHARED_RESOLVE_CACHE_SIZE
+
+        (
+            magic,
+            self.generation,
+            self._alias_count,
+            self._slot_count,
+            ingredient_count,
+            self.max_alias_words,
+            self.max_edit_distance,
+            self._delete_count,
+            list_length,
+            version_length,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a shared dictionary file: {path}")
+
+        offset = HEADER.size
+        self.version = self._map[offset : offset + version_length].decode("utf-8")
+        self._slots_offset = offset + version_length
+        self._ingredients_offset = self._slots_offset + self._slot_count * SLOT.size
+        self._deletes_offset = (
+            self._ingredients_offset + ingredient_count * INGREDIENT.size
+        )
+        self._lists_offset = (
+            self._deletes_offset + self._delete_count * DELETE_SLOT.size
+        )
+        self._strings_offset = self._lists_offset + list_length * KEY_SLOT_INDEX.size
+
+    def __len__(self):
+        return self._alias_count
+
+    def _string(self, offset, length):
+        start = self._strings_offset + offset
+        return self._map[start : start + length]
+
+    def _find_key(self, key):
+        """(slot index, ingredient index) for a normalized name, or None"""
+        data = key.encode("utf-8")
+        index = _slot_index(data, self._slot_count)
+        while True:
+            key_offset, key_length, ingredient = SLOT.unpack_from(
+                self._map, self._slots_offset + index * SLOT.size
+            )
+            if ingredient == -1:
+                return None
+            if key_length == len(data) and self._string(key_offset, key_length) == data:
+                return index, ingredient
+            index = (index + 1) % self._slot_count
+
+    def lookup(self, key):
+        found = self._find_key(key)
+        if found is None or found[1] == KNOWN_NAME:
+            return None
+        ingredient_id, name_offset, name_length = INGREDIENT.unpack_from(
+            self._map, self._ingredients_offset + found[1] * INGREDIENT.size
+        )
+        return {
+            "id": ingredient_id,
+            "name": self._string(name_offset, name_length).decode("utf-8"),
+        }
+
+    def is_known(self, key):
+        found = self._find_key(key)
+        return found is not None and found[1] == KNOWN_NAME
+
+    def delete_candidates(self, variant):
+        data = variant.encode("utf-8")
+        index = _slot_index(data, self._delete_count)
+        while True:
+            variant_offset, variant_length, list_offset, count = (
+                DELETE_SLOT.unpack_from(
+                    self._map, self._deletes_offset + index * DELETE_SLOT.size
+                )
+            )
+            if count == 0:
+                return ()
+            if (
+                variant_length == len(data)
+                and self._string(variant_offset, variant_length) == data
+            ):
+                break
+            index = (index + 1) % self._delete_count
+
+        keys = []
+        for position in range(list_offset, list_offset + count):
+            (slot,) = KEY_SLOT_INDEX.unpack_from(
+                self._map, self._lists_offset + position * KEY_SLOT_INDEX.size
+            )
+            key_offset, key_length, _ = SLOT.unpack_from(
+                self._map, self._slots_offset + slot * SLOT.size
+            )
+            keys.append(self._string(key_offset, key_length).decode("utf-8"))
+        return keys
+
+
+def attach_shared_dictionary(path):
+    """
+    This worker's SharedIngredientCanonicalizer for path, or None if the
+    loader has not written it yet (or wrote an older format). Re-attaches
+    when the file is replaced.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    attached = _attached["canonicalizer"]
+    if attached is None or attached.file_key != (stat.st_dev, stat.st_ino):
+        # A single reference swap; in-flight users keep the old mapping alive
+        try:
+            attached = SharedIngredientCanonicalizer(path)
+        except ValueError:
+            return None
+        _attached["canonicalizer"] = attached
+    return attached
+
+
+def build_shared_dictionary(path, watch=False, interval=30.0):
+    """Compile the comedogenic dictionary to path, optionally on every change"""
+    from dotenv import load_dotenv
+    from database.models import Database, IngredientModel
+
+    load_dotenv()
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+    ingredient_model = IngredientModel(database)
+
+    built_version = None
+    try:
+        while True:
+            version = dictionary_version_key(ingredient_model.get_dictionary_version())
+            if version != built_version:
+                canonicalizer = IngredientCanonicalizer(
+                    ingredient_model.get_comedogenic(),
+                    ingredient_model.get_fuzzy_vocabulary(),
+                )
+                generation = write_shared_dictionary(canonicalizer, version, path)
+                built_version = version
+                print(
+                    f"✓ Wrote generation {generation} to {path} "
+                    f"({len(canonicalizer)} aliases, {os.path.getsize(path)} bytes)"
+                )
+            # Don't hold a snapshot open between polls
+            database.read_conn.rollback()
+            if not watch:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile the comedogenic dictionary for shared worker use"
+    )
+    parser.add_argument("--output", required=True, help="Dictionary file path")
+    parser.add_argument(
+        "--watch", action="store_true", help="Rebuild whenever the dictionary changes"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=30.0, help="Seconds between checks"
+    )
+    args = parser.parse_args()
+
+    build_shared_dictionary(args.output, args.watch, args.interval)
@@ -0,0 +1,484 @@
+"""
+Read-only SQLite snapshot of the catalogue for Postgres-free API workers.
+
+export: python database/snapshot.py --output safeskin.snapshot
+serve:  SNAPSHOT_PATH=safeskin.snapshot uvicorn api.main:app
+
+The snapshot holds products (with precomputed verdicts), ingredients and
+product_ingredients (with per-ingredient comedogenic flags), an FTS5 index
+over product names, and a meta table with the schema and dictionary
+versions. Workers open it read-only and immutable with mmap enabled, so
+they start in milliseconds and share its pages through the OS page cache.
+A new snapshot is written to a temporary file and atomically renamed into
+place; workers already holding the old file keep reading it.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import groupby
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import (
+    HYBRID_MIN_FULLTEXT_HITS,
+    SEARCH_MODES,
+    Database,
+    analyze_ingredients,
+    load_canonicalizer,
+)
+
+load_dotenv()
+
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# Bytes of the snapshot each connection may map (shared via the page cache)
+SNAPSHOT_MMAP_SIZE = 1 << 30
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    nykaa_product_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    url TEXT NOT NULL,
+    image_url TEXT,
+    safety_status TEXT,
+    comedogenic_count INTEGER,
+    comedogenic_ingredients TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE ingredients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    is_comedogenic INTEGER NOT NULL,
+    common_names TEXT
+);
+
+CREATE TABLE product_ingredients (
+    product_id INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL,
+    position INTEGER,
+    is_comedogenic INTEGER NOT NULL,
+    canonical_name TEXT,
+    PRIMARY KEY (product_id, ingredient_id)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE products_fts USING fts5(
+    name, content='products', content_rowid='id'
+);
+"""
+
+SNAPSHOT_INDEXES = """
+CREATE UNIQUE INDEX idx_products_nykaa_id ON products (nykaa_product_id);
+CREATE INDEX idx_products_category ON products (category, id);
+CREATE INDEX idx_products_safety_status ON products (safety_status, id);
+CREATE INDEX idx_products_safety_status_category ON products (safety_status, category, id);
+"""
+
+
+class SnapshotDatabase:
+    """Read-only connection manager over a snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.read_cursor = None
+
+    def connect(self):
+        self.conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False
+        )
+        self.conn.execute(f"PRAGMA mmap_size = {SNAPSHOT_MMAP_SIZE}")
+        self.read_cursor = self.conn.cursor()
+
+    @property
+    def read_conn(self):
+        return self.conn
+
+    @property
+    def cursor(self):
+        raise RuntimeError("Snapshot database is read-only")
+
+    def close(self):
+        if self.read_cursor:
+            self.read_cursor.close()
+        if self.conn:
+            self.conn.close()
+
+
+class SnapshotProductModel:
+    """Read-only ProductModel counterpart served from a snapshot"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _meta(self, key):
+        self.db.read_cursor.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = self.db.read_cursor.fetchone()
+        return row[0] if row else None
+
+    def get_cache_version(self, product_id):
+        """Cache validators: product updated_at and the snapshot's dictionary version"""
+        self.db.read_cursor.execute(
+            "SELECT updated_at FROM products WHERE id = ?", (product_id,)
+        )
+        row = self.db.read_cursor.fetchone()
+        if not row:
+            return None
+
+        dictionary_updated_at = self._meta("dictionary_updated_at")
+        return {
+            "updated_at": datetime.fromisoformat(row[0]),
+            "dictionary_version": self._meta("dictionary_version"),
+            "dictionary_updated_at": (
+                datetime.fromisoformat(dictionary_updated_at)
+                if dictionary_updated_at
+                else None
+            ),
+        }
+
+    def get_by_id(self, product_id):
+        """Get product by ID"""
+        self.db.read_cursor.execute(
+            """
+            SELECT id, nykaa_product_id, name, category, url, image_url
+            FROM products WHERE id = ?
+            """,
+            (product_id,),
+        )
+        row = self.db.read_cursor.fetchone()
+        if row:
+            return {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "url": row[4],
+                "image_url": row[5],
+            }
+        return None
+
+    @staticmethod
+    def _fts_expression(query, any_term=False):
+        """Prefix-match every term (AND), or any term when any_term is set"""
+        terms = [f'"{term}"*' for term in re.findall(r"\w+", query.lower())]
+        return (" OR " if any_term else " ").join(terms)
+
+    def _resolve_match(self, query, mode, use_fuzzy):
+        """
+        FTS5 expression for the requested mode.
+
+        There is no trigram similarity in the snapshot: fuzzy and hybrid
+        modes widen to any-term prefix matching when the all-terms query
+        has fewer than HYBRID_MIN_FULLTEXT_HITS hits.
+        """
+        if mode is None:
+            mode = "fuzzy" if use_fuzzy else "fulltext"
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        expression = self._fts_expression(query)
+        if not expression or mode == "fulltext":
+            return expression
+
+        self.db.read_cursor.execute(
+            "SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?",
+            (expression,),
+        )
+        if self.db.read_cursor.fetchone()[0] >= HYBRID_MIN_FULLTEXT_HITS:
+            return expression
+        return self._fts_expression(query, any_term=True)
+
+    def search_by_name(self, query, limit=20, offset=0, use_fuzzy=True, mode=None):
+        """Search products by name through the FTS5 index, ranked by bm25"""
+        expression = self._resolve_match(query, mode, use_fuzzy)
+        if not expression:
+            return []
+
+        self.db.read_cursor.execute(
+            """
+            SELECT p.id, p.nykaa_product_id, p.name, p.category, p.image_url,
+                   bm25(products_fts) AS rank
+            FROM products_fts
+            JOIN products p ON p.id = products_fts.rowid
+            WHERE products_fts MATCH ?
+            ORDER BY rank, p.name
+            LIMIT ? OFFSET ?
+            """,
+            (expression, limit, offset),
+        )
+        return [
+            {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "image_url": row[4],
+                # bm25 is negative, more negative is better: map onto (0, 1)
+                "relevance": -row[5] / (1 - row[5]),
+            }
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+    def count_by_name(self, query, use_fuzzy=True, mode=None):
+        """Count products matched by search_by_name with the same mode"""
+        expression = self._resolve_match(query, mode, use_fuzzy)
+        if not expression:
+            return 0
+
+        self.db.read_cursor.execute(
+            "SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?",
+            (expression,),
+        )
+        return self.db.read_cursor.fetchone()[0]
+
+    def get_product_with_safety_analysis(self, product_id):
+        """Product with the safety analysis precomputed at export time"""
+        self.db.read_cursor.execute(
+            """
+            SELECT id, nykaa_product_id, name, category, url, image_url,
+                   safety_status, comedogenic_ingredients
+            FROM products
+            WHERE id = ?
+            """,
+            (product_id,),
+        )
+        product_row = self.db.read_cursor.fetchone()
+        if not product_row:
+            return None
+
+        self.db.read_cursor.execute(
+            """
+            SELECT i.name, pi.is_comedogenic, pi.position, pi.canonical_name
+            FROM product_ingredients pi
+            JOIN ingredients i ON i.id = pi.ingredient_id
+            WHERE pi.product_id = ?
+            ORDER BY pi.position IS NULL, pi.position, i.name
+            """,
+            (product_id,),
+        )
+        all_ingredients = [
+            {
+                "name": row[0],
+                "is_comedogenic": bool(row[1]),
+                "position": row[2],
+                "canonical_name": row[3],
+            }
+            for row in self.db.read_cursor.fetchall()
+        ]
+        comedogenic_ingredients = json.loads(product_row[7] or "[]")
+
+        return {
+            "id": product_row[0],
+            "nykaa_product_id": product_row[1],
+            "name": product_row[2],
+            "category": product_row[3],
+            "url": product_row[4],
+            "image_url": product_row[5],
+            "safety_status": product_row[6],
+            "comedogenic_ingredients": comedogenic_ingredients,
+            "comedogenic_count": len(comedogenic_ingredients),
+            "all_ingredients": all_ingredients,
+        }
+
+    def list_products(self, safety_status=None, category=None, after_id=None, limit=20):
+        """Browse products by verdict and/or category, keyset paginated on id"""
+        conditions = []
+        params = []
+        if safety_status is not None:
+            conditions.append("safety_status = ?")
+            params.append(safety_status)
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.db.read_cursor.execute(
+            f"""
+            SELECT id, nykaa_product_id, name, category, image_url,
+                   safety_status, comedogenic_count
+            FROM products
+            {where}
+            ORDER BY id
+            LIMIT ?
+            """,
+            (*params, limit),
+        )
+        return [
+            {
+                "id": row[0],
+                "nykaa_product_id": row[1],
+                "name": row[2],
+                "category": row[3],
+                "image_url": row[4],
+                "safety_status": row[5],
+                "comedogenic_count": row[6],
+            }
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+    def get_categories(self):
+        """Categories with product counts"""
+        self.db.read_cursor.execute(
+            """
+            SELECT category, COUNT(*)
+            FROM products
+            WHERE category IS NOT NULL
+            GROUP BY category
+            ORDER BY category
+            """
+        )
+        return [
+            {"category": row[0], "product_count": row[1]}
+            for row in self.db.read_cursor.fetchall()
+        ]
+
+
+def write_snapshot(database, path, itersize=2000):
+    """
+    Write a snapshot of the catalogue to path (atomically replaced).
+
+    Verdicts are recomputed against the current dictionary while streaming
+    products through a server-side cursor.
+    """
+    canonicalizer = load_canonicalizer(database)
+
+    database.read_cursor.execute(
+        """
+        SELECT COUNT(*), MAX(updated_at) AT TIME ZONE current_setting('TimeZone')
+        FROM ingredients
+        WHERE is_comedogenic OR in_vocabulary
+        """
+    )
+    comedogenic_total, dictionary_updated_at = database.read_cursor.fetchone()
+    dictionary_stamp = dictionary_updated_at.timestamp() if dictionary_updated_at else 0
+
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    lite = sqlite3.connect(tmp_path)
+    lite.execute("PRAGMA journal_mode = OFF")
+    lite.execute("PRAGMA synchronous = OFF")
+    lite.executescript(SNAPSHOT_SCHEMA)
+
+    with database.read_conn.cursor(name="snapshot_ingredients") as cursor:
+        cursor.itersize = itersize
+        cursor.execute("SELECT id, name, is_comedogenic, common_names FROM ingredients")
+        lite.executemany(
+            "INSERT INTO ingredients VALUES (?, ?, ?, ?)",
+            (
+                (row[0], row[1], int(row[2]), json.dumps(row[3] or []))
+                for row in cursor
+            ),
+        )
+
+    product_count = 0
+    with database.read_conn.cursor(name="snapshot_products") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(
+            """
+            SELECT
+                p.id, p.nykaa_product_id, p.name, p.category, p.url, p.image_url,
+                p.updated_at AT TIME ZONE current_setting('TimeZone'),
+                pi.ingredient_id, i.name, pi.position
+            FROM products p
+            LEFT JOIN product_ingredients pi ON pi.product_id = p.id
+            LEFT JOIN ingredients i ON i.id = pi.ingredient_id
+            ORDER BY p.id, pi.position NULLS LAST, i.name
+            """
+        )
+        for _, rows in groupby(cursor, key=lambda row: row[0]):
+            rows = list(rows)
+            product = rows[0]
+            linked = [row for row in rows if row[7] is not None]
+            analysis = analyze_ingredients(
+                [(row[8], row[9]) for row in linked], canonicalizer
+            )
+
+            lite.execute(
+                "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    *product[:6],
+                    analysis["safety_status"],
+                    analysis["comedogenic_count"],
+                    json.dumps(analysis["comedogenic_ingredients"]),
+                    product[6].isoformat() if product[6] else None,
+                ),
+            )
+            lite.executemany(
+                "INSERT INTO product_ingredients VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        product[0],
+                        row[7],
+                        row[9],
+                        int(ingredient["is_comedogenic"]),
+                        ingredient["canonical_name"],
+                    )
+                    for row, ingredient in zip(linked, analysis["all_ingredients"])
+                ),
+            )
+            product_count += 1
+
+    lite.executescript(SNAPSHOT_INDEXES)
+    lite.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+    lite.executemany(
+        "INSERT INTO meta VALUES (?, ?)",
+        [
+            ("schema_version", str(SNAPSHOT_SCHEMA_VERSION)),
+            ("created_at", datetime.now(timezone.utc).isoformat()),
+            ("dictionary_version", f"{comedogenic_total}-{dictionary_stamp:.6f}"),
+            (
+                "dictionary_updated_at",
+                dictionary_updated_at.isoformat() if dictionary_updated_at else "",
+            ),
+            ("product_count", str(product_count)),
+        ],
+    )
+    lite.commit()
+    lite.execute("VACUUM")
+    lite.close()
+
+    os.replace(tmp_path, path)
+    return product_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a read-only API snapshot")
+    parser.add_argument("--output", required=True, help="Snapshot file path")
+    args = parser.parse_args()
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+
+    start = time.perf_counter()
+    product_count = write_snapshot(database, args.output)
+    elapsed = time.perf_counter() - start
+    database.close()
+
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"✓ Wrote snapshot of {product_count} products to {args.output}")
+    print(f"  - {size_mb:.1f} MB in {elapsed:.2f}s")
@@ -0,0 +1,107 @@
+"""
+Crawl frontier keyed on the canonical Nykaa product ID.
+
+The same product shows up in several categories with different slugs,
+hosts (nykaa.com vs www.nykaa.com) or query strings. The frontier keys
+every URL on ProductScraper.extract_product_id so each product is queued
+once, and counts the scrapes that de-duplication saved.
+
+Membership is an exact set up to exact_limit IDs, then a Bloom filter
+sized for capacity, so memory stays bounded on multi-million-URL crawls
+at the cost of error_rate false "already seen" answers.
+"""
+
+import hashlib
+import math
+from product_scraper import ProductScraper
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class ProductFrontier:
+    """Admit each product ID once, whatever URL it was found under"""
+
+    def __init__(self, capacity=5_000_000, error_rate=0.001, exact_limit=200_000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.exact_limit = exact_limit
+        self._exact = set()
+        self._bloom = None
+        self.added = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    def _seen(self, product_id):
+        if self._bloom is not None:
+            return product_id in self._bloom
+        return product_id in self._exact
+
+    def _remember(self, product_id):
+        if self._bloom is not None:
+            self._bloom.add(product_id)
+            return
+
+        self._exact.add(product_id)
+        if len(self._exact) > self.exact_limit:
+            # Switch to the fixed-size filter once the exact set gets large
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            for known_id in self._exact:
+                self._bloom.add(known_id)
+            self._exact = set()
+
+    def seed(self, urls_or_ids):
+        """Mark products as already known (e.g. saved or scraped) without counting them"""
+        for value in urls_or_ids:
+            product_id = (
+                ProductScraper.extract_product_id(value) if "/" in value else value
+            )
+            if product_id:
+                self._remember(product_id)
+
+    def add(self, url):
+        """Return True if url is a product not seen before"""
+        product_id = ProductScraper.extract_product_id(url)
+        if not product_id:
+            self.invalid += 1
+            return False
+        if self._seen(product_id):
+            self.duplicates += 1
+            return False
+
+        self._remember(product_id)
+        self.added += 1
+        return True
+
+    def stats(self):
+        return {
+            "added": self.added,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "mode": "bloom" if self._bloom is not None else "exact",
+        }
@@ -1,11 +1,23 @@
 import csv
 from datetime import datetime
-from config import setup_driver
+from config import NYKAA_CATEGORIES, setup_driver
 from product_scraper import ProductScraper
 from url_scraper import URLCollector
+from frontier import ProductFrontier
+from scrape_log import ScrapeLogWriter
+from timing import ScrapeAttempt
+from retry_policy import (
+    URL_FIELDS,
+    MissingIngredientsError,
+    check_product_page,
+    is_due,
+    schedule_retry,
+)
 import os
 from dotenv import load_dotenv
+import psycopg2
 import sys
+import time
 
 # Add parent directory to path to access database module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,45 +26,75 @@ from database.models import (
     ProductModel,
     IngredientModel,
     ProductIngredientModel,
+    ScrapeLogModel,
 )
 
 load_dotenv()
 
+# Seconds to wait after navigation for page JavaScript to render
+SCRAPE_PAGE_LOAD_DELAY = float(os.getenv("SCRAPE_PAGE_LOAD_DELAY", "0"))
 
-def save_urls_to_csv(urls, filename="product_urls.csv"):
-    """Save collected URLs to CSV file with pending status"""
-    existing_urls = set()
+
+def read_url_rows(filename="product_urls.csv"):
+    """Rows of the URL CSV, with retry columns added to older files"""
+    with open(filename, "r") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for field in URL_FIELDS:
+            if row.get(field) is None:
+                row[field] = ""
+    return rows
+
+
+def write_url_rows(rows, filename="product_urls.csv"):
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=URL_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def load_saved_urls(filename="product_urls.csv"):
+    """URLs already saved to the CSV file"""
     try:
         with open(filename, "r") as f:
             reader = csv.DictReader(f)
-            existing_urls = {row["url"] for row in reader}
+            return [row["url"] for row in reader]
     except FileNotFoundError:
-        pass
+        return []
+
+
+def save_urls_to_csv(urls, filename="product_urls.csv"):
+    """Save collected URLs to CSV file with pending status (one row per product ID)"""
+    existing_urls = load_saved_urls(filename)
+
+    frontier = ProductFrontier()
+    frontier.seed(existing_urls)
+    new_urls = [url for url in urls if frontier.add(url)]
 
-    new_urls = [url for url in urls if url not in existing_urls]
+    if existing_urls:
+        with open(filename, "r") as f:
+            if next(csv.reader(f)) != URL_FIELDS:
+                # Upgrade an older file's header before appending
+                write_url_rows(read_url_rows(filename), filename)
 
     mode = "a" if existing_urls else "w"
     with open(filename, mode, newline="") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["url", "status", "scraped_at", "error_message"]
-        )
+        writer = csv.DictWriter(f, fieldnames=URL_FIELDS, restval="")
         if not existing_urls:
             writer.writeheader()
 
         for url in new_urls:
-            writer.writerow(
-                {"url": url, "status": "pending", "scraped_at": "", "error_message": ""}
-            )
+            writer.writerow({"url": url, "status": "pending"})
     print(f"Saved {len(new_urls)} new URLs to {filename}")
-    print(f"Skipped {len(urls) - len(new_urls)} duplicate URLs")
+    print(f"Skipped {len(urls) - len(new_urls)} duplicate products")
 
 
 def update_url_status(url, status, error=None):
-    """Update status in CSV file"""
-    rows = []
-    with open("product_urls.csv", "r") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    """
+    Update status in CSV file. A failed status classifies error and
+    schedules the next attempt, or dead-letters the URL (retry_policy.py).
+    """
+    rows = read_url_rows()
 
     for row in rows:
         if row["url"] == url:
@@ -60,99 +102,222 @@ def update_url_status(url, status, error=None):
             row["scraped_at"] = (
                 datetime.now().isoformat() if status == "scraped" else ""
             )
-            row["error_message"] = error or ""
+            row["error_message"] = str(error)[:1000] if error else ""
+            if status == "failed":
+                schedule_retry(row, error)
+            else:
+                row["failure_class"] = ""
+                row["attempts"] = ""
+                row["next_attempt_at"] = ""
 
-    with open("product_urls.csv", "w", newline="") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["url", "status", "scraped_at", "error_message"]
-        )
-        writer.writeheader()
-        writer.writerows(rows)
+    write_url_rows(rows)
 
 
-def scrape_pending_urls(include_failed=False):
+def scrape_pending_urls(include_failed=False, log_path=None, log_batch_size=25):
     """
     Scrape URLs from CSV based on status.
 
     Args:
-        include_failed: If True, also retry failed URLs. Default False (only pending).
+        include_failed: If True, also retry failed URLs whose next attempt is
+            due. Default False (only pending). Dead URLs are never retried.
+        log_path: If set, append raw results to this NDJSON scrape log instead
+            of writing to the database (load it with database/load_scrape_log.py).
+        log_batch_size: Scrape attempts buffered per scrape_logs insert.
     """
     driver = setup_driver()
     scraper = ProductScraper(driver)
 
-    # connect to db
-    db_params = {
-        "host": os.getenv("DB_HOST"),
-        "database": os.getenv("DB_NAME"),
-        "user": os.getenv("DB_USER"),
-        "password": os.getenv("DB_PASSWORD"),
-        "port": os.getenv("DB_PORT"),
-    }
-
-    database = Database(db_params)
-    database.connect()
-
-    # instantiate models
-    product_model = ProductModel(database)
-    ingredient_model = IngredientModel(database)
-    product_ingredient_model = ProductIngredientModel(database)
-
-    with open("product_urls.csv", "r") as f:
-        reader = csv.DictReader(f)
-        if include_failed:
-            urls_to_scrape = [
-                row for row in reader if row["status"] in ("pending", "failed")
-            ]
-        else:
-            urls_to_scrape = [row for row in reader if row["status"] == "pending"]
+    scrape_log = None
+    database = None
+    attempts = []
+    if log_path:
+        scrape_log = ScrapeLogWriter(log_path)
+    else:
+        # connect to db
+        db_params = {
+            "host": os.getenv("DB_HOST"),
+            "database": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "port": os.getenv("DB_PORT"),
+        }
+
+        database = Database(db_params)
+        database.connect()
+
+        # instantiate models
+        product_model = ProductModel(database)
+        ingredient_model = IngredientModel(database)
+        product_ingredient_model = ProductIngredientModel(database)
+        scrape_log_model = ScrapeLogModel(database)
+
+    rows = read_url_rows()
+    now = datetime.now()
+    urls_to_scrape = [row for row in rows if row["status"] == "pending"]
+    if include_failed:
+        # Failed URLs only once their backoff has passed, soonest due first
+        due = [row for row in rows if row["status"] == "failed" and is_due(row, now)]
+        due.sort(key=lambda row: row["next_attempt_at"])
+        urls_to_scrape += due
 
     print(f"Found {len(urls_to_scrape)} URLs to scrape")
     if include_failed:
-        failed_count = sum(1 for row in urls_to_scrape if row["status"] == "failed")
-        print(f"  - {failed_count} failed (retrying)")
-        print(f"  - {len(urls_to_scrape) - failed_count} pending")
+        failed = sum(1 for row in rows if row["status"] == "failed")
+        dead = sum(1 for row in rows if row["status"] == "dead")
+        print(f"  - {len(due)} failed (retrying)")
+        print(f"  - {len(urls_to_scrape) - len(due)} pending")
+        print(f"  - {failed - len(due)} failed, waiting for backoff")
+        print(f"  - {dead} dead (max attempts reached)")
 
     for i, row in enumerate(urls_to_scrape, 1):
         url = row["url"]
+        attempt = ScrapeAttempt("cli", url)
+        product_data = None
 
         try:
             print(f"[{i}/{len(urls_to_scrape)}] Scraping: {url}")
 
-            driver.get(url)
-            product_data = scraper.scrape_product(url)
-
-            product_id = product_model.create(
-                product_data["product_id"],
-                product_data["name"],
-                product_data["category"],
-                url,
-                product_data["image_url"],
-            )
-
-            if product_data["ingredients"]:
+            with attempt.stage("navigation"):
+                driver.get(url)
+            with attempt.stage("render_wait"):
+                time.sleep(SCRAPE_PAGE_LOAD_DELAY)
+            with attempt.stage("extraction"):
+                check_product_page(driver)
+                product_data = scraper.scrape_product(url)
+            attempt.scraped(product_data)
+            if not product_data.get("ingredients"):
+                raise MissingIngredientsError("No ingredients found on product page")
+
+            if scrape_log:
+                # Timings travel with the record; the loader writes scrape_logs
+                scrape_log.append(url, product_data, attempt.entry)
+                update_url_status(url, "scraped")
+                print(f"Logged: {product_data['name']}")
+                continue
+
+            with attempt.stage("db_write"):
+                product_id = product_model.create(
+                    product_data["product_id"],
+                    product_data["name"],
+                    product_data["category"],
+                    url,
+                    product_data["image_url"],
+                )
+
+                # Scraped names never overwrite dictionary flags
+                ingredient_ids = ingredient_model.get_or_create_many(
+                    product_data["ingredients"]
+                )
                 for position, ingredient_name in enumerate(product_data["ingredients"]):
-                    ingredient_id = ingredient_model.create_or_get(ingredient_name)
-                    product_ingredient_model.link(product_id, ingredient_id, position)
+                    product_ingredient_model.link(
+                        product_id, ingredient_ids[ingredient_name], position
+                    )
 
-            database.conn.commit()
+                product_model.refresh_safety_status([product_id])
+
+                database.conn.commit()
+            attempt.entry["product_id"] = product_id
             update_url_status(url, "scraped")
             print(f"Success: {product_data['name']}")
 
         except Exception as e:
             print(f"Error: {e}")
-            database.conn.rollback()
-            update_url_status(url, "failed")
-
-    database.close()
+            attempt.failed(e)
+            if database:
+                recover_connection(database)
+            if scrape_log:
+                scrape_log.append(url, None, attempt.entry)
+            update_url_status(url, "failed", e)
+
+        if database:
+            attempts.append(attempt.entry)
+            if len(attempts) >= log_batch_size:
+                flush_attempts(database, scrape_log_model, attempts)
+
+    if scrape_log:
+        scrape_log.close()
+    if database:
+        flush_attempts(database, scrape_log_model, attempts)
+        database.close()
     driver.quit()
 
 
+def flush_attempts(database, scrape_log_model, attempts):
+    """Write buffered scrape attempts to scrape_logs in one transaction"""
+    try:
+        scrape_log_model.log_attempts(attempts)
+        database.conn.commit()
+    except Exception as e:
+        print(f"Could not write scrape logs: {e}")
+        recover_connection(database)
+    attempts.clear()
+
+
+def recover_connection(database):
+    """
+    Roll back a failed transaction, reconnecting if the connection itself
+    is gone, so URLs that failed on the database can succeed on retry.
+    """
+    try:
+        database.conn.rollback()
+        return
+    except psycopg2.Error as e:
+        print(f"Database connection lost, reconnecting: {e}")
+
+    try:
+        database.close()
+    except psycopg2.Error:
+        pass
+    try:
+        database.connect()
+    except psycopg2.Error as e:
+        # The next write fails and retries the reconnect
+        print(f"Could not reconnect: {e}")
+
+
+def iter_category_urls(categories):
+    """Flatten NYKAA_CATEGORIES into (name, url) pairs"""
+    for name, value in categories.items():
+        if isinstance(value, dict):
+            for sub_name, url in iter_category_urls(value):
+                yield f"{name}/{sub_name}", url
+        else:
+            yield name, value
+
+
+def collect_category_urls(collector, categories, max_pages=50, frontier=None):
+    """
+    Collect URLs across categories, each product once by its product ID.
+
+    Products already in the CSV are seeded into the frontier, so they are
+    not collected again.
+    """
+    if frontier is None:
+        frontier = ProductFrontier()
+        frontier.seed(load_saved_urls())
+
+    urls = []
+    for name, category_url in iter_category_urls(categories):
+        print(f"Category: {name}")
+        urls.extend(
+            collector.collect_all_product_urls(category_url, max_pages, frontier)
+        )
+
+    stats = frontier.stats()
+    print(
+        f"Collected {stats['added']} products, avoided {stats['duplicates']} "
+        f"redundant scrapes ({stats['invalid']} URLs without a product ID)"
+    )
+    return urls
+
+
 def main():
     driver = setup_driver()
     collector = URLCollector(driver)
 
-    urls = collector.collect_all_product_urls(
-        "https://www.nykaa.com/makeup/face/c/13?ptype=lst&id=13&root=nav_2&dir=desc&order=popularity",
+    urls = collect_category_urls(
+        collector,
+        {"face": NYKAA_CATEGORIES["face"]},
         max_pages=27,
     )
 
@@ -160,7 +325,8 @@ def main():
     save_urls_to_csv(urls)
     driver.quit()
 
-    scrape_pending_urls()
+    # SCRAPE_LOG_PATH decouples scraping from the database (see scrape_log.py)
+    scrape_pending_urls(log_path=os.getenv("SCRAPE_LOG_PATH"))
 
 
 if __name__ == "__main__":
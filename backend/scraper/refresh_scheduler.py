@@ -0,0 +1,334 @@
+"""
+Keep cached products fresh, stalest and most requested first.
+
+The scrape endpoint serves a cached product forever, so this process
+re-scrapes products in the background. Candidates older than a minimum
+age come from ProductModel.get_refresh_candidates, ordered by
+age x request demand (recorded by the API, see api/demand.py), and are
+kept in a priority queue that is rebuilt from the database periodically.
+
+Pages are fetched within a global pages-per-minute budget and at most one
+page per host every few seconds. A refresh replaces the product's
+ingredient links and verdict in one transaction and logs its stage
+timings to scrape_logs (source "refresh"); a failed product is held back
+in the database (product_refresh_failures, migration 009) with the
+backoff of its failure class (retry_policy.py), so it drops out of the
+candidates and cannot starve the rest of the queue, even across restarts.
+
+Usage: python scraper/refresh_scheduler.py --pages-per-minute 6 --host-delay 10
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from config import setup_driver
+from product_scraper import ProductScraper
+from retry_policy import (
+    MissingIngredientsError,
+    check_product_page,
+    classify_failure,
+    retry_delay,
+)
+from timing import ScrapeAttempt
+
+# Add parent directory to path to access database module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import (
+    Database,
+    ProductModel,
+    IngredientModel,
+    ProductIngredientModel,
+    ScrapeLogModel,
+)
+
+load_dotenv()
+
+# Pages fetched per minute across all hosts
+REFRESH_PAGES_PER_MINUTE = float(os.getenv("REFRESH_PAGES_PER_MINUTE", "6"))
+
+# Minimum seconds between two fetches from the same host
+REFRESH_HOST_DELAY = float(os.getenv("REFRESH_HOST_DELAY", "10"))
+
+# Products updated more recently than this are not refreshed
+REFRESH_MIN_AGE_HOURS = float(os.getenv("REFRESH_MIN_AGE_HOURS", "168"))
+
+# Seconds to wait after navigation for page JavaScript to render
+SCRAPE_PAGE_LOAD_DELAY = float(os.getenv("SCRAPE_PAGE_LOAD_DELAY", "3"))
+
+# Seconds between rebuilds of the queue from current ages and demand
+REFRESH_REQUEUE_INTERVAL = 300
+
+
+class RefreshScheduler:
+    """Priority queue of stale products, drained within a crawl budget"""
+
+    def __init__(
+        self,
+        database,
+        driver_factory=setup_driver,
+        pages_per_minute=REFRESH_PAGES_PER_MINUTE,
+        host_delay=REFRESH_HOST_DELAY,
+        min_age_hours=REFRESH_MIN_AGE_HOURS,
+        batch_size=500,
+        page_load_delay=SCRAPE_PAGE_LOAD_DELAY,
+    ):
+        self.database = database
+        self.driver_factory = driver_factory
+        self.page_interval = 60 / pages_per_minute
+        self.host_delay = host_delay
+        self.min_age_hours = min_age_hours
+        self.batch_size = batch_size
+        self.page_load_delay = page_load_delay
+
+        self.product_model = ProductModel(database)
+        self.ingredient_model = IngredientModel(database)
+        self.product_ingredient_model = ProductIngredientModel(database)
+        self.scrape_log_model = ScrapeLogModel(database)
+
+        self.driver = None
+        self.queue = []
+        self.queued_at = None
+        self.last_page_at = None
+        self.host_last_fetch = {}
+        self.stats = {"refreshed": 0, "failed": 0}
+
+    def requeue(self):
+        """Rebuild the queue from current product ages and demand"""
+        candidates = self.product_model.get_refresh_candidates(
+            self.min_age_hours, self.batch_size
+        )
+        # Don't hold a snapshot open between rebuilds
+        self.database.read_conn.rollback()
+
+        self.queue = [
+            (-priority, product_id, url)
+            for product_id, url, _, _, priority in candidates
+        ]
+        heapq.heapify(self.queue)
+        self.queued_at = time.monotonic()
+
+    def next_product(self):
+        """
+        (product_id, url, wait) for the highest priority product, where
+        wait is the seconds until the crawl budget and its host allow it.
+        """
+        now = time.monotonic()
+        if (
+            not self.queue
+            or self.queued_at is None
+            or now - self.queued_at >= REFRESH_REQUEUE_INTERVAL
+        ):
+            self.requeue()
+        if not self.queue:
+            return None
+
+        wait = 0.0
+        if self.last_page_at is not None:
+            wait = self.last_page_at + self.page_interval - now
+
+        # Highest priority product whose host is free; otherwise the
+        # product whose host frees up first
+        deferred = []
+        chosen = None
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            host_wait = self._host_wait(entry[2], now)
+            if host_wait <= 0:
+                chosen = (entry, 0.0)
+                break
+            deferred.append((host_wait, entry))
+        if chosen is None:
+            host_wait, entry = min(deferred, key=lambda item: item[0])
+            deferred.remove((host_wait, entry))
+            chosen = (entry, host_wait)
+        for _, entry in deferred:
+            heapq.heappush(self.queue, entry)
+
+        (_, product_id, url), host_wait = chosen
+        return product_id, url, max(wait, host_wait, 0.0)
+
+    def _host_wait(self, url, now):
+        last_fetch = self.host_last_fetch.get(urlparse(url).netloc)
+        if last_fetch is None:
+            return 0.0
+        return last_fetch + self.host_delay - now
+
+    def refresh(self, product_id, url):
+        """Re-scrape one product and replace its stored ingredients and verdict"""
+        self.last_page_at = time.monotonic()
+        self.host_last_fetch[urlparse(url).netloc] = self.last_page_at
+
+        attempt = ScrapeAttempt("refresh", url)
+        attempt.entry["product_id"] = product_id
+        try:
+            if self.driver is None:
+                self.driver = self.driver_factory()
+            scraper = ProductScraper(self.driver)
+
+            with attempt.stage("navigation"):
+                self.driver.get(url)
+            with attempt.stage("render_wait"):
+                time.sleep(self.page_load_delay)
+            with attempt.stage("extraction"):
+                check_product_page(self.driver)
+                product_data = scraper.scrape_product(url)
+            attempt.scraped(product_data)
+
+            # Keep the cached copy rather than replace it with an empty one
+            if not product_data or not product_data.get("ingredients"):
+                raise MissingIngredientsError(
+                    "Could not extract product data or ingredients"
+                )
+
+            with attempt.stage("db_write"):
+                stored_id = self.product_model.create(
+                    product_data["product_id"],
+                    product_data["name"],
+                    product_data["category"],
+                    url,
+                    product_data["image_url"],
+                )
+                self.product_ingredient_model.unlink_all(stored_id)
+                # Scraped names never overwrite dictionary flags
+                ingredient_ids = self.ingredient_model.get_or_create_many(
+                    product_data["ingredients"]
+                )
+                for position, ingredient_name in enumerate(
+                    product_data["ingredients"], start=1
+                ):
+                    self.product_ingredient_model.link(
+                        stored_id, ingredient_ids[ingredient_name], position
+                    )
+                self.product_model.refresh_safety_status([stored_id])
+                self.product_model.clear_refresh_failures(stored_id)
+
+            # The timing row commits with the refresh
+            attempt.entry["product_id"] = stored_id
+            self.scrape_log_model.log_attempts([attempt.entry])
+            self.database.conn.commit()
+            self.stats["refreshed"] += 1
+            return True
+        except Exception as e:
+            attempt.failed(e)
+            self.database.conn.rollback()
+            self.stats["failed"] += 1
+            # A broken browser session would fail every later page
+            self._quit_driver()
+            # Best effort: a database failure must not stop the scheduler
+            try:
+                # Back off per failure class; the cached copy keeps being served
+                failure_class = classify_failure(e)
+                failures = self.product_model.get_refresh_failures(product_id) + 1
+                self.product_model.record_refresh_failure(
+                    product_id,
+                    failures,
+                    failure_class,
+                    retry_delay(failure_class, failures),
+                )
+                self.scrape_log_model.log_attempts([attempt.entry])
+                self.database.conn.commit()
+            except Exception:
+                self.database.conn.rollback()
+            print(f"Error refreshing {url}: {e}")
+            return False
+
+    def run(self, max_pages=None, idle_sleep=60):
+        """
+        Refresh products until interrupted, or with max_pages until that
+        many pages have been fetched or nothing is due
+        """
+        pages = 0
+        try:
+            while max_pages is None or pages < max_pages:
+                found = self.next_product()
+                if found is None:
+                    if max_pages is not None:
+                        # A bounded run ends once nothing is due
+                        break
+                    # Nothing is due; check again once products age
+                    time.sleep(idle_sleep)
+                    continue
+
+                product_id, url, wait = found
+                if wait > 0:
+                    time.sleep(wait)
+                if self.refresh(product_id, url):
+                    print(f"✓ Refreshed product {product_id}: {url}")
+                pages += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._quit_driver()
+        return self.stats
+
+    def _quit_driver(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-scrape cached products, stalest and most requested first"
+    )
+    parser.add_argument(
+        "--pages-per-minute",
+        type=float,
+        default=REFRESH_PAGES_PER_MINUTE,
+        help="Crawl budget across all hosts",
+    )
+    parser.add_argument(
+        "--host-delay",
+        type=float,
+        default=REFRESH_HOST_DELAY,
+        help="Minimum seconds between fetches from one host",
+    )
+    parser.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=REFRESH_MIN_AGE_HOURS,
+        help="Only refresh products older than this",
+    )
+    parser.add_argument(
+        "--batch", type=int, default=500, help="Candidates loaded per queue rebuild"
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        help="Stop after this many pages (default: run forever)",
+    )
+    args = parser.parse_args()
+
+    db_params = {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+    database = Database(db_params)
+    database.connect()
+
+    scheduler = RefreshScheduler(
+        database,
+        pages_per_minute=args.pages_per_minute,
+        host_delay=args.host_delay,
+        min_age_hours=args.min_age_hours,
+        batch_size=args.batch,
+    )
+    try:
+        stats = scheduler.run(args.max_pages)
+    finally:
+        database.close()
+    print(f"Refreshed {stats['refreshed']} products, {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Record and replay the WebDriver calls the scrapers make.
+
+RecordingDriver wraps a live Selenium driver and saves what ProductScraper
+and URLCollector read: title, page_source, current_url, element lookups
+(text and attributes) and the page changes caused by execute_script (e.g.
+the pagination click). ReplayDriver serves the same calls from a saved
+recording, so extraction and ingest can be benchmarked offline at full
+speed.
+
+A recording is a directory with states.json and one gzipped page source
+per state. A state is the page after a get() or a page-changing
+execute_script().
+
+Record: python scraper/replay.py CATEGORY_URL recording/ --max-pages 2 --products 50
+"""
+
+import gzip
+import json
+import os
+import sys
+from selenium.common.exceptions import NoSuchElementException
+
+
+def _element_ref(element):
+    return [element.by, element.value, element.index]
+
+
+def _transition_key(script, args):
+    return json.dumps(
+        [
+            script,
+            [
+                (
+                    _element_ref(arg)
+                    if isinstance(arg, (RecordedElement, ReplayElement))
+                    else arg
+                )
+                for arg in args
+            ],
+        ]
+    )
+
+
+class RecordedElement:
+    """Live element proxy that records the text and attributes read from it"""
+
+    def __init__(self, element, record, by, value, index):
+        self.element = element
+        self.record = record
+        self.by = by
+        self.value = value
+        self.index = index
+
+    @property
+    def text(self):
+        self.record["text"] = self.element.text
+        return self.record["text"]
+
+    def get_attribute(self, name):
+        value = self.element.get_attribute(name)
+        self.record["attributes"][name] = value
+        return value
+
+
+class RecordingDriver:
+    """Wrap a live WebDriver and record the calls the scrapers make"""
+
+    def __init__(self, driver, path):
+        self.driver = driver
+        self.path = path
+        self.states = []
+        self.urls = {}
+        self.start_url = None
+        self._page_sources = {}
+        self._state = None
+        os.makedirs(os.path.join(path, "pages"), exist_ok=True)
+
+    def _new_state(self):
+        self._state = {"id": len(self.states), "lookups": {}, "transitions": {}}
+        self.states.append(self._state)
+        return self._state
+
+    def get(self, url):
+        self.driver.get(url)
+        state = self._new_state()
+        self.urls.setdefault(url, state["id"])
+        if self.start_url is None:
+            self.start_url = url
+
+    @property
+    def title(self):
+        self._state["title"] = self.driver.title
+        return self._state["title"]
+
+    @property
+    def current_url(self):
+        self._state["current_url"] = self.driver.current_url
+        return self._state["current_url"]
+
+    @property
+    def page_source(self):
+        page_source = self.driver.page_source
+        self._page_sources[self._state["id"]] = page_source
+        return page_source
+
+    def _lookup(self, by, value):
+        key = json.dumps([by, value])
+        records = self._state["lookups"].get(key)
+        elements = self.driver.find_elements(by, value)
+        if records is None:
+            records = [{"text": None, "attributes": {}} for _ in elements]
+            self._state["lookups"][key] = records
+        return [
+            RecordedElement(element, records[index], by, value, index)
+            for index, element in enumerate(elements)
+        ]
+
+    def find_element(self, by, value=None):
+        elements = self._lookup(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element for {value}")
+        return elements[0]
+
+    def find_elements(self, by, value=None):
+        return self._lookup(by, value)
+
+    def execute_script(self, script, *args):
+        key = _transition_key(script, args)
+        live_args = [
+            arg.element if isinstance(arg, RecordedElement) else arg for arg in args
+        ]
+        result = self.driver.execute_script(script, *live_args)
+
+        # Scripts run by the scrapers are clicks that change the page
+        previous = self._state
+        previous["transitions"][key] = self._new_state()["id"]
+        return result
+
+    def save(self):
+        for state_id, page_source in self._page_sources.items():
+            with gzip.open(
+                os.path.join(self.path, "pages", f"{state_id}.html.gz"), "wt"
+            ) as f:
+                f.write(page_source)
+        self._page_sources = {}
+
+        with open(os.path.join(self.path, "states.json"), "w") as f:
+            json.dump(
+                {"start_url": self.start_url, "urls": self.urls, "states": self.states},
+                f,
+            )
+
+    def quit(self):
+        self.save()
+        self.driver.quit()
+
+
+class ReplayElement:
+    """Element served from a recording"""
+
+    def __init__(self, record, by, value, index):
+        self.record = record
+        self.by = by
+        self.value = value
+        self.index = index
+
+    @property
+    def text(self):
+        return self.record["text"]
+
+    def get_attribute(self, name):
+        return self.record["attributes"].get(name)
+
+
+class ReplayDriver:
+    """Serve the scrapers' WebDriver calls from a recording"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "states.json")) as f:
+            recording = json.load(f)
+        self.start_url = recording["start_url"]
+        self.urls = recording["urls"]
+        self.states = recording["states"]
+        self._page_source = (None, None)
+        self._state = None
+
+    def get(self, url):
+        state_id = self.urls.get(url)
+        if state_id is None:
+            raise KeyError(f"URL not in recording: {url}")
+        self._state = self.states[state_id]
+
+    @property
+    def title(self):
+        return self._state.get("title", "")
+
+    @property
+    def current_url(self):
+        return self._state.get("current_url")
+
+    @property
+    def page_source(self):
+        # Only the current page's source is kept in memory
+        state_id = self._state["id"]
+        if self._page_source[0] != state_id:
+            page_path = os.path.join(self.path, "pages", f"{state_id}.html.gz")
+            try:
+                with gzip.open(page_path, "rt") as f:
+                    self._page_source = (state_id, f.read())
+            except FileNotFoundError:
+                self._page_source = (state_id, "")
+        return self._page_source[1]
+
+    def find_elements(self, by, value=None):
+        records = self._state["lookups"].get(json.dumps([by, value]), [])
+        return [
+            ReplayElement(record, by, value, index)
+            for index, record in enumerate(records)
+        ]
+
+    def find_element(self, by, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element for {value}")
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        state_id = self._state["transitions"].get(_transition_key(script, args))
+        if state_id is not None:
+            self._state = self.states[state_id]
+
+    def quit(self):
+        self._page_source = (None, None)
+
+
+def record_crawl(category_url, path, max_pages=2, product_limit=50):
+    """Record a category crawl and the first product_limit product pages"""
+    from config import setup_driver
+    from product_scraper import ProductScraper
+    from url_scraper import URLCollector
+
+    driver = RecordingDriver(setup_driver(), path)
+    try:
+        urls = URLCollector(driver).collect_all_product_urls(category_url, max_pages)
+        scraper = ProductScraper(driver)
+        for url in urls[:product_limit]:
+            driver.get(url)
+            scraper.scrape_product(url)
+            print(f"Recorded: {url}")
+    finally:
+        driver.quit()
+
+    print(f"✓ Recorded {len(driver.states)} page states to {path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Record a crawl for offline replay")
+    parser.add_argument("category_url")
+    parser.add_argument("output", help="Recording directory")
+    parser.add_argument("--max-pages", type=int, default=2)
+    parser.add_argument("--products", type=int, default=50)
+    args = parser.parse_args()
+
+    record_crawl(args.category_url, args.output, args.max_pages, args.products)
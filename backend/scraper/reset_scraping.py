@@ -7,12 +7,13 @@ import csv
 import psycopg2
 import os
 from dotenv import load_dotenv
+from retry_policy import URL_FIELDS
 
 load_dotenv()
 
 
 def reset_csv():
-    """Mark all URLs in CSV as pending"""
+    """Mark all URLs in CSV as pending, including dead-lettered ones"""
     rows = []
     with open("product_urls.csv", "r") as f:
         reader = csv.DictReader(f)
@@ -22,11 +23,12 @@ def reset_csv():
         row["status"] = "pending"
         row["scraped_at"] = ""
         row["error_message"] = ""
+        row["failure_class"] = ""
+        row["attempts"] = ""
+        row["next_attempt_at"] = ""
 
     with open("product_urls.csv", "w", newline="") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["url", "status", "scraped_at", "error_message"]
-        )
+        writer = csv.DictWriter(f, fieldnames=URL_FIELDS)
         writer.writeheader()
         writer.writerows(rows)
 
@@ -52,6 +54,8 @@ def clear_database():
         cursor.execute("TRUNCATE TABLE scrape_logs CASCADE;")
         cursor.execute("TRUNCATE TABLE products CASCADE;")
         cursor.execute("TRUNCATE TABLE ingredients CASCADE;")
+        # Scrape log offsets refer to loaded products; reload logs from the start
+        cursor.execute("TRUNCATE TABLE scrape_log_offsets;")
 
         conn.commit()
         cursor.close()
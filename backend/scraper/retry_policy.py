@@ -0,0 +1,139 @@
+"""
+Failure classification and retry scheduling for crawl frontier entries.
+
+Each failed URL in product_urls.csv is classified from its exception, and
+its class decides how often and how soon it is retried. Delays grow
+exponentially with the number of attempts, with jitter so URLs that
+failed together are not retried together. An entry that reaches its
+class's max attempts becomes a dead letter (status "dead") and is not
+scraped again until it is reset. Permanent failures (removed pages, data
+the database rejects) are dead-lettered on the first attempt.
+"""
+
+import random
+from datetime import datetime, timedelta
+import psycopg2
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
+
+# product_urls.csv columns; failed URLs carry a failure class, attempt
+# count and next attempt time
+URL_FIELDS = [
+    "url",
+    "status",
+    "scraped_at",
+    "error_message",
+    "failure_class",
+    "attempts",
+    "next_attempt_at",
+]
+
+# Page titles served for missing or removed products
+NOT_FOUND_TITLE_MARKERS = ("page not found", "404 not found", "product not found")
+
+
+class MissingIngredientsError(Exception):
+    """The product page loaded but lists no ingredients"""
+
+
+class ProductNotFoundError(Exception):
+    """The product page is a 404 or the product was removed"""
+
+
+def check_product_page(driver):
+    """
+    Raise ProductNotFoundError if the loaded page is a not-found page or
+    redirected away from a product page (removed products redirect).
+    """
+    title = (driver.title or "").lower()
+    if any(marker in title for marker in NOT_FOUND_TITLE_MARKERS):
+        raise ProductNotFoundError(f"Product page not found: {driver.title}")
+    current_url = driver.current_url
+    if current_url and "/p/" not in current_url:
+        raise ProductNotFoundError(f"Redirected away from product page: {current_url}")
+
+
+# failure class -> (max attempts, base delay seconds, max delay seconds).
+# Permanent classes have one attempt; their delays only apply to
+# refresh_scheduler.py, which backs off instead of dead-lettering.
+RETRY_POLICIES = {
+    # 404 or removed product: permanent
+    "not_found": (1, 7 * 24 * 3600, 30 * 24 * 3600),
+    # The database rejected the scraped data (constraint or type): permanent
+    "invalid_data": (1, 24 * 3600, 7 * 24 * 3600),
+    # Expected element missing on a product page that loaded: a selector
+    # change or a partial render, so retry with normal backoff
+    "missing_element": (6, 3600, 24 * 3600),
+    # Sellers rarely add ingredients later
+    "no_ingredients": (3, 24 * 3600, 7 * 24 * 3600),
+    # Slow site or network; usually recovers within hours
+    "timeout": (6, 5 * 60, 24 * 3600),
+    # Browser session crashed or was blocked
+    "browser": (6, 60, 6 * 3600),
+    # Our database connection, not the page; retry soon
+    "database": (8, 30, 3600),
+    "unknown": (4, 3600, 24 * 3600),
+}
+
+
+def classify_failure(error):
+    """Failure class for an exception raised while scraping or storing a URL"""
+    if isinstance(error, ProductNotFoundError):
+        return "not_found"
+    if isinstance(error, MissingIngredientsError):
+        return "no_ingredients"
+    if isinstance(error, NoSuchElementException):
+        return "missing_element"
+    if isinstance(error, TimeoutException):
+        return "timeout"
+    if isinstance(error, WebDriverException):
+        return "browser"
+    if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        return "database"
+    if isinstance(error, (psycopg2.IntegrityError, psycopg2.DataError)):
+        return "invalid_data"
+    return "unknown"
+
+
+def retry_delay(failure_class, attempts, rng=random):
+    """
+    Seconds to wait before the next attempt: the class's base delay doubled
+    per previous attempt, capped, then jittered to between half and all of it.
+    """
+    _, base_delay, max_delay = RETRY_POLICIES[failure_class]
+    delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+    return rng.uniform(delay / 2, delay)
+
+
+def schedule_retry(row, error, now=None):
+    """
+    Record a failed attempt on a frontier row (dict from product_urls.csv):
+    its failure class and attempt count, then either the next attempt time
+    (status "failed") or, once max attempts are used up, status "dead".
+    """
+    now = now or datetime.now()
+    failure_class = classify_failure(error)
+    attempts = int(row.get("attempts") or 0) + 1
+    max_attempts = RETRY_POLICIES[failure_class][0]
+
+    row["failure_class"] = failure_class
+    row["attempts"] = str(attempts)
+    if attempts >= max_attempts:
+        row["status"] = "dead"
+        row["next_attempt_at"] = ""
+    else:
+        row["status"] = "failed"
+        retry_at = now + timedelta(seconds=retry_delay(failure_class, attempts))
+        row["next_attempt_at"] = retry_at.isoformat()
+    return row
+
+
+def is_due(row, now=None):
+    """Whether a failed row's next attempt time has passed"""
+    if not row.get("next_attempt_at"):
+        # Failed before retries were scheduled
+        return True
+    return datetime.fromisoformat(row["next_attempt_at"]) <= (now or datetime.now())
@@ -0,0 +1,76 @@
+"""
+Append-only NDJSON log of raw scrape results.
+
+With a scrape log the scraper never waits on Postgres: each
+ProductScraper.scrape_product result is appended as one line and
+database/load_scrape_log.py loads it later in batches. The log can be
+replayed into any database without re-scraping.
+"""
+
+import json
+import os
+from datetime import datetime
+
+
+class ScrapeLogWriter:
+    """Append scrape results to an NDJSON log, one fsynced line each"""
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.file = open(path, "ab")
+
+    def append(self, url, product_data, attempt=None):
+        """
+        Append one scrape result.
+
+        :param product_data: ProductScraper.scrape_product result, or None
+                             for a failed attempt
+        :param attempt: Optional ScrapeAttempt entry with stage timings
+        """
+        record = {
+            "url": url,
+            "scraped_at": datetime.now().isoformat(),
+            "product": product_data,
+        }
+        if attempt is not None:
+            record["attempt"] = {
+                **attempt,
+                "scraped_at": attempt["scraped_at"].isoformat(),
+            }
+        self.file.write(
+            (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        )
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def read_scrape_log(path, offset=0, limit=None):
+    """
+    Yield (end_offset, record) for complete lines after byte offset.
+
+    Stops at a trailing line without a newline, which a scraper may still
+    be writing, so the log can be tailed while it grows. A line that is not
+    valid JSON yields its raw text as the record.
+    """
+    count = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = line.decode("utf-8", "replace").rstrip("\n")
+            yield offset, record
+            count += 1
+            if limit is not None and count >= limit:
+                break
@@ -0,0 +1,51 @@
+"""
+Stage timings for a single scrape attempt.
+
+Each attempt becomes one scrape_logs entry (ScrapeLogModel.log_attempts)
+with navigation, render wait, extraction and DB-write durations, the
+ingredient count and, on failure, the exception class.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+STAGES = ("navigation", "render_wait", "extraction", "db_write")
+
+
+class ScrapeAttempt:
+    """Collects stage durations and outcome for one URL"""
+
+    def __init__(self, source, url):
+        self.entry = {
+            "source": source,
+            "url": url,
+            "scraped_at": datetime.now(),
+            "status": "success",
+            "product_id": None,
+            "category": None,
+            "error_class": None,
+            "error_message": None,
+            "ingredient_count": None,
+            **{f"{stage}_ms": None for stage in STAGES},
+        }
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; the duration is kept even if the stage raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.entry[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+
+    def scraped(self, product_data):
+        """Record what extraction produced"""
+        if product_data:
+            self.entry["category"] = product_data.get("category")
+            self.entry["ingredient_count"] = len(product_data.get("ingredients") or [])
+
+    def failed(self, error):
+        self.entry["status"] = "failed"
+        self.entry["error_class"] = type(error).__name__
+        self.entry["error_message"] = str(error)[:1000]
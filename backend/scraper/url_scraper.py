@@ -1,14 +1,25 @@
 from selenium.webdriver.common.by import By
 import time
+from frontier import ProductFrontier
 
 
 class URLCollector:
-    def __init__(self, driver):
+    def __init__(self, driver, page_load_delay=3):
         self.driver = driver
+        # Seconds to wait for listing pages to render (0 when replaying)
+        self.page_load_delay = page_load_delay
+
+    def collect_all_product_urls(self, category_url, max_pages=50, frontier=None):
+        """
+        Collect product URLs from a category listing, one per product ID.
+
+        Pass a shared ProductFrontier to de-duplicate across categories.
+        """
+        if frontier is None:
+            frontier = ProductFrontier()
 
-    def collect_all_product_urls(self, category_url, max_pages=50):
         self.driver.get(category_url)
-        time.sleep(3)
+        time.sleep(self.page_load_delay)
 
         all_urls = []
         page_num = 1
@@ -17,8 +28,12 @@ class URLCollector:
             print(f"Collecting from page {page_num}...")
 
             page_urls = self._get_urls_from_current_page()
-            all_urls.extend(page_urls)
-            print(f"Found {len(page_urls)} products. Total {len(all_urls)}")
+            new_urls = [url for url in page_urls if frontier.add(url)]
+            all_urls.extend(new_urls)
+            print(
+                f"Found {len(page_urls)} products ({len(new_urls)} new). "
+                f"Total {len(all_urls)}"
+            )
 
             if not self._go_to_next_page():
                 print("No more pages available.")
@@ -26,7 +41,6 @@ class URLCollector:
 
             page_num += 1
 
-        # unique_urls = list(set(all_urls))
         print(f"\nCollected {len(all_urls)} URLs")
         return all_urls
 
@@ -52,7 +66,7 @@ class URLCollector:
         try:
             next_button = self.driver.find_element(By.CSS_SELECTOR, "a.css-1zi560")
             self.driver.execute_script("arguments[0].click();", next_button)
-            time.sleep(3)
+            time.sleep(self.page_load_delay)
             return True
 
         except Exception as e: